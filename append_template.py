@@ -1,16 +1,3 @@
-from pptx import Presentation
-from pptx.util import Pt
-import os
-import time
-import copy, math, re
-from pptx.dml.color import RGBColor
-from pptx.enum.text import PP_ALIGN
-from pptx.enum.shapes import MSO_SHAPE_TYPE
-from pptx.enum.shapes import PP_PLACEHOLDER
-from merge_templates import merge_pptx_slides
-from pptx.parts.image import ImagePart
-import datetime
-
 """
 LinkedIn Carousel Generator
 ---------------------------
@@ -21,126 +8,42 @@ It supports flexible mappings of placeholders (e.g. [HOOK], [STORY], [CTA])
 to user-provided content blocks, while applying per-block style overrides 
 (font size, bold, color, alignment, line spacing).
 
+Importing this module has no side effects: python-pptx, fonts and templates
+are loaded on first use.
+
 Author: <your name>
 """
 
-from pptx import Presentation
-from pptx.util import Pt
-import copy, math, re
-from pptx.dml.color import RGBColor
-from pptx.enum.text import PP_ALIGN
-
-# Supported post sections. Any block outside these tags will be ignored.
-SECTIONS = {
-    "HOOK", 
-    "HOOK_SUB", 
-    "STORY", 
-    "STORY_SUB",
-    "TOPIC", 
-    "TOPIC_SUB", 
-    "CTA", 
-    "SUBJECT", 
-    "ONE",
-    "ONE_SUB",
-    "IMAGE_TOP",
-    "IMAGE_TOP_SUB",
-    "IMAGE_BOTTOM",
-    "IMAGE_BOTTOM_SUB",
-    "IMAGE_BOTTOM_RIGHT",
-    "IMAGE_BOTTOM_RIGHT_SUB",
-    "IMAGE_BOTTOM_RIGHT_CAP",
-    "IMAGE_BOTTOM_LEFT",
-    "IMAGE_BOTTOM_LEFT_SUB",
-    "IMAGE_BOTTOM_LEFT_CAP",
-    "CTA",
-    "CTA_SUB"
-}
-
-
-# Contador global para garantir unicidade
-_image_counter = 0
-
-def parse_post(post_text: str):
-    """
-    Parse LinkedIn-like post text into structured parts.
-
-    Args:
-        post_text (str): The full post text containing section tags like [HOOK], [STORY].
-
-    Returns:
-        dict: Mapping from section name (e.g., 'HOOK') to list of lines.
-    """
-    parts = {}
-    current = None
-    for line in post_text.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-
-        if line.startswith("[") and line.endswith("]"):
-            tag = line.strip("[]").upper()
-            if tag in SECTIONS:
-                current = tag
-                parts[current] = []
-        elif current:
-            parts[current].append(line)
-    return parts
-
-
-def dynamic_font_size_simple(
-    text,
-    max_width_pt=505,
-    max_height_pt=200,
-    base_line_spacing=0.85,
-    min_font_size=17,
-    max_font_size=110,
-    max_caracteres=840
-):
+import os
+import re
+from functools import lru_cache
+from post_parser import SECTIONS, parse_post
+from merge_templates import append_slides
+from template_cache import load_template
+from placeholder_index import compile_placeholder_index, iter_indexed_shapes, load_placeholder_index
+from font_metrics import resolve_face, text_box_width_pt
+from fit_cache import cached_fit_font_size
+from media_store import get_or_add_image_blob
+from image_pipeline import IMAGE_PIPELINE
+from package_writer import save_presentation
+from tracing import span
+
+
+def auto_line_spacing(text, base_line_spacing=0.85):
     """
-    Estimate an appropriate font size and line spacing based on content length 
-    and bounding box constraints. Uses binary search for efficiency.
+    Line spacing multiplier for a block of text: slightly looser for long content.
 
     Args:
         text (str): Content to measure.
-        max_width_pt (int): Width of the bounding box in points.
-        max_height_pt (int): Height of the bounding box in points.
         base_line_spacing (float): Base line spacing multiplier.
-        min_font_size (int): Minimum font size allowed.
-        max_font_size (int): Maximum font size allowed.
-        max_caracteres (int): Hard limit of characters before overflow.
 
     Returns:
-        tuple: (font_size: int, line_spacing: float, overflow_flag: int)
+        float: Line spacing rounded to two decimals.
     """
-    num_chars = len(text.strip())
-    words = text.split()
-    avg_word_length = num_chars / max(1, len(words))
-
-    def chars_per_line(font_size):
-        # Approximate average char width
-        avg_char_width = font_size * (1.1 if num_chars > 120 else 1.25)
-        return int(max_width_pt / avg_char_width)
-
-    # Binary search between min and max font size
-    low, high = min_font_size, max_font_size
-    best_size = min_font_size
-    for _ in range(20):
-        mid = (low + high) / 2
-        cpl = chars_per_line(mid)
-        estimated_lines = math.floor(num_chars / cpl)
-        estimated_height = estimated_lines * mid * base_line_spacing
-        if estimated_height <= max_height_pt:
-            best_size = mid
-            low = mid + 1
-        else:
-            high = mid - 1
-
-    # Adjust line spacing slightly for long content
     line_spacing = base_line_spacing
-    if num_chars > 100:
+    if len(text.strip()) > 100:
         line_spacing = min(1.0, base_line_spacing + 0.1)
-
-    return math.floor(best_size), round(line_spacing, 2), 1 if num_chars > max_caracteres else 0
+    return round(line_spacing, 2)
 
 
 def hex_to_rgb(hex_color: str = "#000"):
@@ -153,6 +56,8 @@ def hex_to_rgb(hex_color: str = "#000"):
     Returns:
         RGBColor: pptx-compatible RGB color.
     """
+    from pptx.dml.color import RGBColor
+
     hex_color = hex_color.lstrip('#')
     if len(hex_color) == 3:  # short format (#fff)
         hex_color = ''.join([c*2 for c in hex_color])
@@ -161,12 +66,33 @@ def hex_to_rgb(hex_color: str = "#000"):
     g = int(hex_color[2:4], 16)
     b = int(hex_color[4:6], 16)
     return RGBColor(r, g, b)
-def apply_text_to_slide(prs, placeholder_map, text_parts, output_path, img_path:str = None):
+
+
+@lru_cache(maxsize=256)
+def _placeholder_pattern(placeholders):
+    """Compiled regex splitting text on any of `placeholders` (cached per placeholder set)."""
+    return re.compile("(" + "|".join(map(re.escape, placeholders)) + ")")
+
+
+def fill_presentation(prs, placeholder_map, text_parts, img_path:str = None, index=None):
     """
-    Apply parsed content into a presentation template.
+    Apply parsed content into a presentation template, in memory.
+
+    Args:
+        prs (Presentation): Template presentation to fill (modified in place).
+        placeholder_map (dict): Placeholder → key or style config.
+        text_parts (dict): Parsed post sections (see `parse_post`).
+        img_path (str): Image used for picture placeholders.
+        index (dict): Precompiled placeholder index of the template (see
+            `placeholder_index.load_placeholder_index`); scanned from `prs` when None.
+
+    Returns:
+        Presentation: The same `prs`, filled.
     """
-    global _image_counter
-    
+    from pptx.util import Pt
+    from pptx.enum.text import PP_ALIGN
+    from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
     default_img = img_path
     norm_map = {}
     for ph, cfg in placeholder_map.items():
@@ -175,121 +101,108 @@ def apply_text_to_slide(prs, placeholder_map, text_parts, output_path, img_path:
         else:
             norm_map[ph] = dict(cfg)
 
-    ph_pattern = re.compile("(" + "|".join(map(re.escape, norm_map.keys())) + ")")
-    
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            # 🎯 Caso 1: Placeholder de imagem
-            if shape.is_placeholder and shape.placeholder_format.type == PP_PLACEHOLDER.PICTURE:
-                left, top, width, height = shape.left, shape.top, shape.width, shape.height
-                sp = shape.element
-                parent = sp.getparent()
-                idx = parent.index(sp)
-
-                parent.remove(sp)
-
-                if os.path.exists(default_img):
-                    # Adiciona a nova imagem
-                    new_shape = slide.shapes.add_picture(default_img, left, top, width, height)
-                    
-                    # MODIFICAÇÃO DIRETA: Renomeia a image part
-                    _image_counter += 1
-                    timestamp = int(time.time() * 1000000)
-                    unique_suffix = f"{timestamp}_{_image_counter}"
-                    ext = os.path.splitext(default_img)[1]
-                    
-                    # Acessa a image part e modifica o nome
-                    try:
-                        # Pega a última relação (a imagem que acabamos de adicionar)
-                        rels = slide.part.rels
-                        last_rel_id = max([int(rid.replace('rId', '')) for rid in rels.keys()])
-                        last_rel = rels[f'rId{last_rel_id}']
-                        image_part = last_rel.target_part
-                        
-                        # Modifica o partname
-                        from pptx.opc.packuri import PackURI
-                        new_partname = PackURI(f"/ppt/media/image_{unique_suffix}{ext}")
-                        image_part._partname = new_partname
-                        
-                        print(f"🖼️ Imagem criada: image_{unique_suffix}{ext}")
-                    except Exception as e:
-                        print(f"⚠️ Erro ao renomear: {e}")
-                    
-                    # Move a imagem para a posição original
-                    new_sp = new_shape.element
-                    parent.remove(new_sp)
-                    parent.insert(idx, new_sp)
-                    
-                    time.sleep(0.001)  # Pequeno delay
-
-                else:
-                    print(f"⚠️ Imagem padrão não encontrada em {default_img}")
-                continue
-
-            # Resto do código continua igual...
-            if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-                print("🖼️ Shape já é uma imagem")
-                continue
+    ph_pattern = _placeholder_pattern(tuple(norm_map))
+    if index is None:
+        index = compile_placeholder_index(prs)
+
+    for slide, shape, entry in iter_indexed_shapes(prs, index):
+        # 🎯 Caso 1: Placeholder de imagem
+        if entry["kind"] == "picture":
+            left, top, width, height = shape.left, shape.top, shape.width, shape.height
+            sp = shape.element
+            parent = sp.getparent()
+            idx = parent.index(sp)
+
+            parent.remove(sp)
+
+            if default_img and os.path.exists(default_img):
+                # Reamostra para o tamanho do placeholder e adiciona a imagem
+                # (uma única image part por conteúdo, via SHA-256)
+                with span("image_insert", image=os.path.basename(default_img)):
+                    blob, filename = IMAGE_PIPELINE.prepare(default_img, width, height)
+                    image_part = get_or_add_image_blob(slide.part.package, blob, filename)
+                    rId = slide.part.relate_to(image_part, RT.IMAGE)
+                    new_sp = slide.shapes._add_pic_from_image_part(image_part, rId, left, top, width, height)
+                
+                # Move a imagem para a posição original
+                parent.remove(new_sp)
+                parent.insert(idx, new_sp)
+
+            else:
+                print(f"⚠️ Imagem padrão não encontrada em {default_img}")
+            continue
 
-            if not shape.has_text_frame:
+        text = entry["text"]
+        if not any(ph in text for ph in norm_map):
+            continue
+        
+        tokens = ph_pattern.split(text)
+        tf = shape.text_frame
+        box_width = text_box_width_pt(shape)
+        tf.clear()
+        p = tf.paragraphs[0]
+
+        for tok in tokens:
+            if not tok:
                 continue
 
-            text = shape.text_frame.text
-            if not any(ph in text for ph in norm_map):
-                continue
-            
-            tokens = ph_pattern.split(text)
-            tf = shape.text_frame
-            tf.clear()
-            p = tf.paragraphs[0]
-
-            for tok in tokens:
-                if not tok:
+            if tok in norm_map:
+                cfg = norm_map[tok]
+                key = cfg.get("key")
+                new_text = "\n".join(text_parts.get(key, []))
+                if not new_text:
                     continue
 
-                if tok in norm_map:
-                    cfg = norm_map[tok]
-                    key = cfg.get("key")
-                    new_text = "\n".join(text_parts.get(key, []))
-                    if not new_text:
-                        continue
-
-                    font_size, auto_line_spacing, _ = dynamic_font_size_simple(
-                        new_text,
-                        max_width_pt=395,
-                        max_height_pt=cfg.get("text-block-height", 505),
-                        max_caracteres=840
-                    )
-                    
-                    size_to_use = cfg.get("size", font_size)
-                    spacing_to_use = cfg.get("line_spacing", auto_line_spacing)
-
-                    run = p.add_run()
-                    run.text = new_text
-                    run.font.size = Pt(max(12, size_to_use))
-                    run.font.name = "Poppins" if cfg.get("bold", False) else "Poppins thin"
-
-                    run.font.bold = bool(cfg.get("bold", False))
-                    if "font" in cfg:
-                        run.font.name = cfg["font"]
-                    if "color" in cfg:
-                        run.font.color.rgb = hex_to_rgb(cfg["color"])
-                    
-                    p.line_spacing = cfg.get("line-height", min(1.2, spacing_to_use + 0.15))
-                    align_val = cfg.get("align")
-                    if align_val:
-                        if align_val.lower() == "left":
-                            p.alignment = PP_ALIGN.LEFT
-                        elif align_val.lower() == "center":
-                            p.alignment = PP_ALIGN.CENTER
-                        elif align_val.lower() == "right":
-                            p.alignment = PP_ALIGN.RIGHT
+                bold = bool(cfg.get("bold", False))
+                font_name = cfg.get("font", "Poppins" if bold else "Poppins thin")
+                spacing_to_use = cfg.get("line_spacing", auto_line_spacing(new_text))
+                line_height = cfg.get("line-height", min(1.2, spacing_to_use + 0.15))
 
+                if "size" in cfg:
+                    size_to_use = cfg["size"]
                 else:
-                    run = p.add_run()
-                    run.text = tok
-
-    prs.save(f"./concluded/{output_path}")
+                    # Exact fit from the font's glyph metrics at the rendered line height,
+                    # inside the shape's own text area
+                    with span("font_fit", key=key, chars=len(new_text)):
+                        size_to_use, _ = cached_fit_font_size(
+                            new_text,
+                            max_width_pt=cfg.get("text-block-width", box_width),
+                            max_height_pt=cfg.get("text-block-height", 505),
+                            face=resolve_face(font_name, bold),
+                            line_spacing=line_height
+                        )
+
+                run = p.add_run()
+                run.text = new_text
+                run.font.size = Pt(max(12, size_to_use))
+                run.font.name = font_name
+                run.font.bold = bold
+                if "color" in cfg:
+                    run.font.color.rgb = hex_to_rgb(cfg["color"])
+                
+                p.line_spacing = line_height
+                align_val = cfg.get("align")
+                if align_val:
+                    if align_val.lower() == "left":
+                        p.alignment = PP_ALIGN.LEFT
+                    elif align_val.lower() == "center":
+                        p.alignment = PP_ALIGN.CENTER
+                    elif align_val.lower() == "right":
+                        p.alignment = PP_ALIGN.RIGHT
+
+            else:
+                run = p.add_run()
+                run.text = tok
+
+    return prs
+
+
+def apply_text_to_slide(prs, placeholder_map, text_parts, output_path, img_path:str = None, index=None):
+    """
+    Apply parsed content into a presentation template and save it to ./concluded.
+    """
+    fill_presentation(prs, placeholder_map, text_parts, img_path, index)
+    save_presentation(prs, f"./concluded/{output_path}")
     print(f"💾 Saved: {output_path}")
 def build_carousel(post_text, template_mappings, output_path):
     """
@@ -300,14 +213,75 @@ def build_carousel(post_text, template_mappings, output_path):
         template_mappings (list): List of dicts with keys:
             - 'template': path to template file
             - 'blocks': mapping placeholders → config
+            - 'palette' (optional): colour variant of the template (see
+              `theme_variants.mappings_for_variant`)
         output_path (str): Base output filename (prefix will be added per template).
     """
     parts = parse_post(post_text)
 
     for idx, mapping in enumerate(template_mappings, start=1):
-        prs = Presentation(mapping["template"])
+        prs = load_template(mapping["template"], mapping.get("palette"))
         file_name = f"{idx}-{output_path}"
-        apply_text_to_slide(prs, mapping["blocks"], parts, file_name, mapping["image"])
+        apply_text_to_slide(prs, mapping["blocks"], parts, file_name, mapping["image"],
+                            index=load_placeholder_index(mapping["template"]))
+
+
+def build_carousel_in_memory(post_text, template_mappings, output_file):
+    """
+    Build the final carousel in a single pass, without the ./concluded round-trip.
+
+    Each template is filled in memory and its slides are appended straight into
+    one target presentation (the first filled template), which is saved once.
+
+    Args:
+        post_text (str): Full post text with section tags.
+        template_mappings (list): Same format as `build_carousel`.
+        output_file (str | file-like): Destination of the merged deck.
+
+    Returns:
+        Presentation: The merged presentation.
+    """
+    if not template_mappings:
+        raise ValueError("template_mappings is empty")
+
+    parts = parse_post(post_text)
+    merged_prs = None
+
+    for mapping in template_mappings:
+        with span("fill_template", template=os.path.basename(mapping["template"])):
+            prs = fill_presentation(load_template(mapping["template"], mapping.get("palette")), mapping["blocks"], parts, mapping["image"],
+                                    load_placeholder_index(mapping["template"]))
+        if merged_prs is None:
+            merged_prs = prs
+            continue
+        with span("append_slides", slides=len(prs.slides)):
+            append_slides(merged_prs, prs)
+
+    save_presentation(merged_prs, output_file)
+    print(f"🎉 Carousel saved as: {output_file} ({len(merged_prs.slides)} slides)")
+    return merged_prs
+
+def mappings_for_style(style_dir, mappings=None):
+    """
+    Point a set of template mappings at another style directory.
+
+    Template file names are kept; only their directory changes, so
+    `./templates/blue-blur/dark/Cover.pptx` becomes `{style_dir}/Cover.pptx`.
+
+    Args:
+        style_dir (str): Directory holding the style's templates.
+        mappings (list): Mappings to rewrite (defaults to `template_mappings`).
+
+    Returns:
+        list: New mapping dicts (the originals are not modified).
+    """
+    if mappings is None:
+        mappings = template_mappings
+    return [
+        {**mapping, "template": os.path.join(style_dir, os.path.basename(mapping["template"]))}
+        for mapping in mappings
+    ]
+
 
 template_mappings = [
     {"template": "./templates/blue-blur/dark/Cover.pptx",
@@ -435,5 +409,5 @@ Success will belong to those who combine data, reasoning, and execution.
 [IMAGE_BOTTOM_LEFT_CAP]
 🚀 Reasoning is the new ROI
 """
-build_carousel(post_text, template_mappings, "my_carousel.pptx")
-merge_pptx_slides('./concluded', './concluded/done/production-ready_images.pptx')
+if __name__ == "__main__":
+    build_carousel_in_memory(post_text, template_mappings, './concluded/done/production-ready_images.pptx')
@@ -0,0 +1,278 @@
+"""
+Batch Carousel Renderer
+-----------------------
+
+Render thousands of carousels from a JSONL file, one deck per post, fanned
+out across a process pool. Each line is a JSON object:
+
+    {"id": "post-001", "post": "[HOOK]\\n...", "style": "./templates/blue-blur/dark", "variant": "light", "output": "post-001.pptx"}
+
+Only "post" is required. "style" overrides the template directory,
+"variant" the colour variant (palette name or .json, see theme_variants)
+and "output" the deck file name. Decks are always written directly in
+--out-dir (directories in "output" or "id" are dropped), and a line whose
+deck name is already taken by an earlier line fails instead of
+overwriting it.
+
+A worker that dies (crash, OOM kill) fails only its own post: the pool is
+recreated and the posts that were in flight with it are retried once.
+
+Any other file is read as a multi-post text export (posts separated by
+"--- <id>" lines, see post_parser), streamed one post at a time.
+
+Usage:
+    python batch_render.py posts.jsonl --out-dir ./concluded/batch --workers 8
+    python batch_render.py export.txt --out-dir ./concluded/batch
+    python batch_render.py posts.jsonl --trace trace.json   # + trace.<pid>.json per worker
+    python batch_render.py posts.jsonl --variant light      # default variant for lines without one
+    python batch_render.py posts.jsonl --previews           # + PNG thumbnails per deck
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tracing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, ALL_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+
+def iter_jobs(jsonl_path: str):
+    """
+    Yield (line_no, job_dict) for every non-empty line of a JSONL file.
+    Lines that are not valid JSON are yielded as {"error": ...} so they are
+    reported per item instead of aborting the run.
+
+    Files not ending in .jsonl are parsed as multi-post exports; each post is
+    yielded with the line it starts on, and its parser diagnostics are
+    printed to stderr.
+    """
+    if not jsonl_path.endswith(".jsonl"):
+        from post_parser import iter_posts_file
+
+        for post in iter_posts_file(jsonl_path):
+            for diag in post["diagnostics"]:
+                print(f"⚠️ {jsonl_path}:{diag['line']}: {diag['message']}", file=sys.stderr)
+            job = {"post": post["text"]} if post["sections"] else {"error": "no sections found"}
+            if post["id"]:
+                job["id"] = post["id"]
+            yield post["line"], job
+        return
+
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                job = {"error": f"invalid JSON: {e}"}
+            yield line_no, job
+
+
+def output_name(line_no: int, job: dict) -> str:
+    """Deck file name of a job: its "output" (or "{id}.pptx"), without any directory part."""
+    name = os.path.basename(str(job.get("output") or f"{job.get('id', line_no)}.pptx"))
+    if name in ("", ".", ".."):
+        raise ValueError(f"invalid output name {job.get('output')!r}")
+    return name
+
+
+def render_job(line_no: int, job: dict, out_dir: str, default_style: str = None, previews: bool = False,
+               default_variant: str = None):
+    """
+    Render one post into one deck. Runs inside a worker process.
+
+    With `previews`, PNG thumbnails of the deck's slides are written to
+    `{out_dir}/previews/{deck name}-NN.png`.
+
+    Returns:
+        dict: {"line", "output", "ok", "error", "seconds"}
+    """
+    start = time.perf_counter()
+    result = {"line": line_no, "output": None, "ok": False, "error": None}
+    try:
+        if "error" in job:
+            raise ValueError(job["error"])
+        post = job.get("post") or job.get("post_text")
+        if not post:
+            raise ValueError("missing 'post'")
+
+        # Imported here so the parent process stays light
+        from append_template import build_carousel_in_memory, mappings_for_style, template_mappings
+
+        style = job.get("style") or default_style
+        mappings = mappings_for_style(style) if style else template_mappings
+        variant = job.get("variant") or default_variant
+        if variant:
+            from theme_variants import mappings_for_variant
+
+            mappings = mappings_for_variant(variant, mappings)
+        name = output_name(line_no, job)
+        output = os.path.join(out_dir, name)
+
+        with tracing.span("render_job", line=line_no, output=name):
+            prs = build_carousel_in_memory(post, mappings, output)
+        if previews:
+            from slide_preview import PREVIEWER
+
+            PREVIEWER.render_deck(prs, os.path.join(out_dir, "previews"), os.path.splitext(name)[0])
+        result.update(ok=True, output=output)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    _flush_fit_cache()
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def _flush_fit_cache():
+    """Write this worker's new font-fit results; pool workers never run atexit handlers."""
+    fit_cache = sys.modules.get("fit_cache")
+    if fit_cache is None:
+        return
+    try:
+        fit_cache.FIT_CACHE.flush()
+    except Exception as e:
+        print(f"⚠️ Font-fit cache not saved: {type(e).__name__}: {e}", file=sys.stderr)
+
+
+def run_batch(jsonl_path: str, out_dir: str, workers: int = None, max_in_flight: int = None,
+              default_style: str = None, previews: bool = False, default_variant: str = None):
+    """
+    Render every post of `jsonl_path` with a process pool.
+
+    Args:
+        jsonl_path (str): Input JSONL file, one post per line.
+        out_dir (str): Directory receiving the decks.
+        workers (int): Worker processes (defaults to os.cpu_count()).
+        max_in_flight (int): Max submitted-but-unfinished jobs (defaults to 2 × workers).
+        default_style (str): Template directory used when a line has no "style".
+        previews (bool): Also write PNG thumbnails of every deck (see slide_preview).
+        default_variant (str): Colour variant used when a line has no "variant".
+
+    Returns:
+        dict: Summary with totals, failures and throughput in decks/sec.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+    os.makedirs(out_dir, exist_ok=True)
+
+    ok, failed = 0, []
+    names = {}  # deck name -> line that claimed it
+    start = time.perf_counter()
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = {}  # future -> (line_no, job, attempt)
+
+    def fail(line_no, error):
+        failed.append({"line": line_no, "output": None, "ok": False, "error": error, "seconds": None})
+        print(f"❌ Line {line_no}: {error}", file=sys.stderr)
+
+    def submit(line_no, job, attempt=1):
+        args = (line_no, job, out_dir, default_style, previews, default_variant)
+        pending[pool.submit(render_job, *args)] = (line_no, job, attempt)
+
+    def collect(done, retry):
+        nonlocal ok
+        for future in done:
+            line_no, job, attempt = pending.pop(future)
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                # Every job in flight fails with the pool; the one that killed it is unknown
+                if attempt == 1:
+                    retry.append((line_no, job))
+                else:
+                    fail(line_no, "worker process died")
+                continue
+            except Exception as e:
+                fail(line_no, f"{type(e).__name__}: {e}")
+                continue
+            if result["ok"]:
+                ok += 1
+            else:
+                failed.append(result)
+                print(f"❌ Line {result['line']}: {result['error']}", file=sys.stderr)
+
+    def drain(return_when):
+        nonlocal pool
+        retry = []
+        collect(wait(pending, return_when=return_when)[0], retry)
+        if not retry:
+            return
+        # The rest of the broken pool's jobs end right away, with a result or the same error
+        collect(wait(pending)[0], retry)
+        print(f"⚠️ Worker pool died; retrying {len(retry)} post(s)", file=sys.stderr)
+        pool.shutdown(wait=False)
+        # One post at a time, so a post that crashes again takes only itself down
+        for line_no, job in retry:
+            pool = ProcessPoolExecutor(max_workers=1)
+            submit(line_no, job, attempt=2)
+            collect(wait(pending)[0], [])
+            pool.shutdown(wait=False)
+        pool = ProcessPoolExecutor(max_workers=workers)
+
+    try:
+        for line_no, job in iter_jobs(jsonl_path):
+            if "error" not in job:
+                try:
+                    name = output_name(line_no, job)
+                except ValueError as e:
+                    fail(line_no, f"ValueError: {e}")
+                    continue
+                if name in names:
+                    fail(line_no, f"output {name!r} already used by line {names[name]}")
+                    continue
+                names[name] = line_no
+            while len(pending) >= max_in_flight:
+                drain(FIRST_COMPLETED)
+            submit(line_no, job)
+
+        while pending:
+            drain(ALL_COMPLETED)
+    finally:
+        pool.shutdown()
+
+    elapsed = time.perf_counter() - start
+    total = ok + len(failed)
+    return {
+        "total": total,
+        "ok": ok,
+        "failed": len(failed),
+        "errors": failed,
+        "seconds": round(elapsed, 3),
+        "decks_per_sec": round(ok / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render carousels from a JSONL file of posts.")
+    parser.add_argument("jsonl", help="Input JSONL file, one post per line")
+    parser.add_argument("--out-dir", default="./concluded/batch", help="Output directory for decks")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="Max queued jobs (default: 2 × workers)")
+    parser.add_argument("--style", default=None, help="Default template directory")
+    parser.add_argument("--variant", default=None, help="Default colour variant (palette name or .json)")
+    parser.add_argument("--previews", action="store_true", help="Write PNG thumbnails to <out-dir>/previews")
+    parser.add_argument("--trace", default=None, help="Write a Chrome trace (one file per worker) and a stage summary")
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        tracing.configure(args.trace)
+    if not os.path.exists(args.jsonl):
+        print(f"❌ Error: File '{args.jsonl}' not found")
+        return 1
+
+    summary = run_batch(args.jsonl, args.out_dir, args.workers, args.max_in_flight, args.style,
+                        args.previews, args.variant)
+    print(f"\n🎉 Rendered {summary['ok']}/{summary['total']} deck(s) in {summary['seconds']}s")
+    print(f"📊 Throughput: {summary['decks_per_sec']} decks/sec")
+    if summary["failed"]:
+        print(f"⚠️  {summary['failed']} post(s) failed")
+    return 0 if not summary["failed"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
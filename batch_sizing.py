@@ -0,0 +1,153 @@
+"""
+Batch Font Sizing
+-----------------
+
+Array version of the glyph-metric fitter rendering uses
+(`font_metrics.fit_font_size`, through `fit_cache.cached_fit_font_size`),
+for planning the layout of a whole batch of posts at once. Word widths are
+measured once per distinct (face, word); then every text advances through
+the size search together, and each candidate size wraps all texts in
+lockstep, one word position at a time, as NumPy arrays.
+
+Results are identical to `fit_font_size` for every text: the wrap performs
+the same floating-point operations, in the same order.
+
+NumPy is only needed by this module (`pip install numpy`).
+"""
+
+from font_metrics import get_metrics
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("batch_sizing needs NumPy: pip install numpy") from e
+    return numpy
+
+
+# Word kinds in the token grid
+_PAD, _WORD, _FIRST_WORD, _EMPTY_PARAGRAPH = 0, 1, 2, 3
+
+
+def _token_grid(np, texts, faces):
+    """
+    Lay every text out as a row of word widths (em) and word kinds, padded
+    to the longest text; each new paragraph is marked on its first word (or
+    by an empty-paragraph token).
+    """
+    measured = {}
+    rows = []
+    for text, face in zip(texts, faces):
+        metrics = get_metrics(face)
+        row = []
+        for paragraph in text.strip().split("\n"):
+            words = paragraph.split()
+            if not words:
+                row.append((_EMPTY_PARAGRAPH, 0.0))
+                continue
+            for i, word in enumerate(words):
+                key = (face, word)
+                width = measured.get(key)
+                if width is None:
+                    width = measured[key] = metrics.measure(word)
+                row.append((_FIRST_WORD if i == 0 else _WORD, width))
+        rows.append(row)
+
+    length = max((len(row) for row in rows), default=0)
+    kinds = np.zeros((len(rows), length), dtype=np.int8)
+    widths = np.zeros((len(rows), length), dtype=np.float64)
+    for r, row in enumerate(rows):
+        if row:
+            kinds[r, :len(row)] = [kind for kind, _ in row]
+            widths[r, :len(row)] = [width for _, width in row]
+    return kinds, widths
+
+
+def _count_lines(np, kinds, widths, space_em, max_width_em):
+    """`font_metrics._count_lines` for every row of the token grid at once."""
+    count = kinds.shape[0]
+    lines = np.zeros(count, dtype=np.int64)
+    current = np.zeros(count, dtype=np.float64)
+
+    for j in range(kinds.shape[1]):
+        kind = kinds[:, j]
+        w = widths[:, j]
+        lines += (kind == _EMPTY_PARAGRAPH) | (kind == _FIRST_WORD)
+        current = np.where(kind == _FIRST_WORD, -space_em, current)
+
+        word = (kind == _WORD) | (kind == _FIRST_WORD)
+        long = word & (w > max_width_em)
+        short = word & ~long
+
+        # Word longer than the box: broken across lines
+        extra = np.where(long, np.ceil(w / max_width_em) - 1, 0).astype(np.int64)
+        lines += np.where(long, (current > 0).astype(np.int64) + extra, 0)
+
+        fits = (current + space_em) + w <= max_width_em
+        lines += short & ~fits
+        current = np.where(long, w - extra * max_width_em,
+                           np.where(short, np.where(fits, current + (space_em + w), w), current))
+    return lines
+
+
+def fit_font_size_batch(
+    texts,
+    max_width_pt=395,
+    max_height_pt=505,
+    face="Poppins-Bold.ttf",
+    line_spacing=1.0,
+    min_font_size=17,
+    max_font_size=110
+):
+    """
+    `font_metrics.fit_font_size` for many texts at once.
+
+    Every argument after `texts` may be a scalar or a sequence with one
+    value per text (`face` too).
+
+    Args:
+        texts (sequence of str): Contents to fit. Newlines start new paragraphs.
+        max_width_pt (float | array): Width of each bounding box in points.
+        max_height_pt (float | array): Height of each bounding box in points.
+        face (str | sequence of str): Font file name(s) (see `resolve_face`).
+        line_spacing (float | array): Line spacing multiple of each paragraph.
+        min_font_size (int | array): Minimum font size allowed.
+        max_font_size (int | array): Maximum font size allowed.
+
+    Returns:
+        tuple: (font_sizes: int64 array, overflow_flags: int8 array), one
+        entry per text.
+    """
+    np = _numpy()
+    texts = list(texts)
+    count = len(texts)
+    faces = [face] * count if isinstance(face, str) else list(face)
+
+    def column(value, dtype=np.float64):
+        return np.broadcast_to(np.asarray(value, dtype=dtype), (count,))
+
+    kinds, widths = _token_grid(np, texts, faces)
+    metrics = {f: get_metrics(f) for f in set(faces)}
+    space_em = np.array([metrics[f].measure(" ") for f in faces], dtype=np.float64)
+    pitch_em = np.array([metrics[f].line_height for f in faces], dtype=np.float64) * column(line_spacing)
+    width = column(max_width_pt)
+    height = column(max_height_pt)
+
+    def fits(size):
+        lines = _count_lines(np, kinds, widths, space_em, width / size)
+        return lines * size * pitch_em <= height
+
+    low = column(min_font_size, np.int64).copy()
+    high = column(max_font_size, np.int64).copy()
+    overflow = ~fits(low)
+    high = np.where(overflow, low, high)
+
+    active = low < high
+    while active.any():
+        mid = np.where(active, (low + high + 1) // 2, low)
+        ok = fits(mid)
+        low = np.where(active & ok, mid, low)
+        high = np.where(active & ~ok, mid - 1, high)
+        active = low < high
+    return low, overflow.astype(np.int8)
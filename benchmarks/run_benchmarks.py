@@ -0,0 +1,387 @@
+"""
+Benchmark Suite
+---------------
+
+Measures wall time, peak RSS and output size of the carousel pipeline on
+synthetic templates, across slide count, placeholder count, image count /
+size and post length. Results are written as JSON so runs can be compared.
+
+Each case runs in a freshly spawned interpreter, so "peak_rss_mb" is that
+case's own peak, including the interpreter and the imported modules;
+"setup_rss_mb" is the peak before the timed runs. On Linux the peak is the
+process's VmHWM, which exec resets; getrusage's ru_maxrss is kept across
+fork and exec, so it would report at least the parent's peak.
+
+Usage:
+    python benchmarks/run_benchmarks.py --out bench.json
+    python benchmarks/run_benchmarks.py --slides 1,10,40 --images 0,3 --image-px 2048x1536
+    python benchmarks/run_benchmarks.py --compare old.json --out new.json
+    python benchmarks/run_benchmarks.py --cases import_time --modules append_template,batch_render
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import subprocess
+import platform
+import resource
+import tempfile
+import statistics
+import contextlib
+import multiprocessing as mp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pptx
+import synthetic
+import fit_cache
+import font_metrics
+import append_template
+import fill_carousel
+import merge_templates
+import split_templates
+
+# Entry points whose cold import time is tracked by the import_time case
+STARTUP_MODULES = ["append_template", "batch_render", "render_server", "merge_templates",
+                   "split_templates", "fill_carousel"]
+
+# append_template's section names, usable as placeholder tokens
+SECTION_NAMES = sorted(s for s in append_template.SECTIONS)
+
+
+def _dir_bytes(path: str) -> int:
+    total = 0
+    for base, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(base, f)) for f in files if f.endswith(".pptx"))
+    return total
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 2)
+    except OSError:
+        pass
+    # Not Linux: may include the high-water mark of the process that started this one
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 2)
+
+
+# ---------------------------------------------------------------------------
+# Cases: setup(workdir, params) -> ctx, run(ctx) -> output bytes (or None)
+# ---------------------------------------------------------------------------
+
+def _setup_post(workdir, p):
+    return {"post": synthetic.make_post(SECTION_NAMES, p["post_chars"]), "n": p.get("calls", 200)}
+
+
+def _run_parse_post(ctx):
+    for _ in range(ctx["n"]):
+        append_template.parse_post(ctx["post"])
+
+
+def _run_parse_post_legacy(ctx):
+    for _ in range(ctx["n"]):
+        fill_carousel.parse_post(ctx["post"])
+
+
+def _setup_texts(workdir, p):
+    n = p.get("calls", 200)
+    return {"texts": [synthetic.make_text(p["post_chars"], seed=i) for i in range(n)]}
+
+
+def _run_fit_font_size(ctx):
+    for text in ctx["texts"]:
+        font_metrics.fit_font_size(text, 395, 505)
+
+
+def _run_fit_cold(ctx):
+    # A new, empty cache every run: every text is a miss
+    cache = fit_cache.FitCache()
+    for text in ctx["texts"]:
+        cache.fit(text, 395, 505)
+
+
+def _setup_fit_warm(workdir, p):
+    ctx = _setup_texts(workdir, p)
+    ctx["cache"] = fit_cache.FitCache()
+    _run_fit_warm(ctx)
+    return ctx
+
+
+def _run_fit_warm(ctx):
+    for text in ctx["texts"]:
+        ctx["cache"].fit(text, 395, 505)
+
+
+def _run_font_size_batch(ctx):
+    import batch_sizing
+    batch_sizing.fit_font_size_batch(ctx["texts"], 395, 505)
+
+
+def _template_mappings(workdir, p, count):
+    tokens = [f"[{name}]" for name in SECTION_NAMES[:max(1, p["placeholders"])]]
+    mappings = []
+    for t in range(count):
+        path = os.path.join(workdir, f"template_{t}.pptx")
+        if not os.path.exists(path):
+            synthetic.make_template(path, slides=p["slides"], placeholders=p["placeholders"],
+                                    images=p["images"], image_px=p["image_px"], tokens=tokens, seed=t)
+        mappings.append({
+            "template": path,
+            "image": None,
+            "blocks": {tok: {"key": tok.strip("[]"), "bold": i == 0} for i, tok in enumerate(tokens)},
+        })
+    return mappings
+
+
+def _setup_apply(workdir, p):
+    mapping = _template_mappings(workdir, p, 1)[0]
+    os.makedirs(os.path.join(workdir, "concluded"), exist_ok=True)
+    return {
+        "workdir": workdir,
+        "mapping": mapping,
+        "parts": append_template.parse_post(synthetic.make_post(SECTION_NAMES, p["post_chars"])),
+    }
+
+
+def _run_apply(ctx):
+    from pptx import Presentation
+    m = ctx["mapping"]
+    prs = Presentation(m["template"])
+    append_template.apply_text_to_slide(prs, m["blocks"], ctx["parts"], "apply.pptx", m["image"])
+    return os.path.getsize(os.path.join(ctx["workdir"], "concluded", "apply.pptx"))
+
+
+def _setup_build(workdir, p):
+    os.makedirs(os.path.join(workdir, "concluded"), exist_ok=True)
+    return {
+        "workdir": workdir,
+        "mappings": _template_mappings(workdir, p, p.get("templates", 4)),
+        "post": synthetic.make_post(SECTION_NAMES, p["post_chars"]),
+    }
+
+
+def _run_build(ctx):
+    concluded = os.path.join(ctx["workdir"], "concluded")
+    shutil.rmtree(concluded)
+    os.makedirs(concluded)
+    append_template.build_carousel(ctx["post"], ctx["mappings"], "deck.pptx")
+    return _dir_bytes(concluded)
+
+
+def _run_build_in_memory(ctx):
+    out = os.path.join(ctx["workdir"], "deck.pptx")
+    append_template.build_carousel_in_memory(ctx["post"], ctx["mappings"], out)
+    return os.path.getsize(out)
+
+
+def _setup_merge(workdir, p):
+    ctx = _setup_build(workdir, p)
+    _run_build(ctx)
+    ctx["input_dir"] = os.path.join(workdir, "concluded")
+    return ctx
+
+
+def _run_merge(ctx):
+    out = os.path.join(ctx["workdir"], "merged.pptx")
+    merge_templates.merge_pptx_slides(ctx["input_dir"], out)
+    return os.path.getsize(out)
+
+
+def _setup_split(workdir, p):
+    src_dir = os.path.join(workdir, "split")
+    os.makedirs(src_dir, exist_ok=True)
+    synthetic.make_template(os.path.join(src_dir, "bench-source.pptx"), slides=p["slides"],
+                            placeholders=p["placeholders"], images=p["images"],
+                            image_px=p["image_px"], image_dir=workdir)
+    return {"src_dir": src_dir}
+
+
+def _run_split(ctx):
+    out_dir = os.path.join(ctx["src_dir"], "bench")
+    shutil.rmtree(out_dir, ignore_errors=True)
+    split_templates.split_pptx_by_layout(ctx["src_dir"])
+    return _dir_bytes(out_dir)
+
+
+def _setup_import(workdir, p):
+    return {"module": p["module"]}
+
+
+def _run_import(ctx):
+    # Fresh interpreter each time: measures cold startup, not the warm parent
+    subprocess.run([sys.executable, "-c", f"import {ctx['module']}"], cwd=ROOT, check=True)
+
+
+CASES = {
+    "import_time": (_setup_import, _run_import, "startup"),
+    "parse_post": (_setup_post, _run_parse_post, "text"),
+    "parse_post_legacy": (_setup_post, _run_parse_post_legacy, "text"),
+    "fit_font_size": (_setup_texts, _run_fit_font_size, "text"),
+    "cached_fit_font_size_cold": (_setup_texts, _run_fit_cold, "text"),
+    "cached_fit_font_size_warm": (_setup_fit_warm, _run_fit_warm, "text"),
+    "fit_font_size_batch": (_setup_texts, _run_font_size_batch, "text"),
+    "apply_text_to_slide": (_setup_apply, _run_apply, "deck"),
+    "build_carousel": (_setup_build, _run_build, "deck"),
+    "build_carousel_in_memory": (_setup_build, _run_build_in_memory, "deck"),
+    "merge_pptx_slides": (_setup_merge, _run_merge, "deck"),
+    "split_pptx_by_layout": (_setup_split, _run_split, "deck"),
+}
+
+
+def _child(name, params, repeat, queue):
+    """Run one case in a freshly spawned process so peak RSS is per case."""
+    setup, run, _ = CASES[name]
+    workdir = tempfile.mkdtemp(prefix="carousel-bench-")
+    try:
+        os.chdir(workdir)
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            ctx = setup(workdir, params)
+            rss_before = _peak_rss_mb()
+            times, output = [], None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                output = run(ctx)
+                times.append(time.perf_counter() - start)
+        queue.put({"times": times, "output_bytes": output,
+                   "peak_rss_mb": _peak_rss_mb(), "setup_rss_mb": rss_before})
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_case(name, params, repeat=3):
+    """
+    Run a benchmark case and return its result record.
+
+    Returns:
+        dict: {"name", "params", "wall_s": {"min", "median", "mean"}, "peak_rss_mb",
+        "setup_rss_mb" (peak before the timed runs), "output_bytes"}
+    """
+    # Not "fork": the child would start with the parent's memory (and peak)
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(name, params, repeat, queue))
+    proc.start()
+    out = queue.get()
+    proc.join()
+
+    record = {"name": name, "params": params}
+    if "error" in out:
+        record["error"] = out["error"]
+        return record
+    times = out["times"]
+    record.update(
+        wall_s={"min": round(min(times), 6), "median": round(statistics.median(times), 6),
+                "mean": round(statistics.mean(times), 6)},
+        peak_rss_mb=out["peak_rss_mb"],
+        setup_rss_mb=out["setup_rss_mb"],
+        output_bytes=out["output_bytes"],
+    )
+    return record
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def _px(value):
+    w, h = value.lower().split("x")
+    return (int(w), int(h))
+
+
+def build_matrix(args):
+    """Expand the CLI parameter lists into (case, params) pairs."""
+    selected = args.cases.split(",") if args.cases else list(CASES)
+    matrix = []
+    for name in selected:
+        kind = CASES[name][2]
+        if kind == "startup":
+            for module in args.modules:
+                matrix.append((name, {"module": module}))
+            continue
+        if kind == "text":
+            for chars in args.post_chars:
+                matrix.append((name, {"post_chars": chars, "calls": args.calls}))
+            continue
+        for slides in args.slides:
+            for images in args.images:
+                for chars in args.post_chars:
+                    matrix.append((name, {
+                        "slides": slides, "placeholders": args.placeholders, "images": images,
+                        "image_px": args.image_px, "post_chars": chars, "templates": args.templates,
+                    }))
+    return matrix
+
+
+def compare(old_path: str, results: list):
+    """Print median wall time of each result against the matching record of an older run."""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in json.load(f)["results"]}
+    print(f"\n{'case':34} {'params':60} {'old s':>10} {'new s':>10} {'ratio':>7}")
+    for r in results:
+        prev = old.get((r["name"], json.dumps(r["params"], sort_keys=True)))
+        if not prev or "wall_s" not in prev or "wall_s" not in r:
+            continue
+        a, b = prev["wall_s"]["median"], r["wall_s"]["median"]
+        print(f"{r['name']:34} {json.dumps(r['params'], sort_keys=True)[:60]:60} {a:10.4f} {b:10.4f} {b / a if a else 0:7.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the carousel pipeline on synthetic templates.")
+    parser.add_argument("--cases", default=None, help=f"Comma-separated subset of: {','.join(CASES)}")
+    parser.add_argument("--slides", type=_int_list, default=[1, 10], help="Slides per template (N)")
+    parser.add_argument("--placeholders", type=int, default=3, help="Placeholders per slide (M)")
+    parser.add_argument("--images", type=_int_list, default=[0, 2], help="Images per slide (K)")
+    parser.add_argument("--image-px", type=_px, default=(1024, 768), help="Image size, e.g. 1024x768")
+    parser.add_argument("--post-chars", type=_int_list, default=[80, 800], help="Characters per post section")
+    parser.add_argument("--templates", type=int, default=4, help="Templates per carousel (build/merge)")
+    parser.add_argument("--calls", type=int, default=200, help="Calls per timing for text-only cases")
+    parser.add_argument("--modules", type=lambda v: [m for m in v.split(",") if m],
+                        default=STARTUP_MODULES, help="Modules timed by the import_time case")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per case")
+    parser.add_argument("--out", default="bench_results.json", help="JSON results file")
+    parser.add_argument("--compare", default=None, help="Previous JSON results to compare against")
+    args = parser.parse_args(argv)
+    args.out = os.path.abspath(args.out)
+    if args.compare:
+        args.compare = os.path.abspath(args.compare)
+
+    results = []
+    for name, params in build_matrix(args):
+        record = run_case(name, params, args.repeat)
+        results.append(record)
+        if "error" in record:
+            print(f"❌ {name} {params}: {record['error']}")
+        else:
+            print(f"⏱️  {name:34} median {record['wall_s']['median']:.4f}s  "
+                  f"rss {record['peak_rss_mb']:.1f}MB  out {record['output_bytes'] or 0} B  {params}")
+
+    meta = {
+        "python": platform.python_version(),
+        "python_pptx": pptx.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\n💾 Results saved: {args.out}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
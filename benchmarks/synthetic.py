@@ -0,0 +1,99 @@
+"""
+Synthetic Template Generator
+----------------------------
+
+Builds benchmark inputs locally: templates with N slides, M placeholder text
+boxes per slide and K embedded images of a configurable pixel size, plus
+posts of a given length that fill those placeholders.
+"""
+
+import os
+import random
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Emu
+
+
+# Same slide geometry as the carousel templates (portrait 1080x1350 @ 96 dpi)
+SLIDE_WIDTH = Emu(10287000)
+SLIDE_HEIGHT = Emu(12858750)
+
+WORDS = (
+    "data agents reasoning models marketing budget insight execution customer value "
+    "strategy growth decisions efficiency teams scale automation trust platform impact"
+).split()
+
+
+def make_image(path: str, width: int, height: int, seed: int = 0):
+    """Write a noisy RGB PNG (hard to compress, like a photo) of width × height pixels."""
+    rng = random.Random(seed)
+    img = Image.frombytes("RGB", (width, height), rng.randbytes(width * height * 3))
+    img.save(path, "PNG")
+    return path
+
+
+def make_text(chars: int, seed: int = 0) -> str:
+    """Return roughly `chars` characters of word-like text."""
+    rng = random.Random(seed)
+    words, length = [], 0
+    while length < chars:
+        w = rng.choice(WORDS)
+        words.append(w)
+        length += len(w) + 1
+    return " ".join(words)[:max(1, chars)]
+
+
+def make_template(path: str, slides: int = 1, placeholders: int = 3, images: int = 0,
+                  image_px=(1024, 768), tokens=None, picture_placeholder: bool = False,
+                  seed: int = 0, image_dir: str = None):
+    """
+    Generate a .pptx template.
+
+    Args:
+        path (str): Output file.
+        slides (int): Number of slides (N).
+        placeholders (int): Text boxes per slide (M), each holding one token.
+        images (int): Distinct images embedded per slide (K).
+        image_px (tuple): (width, height) of every generated image in pixels.
+        tokens (list): Placeholder tokens to cycle through (default [PH_0], [PH_1], ...).
+        picture_placeholder (bool): Use the "Picture with Caption" layout, so each
+            slide also carries a picture placeholder.
+        seed (int): Random seed for image content.
+        image_dir (str): Where generated images are written (default: next to `path`).
+
+    Returns:
+        str: `path`.
+    """
+    tokens = tokens or [f"[PH_{i}]" for i in range(placeholders)]
+    image_dir = image_dir or os.path.dirname(os.path.abspath(path))
+
+    prs = Presentation()
+    prs.slide_width, prs.slide_height = SLIDE_WIDTH, SLIDE_HEIGHT
+    layout = prs.slide_layouts[8] if picture_placeholder else prs.slide_layouts[6]
+    box_h = int(SLIDE_HEIGHT * 0.8 / max(1, placeholders))
+
+    for s in range(slides):
+        slide = prs.slides.add_slide(layout)
+        for shape in list(slide.placeholders):
+            if shape.placeholder_format.type != 18:  # keep only PICTURE placeholders
+                shape.element.getparent().remove(shape.element)
+
+        for k in range(images):
+            img_path = os.path.join(image_dir, f"bench_{seed}_{s}_{k}_{image_px[0]}x{image_px[1]}.png")
+            if not os.path.exists(img_path):
+                make_image(img_path, image_px[0], image_px[1], seed=hash((seed, s, k)) & 0xFFFF)
+            slide.shapes.add_picture(img_path, Emu(0), Emu(int(SLIDE_HEIGHT * k / max(1, images))),
+                                     SLIDE_WIDTH, Emu(int(SLIDE_HEIGHT / max(1, images))))
+
+        for m in range(placeholders):
+            box = slide.shapes.add_textbox(Emu(457200), Emu(457200 + m * box_h),
+                                           Emu(int(SLIDE_WIDTH) - 914400), Emu(box_h))
+            box.text_frame.text = tokens[m % len(tokens)]
+
+    prs.save(path)
+    return path
+
+
+def make_post(sections, chars_per_section: int = 80, seed: int = 0) -> str:
+    """Return a tagged post with one block of text per section name."""
+    return "\n".join(f"[{name}]\n{make_text(chars_per_section, seed + i)}" for i, name in enumerate(sections))
@@ -1,33 +1,24 @@
 import os 
-from pptx import Presentation
-from pptx.util import Pt
-import re,math
-from PIL import ImageFont
-from pptx.dml.color import RGBColor
+import re
+from font_metrics import resolve_face, text_box_width_pt
+from fit_cache import cached_fit_font_size
+import post_parser
+from tracing import span
 
-font_bold = ImageFont.truetype("./fonts/poppins/Poppins-Bold.ttf", size=80)
 
 SECTIONS = ["HOOK", "HOOK_SUB", "STORY", "INSIGHT", "VALUE", "CTA"]
 
 def parse_post(post_text: str):
-    """Parse post sections like [HOOK], [STORY], etc."""
-    parts = {}
-    current = None
-    for line in post_text.splitlines():
-        line = line.strip()
-        tag = line.strip("[]").upper()
-        if tag in SECTIONS:
-            current = tag
-            parts[current] = []
-        elif current and line:
-            parts[current].append(line)
-    return parts
+    """Parse post sections like [HOOK], [STORY], etc. (brackets optional)."""
+    return post_parser.parse_post(post_text, sections=SECTIONS, bare_tags=True)
 
 def hex_to_rgb(hex_color:str = "#000"):
     """
     Converte cor hexadecimal para RGBColor.
     Aceita: "#fff", "#ffffff", "fff", "ffffff"
     """
+    from pptx.dml.color import RGBColor
+
     hex_color = hex_color.lstrip('#')
     
     # Se for formato curto (#fff), expande para #ffffff
@@ -41,84 +32,10 @@ def hex_to_rgb(hex_color:str = "#000"):
     
     return RGBColor(r, g, b)
 
-def dynamic_font_size_simple(text, max_width_pt=505, max_height_pt=395,
-                              base_line_spacing=0.85, min_font_size=17, 
-                              max_font_size=110, max_caracteres=840):
-    """
-    Versão simplificada que usa estimativas matemáticas.
-    Mais rápida mas menos precisa.
-    MAX x caracteres, based on the box size
-    Elegant logarithmic font scaling tuned for visual balance:
-      • 25 chars → ~110 pt
-      • 50 chars → ~82 pt
-      • 80 chars → ~50 pt
-      • 110 chars → ~42 pt
-    """
-    num_chars = len(text.strip())
-    print(num_chars)
-    words = text.split()
-    avg_word_length = num_chars / max(1, len(words))
-    
-    # Estimativa de caracteres por linha (0.5 é a proporção média char_width/font_size)
-    def chars_per_line(font_size):
-        avg_char_width = font_size * (1.1 if num_chars > 120 else 1.25) # adjust to big letters
-        print(avg_char_width)
-        return int(max_width_pt / avg_char_width)
-    
-    # Busca binária
-    low, high = min_font_size, max_font_size
-    best_size = min_font_size
-    
-    for _ in range(20):
-        mid = (low + high) / 2
-        cpl = chars_per_line(mid)
-        estimated_lines = math.floor(num_chars / cpl)
-        estimated_height = estimated_lines * mid * base_line_spacing
-        if estimated_height <= max_height_pt:
-            best_size = mid
-            low = mid + 1
-            print(high)
-        else:
-            high = mid - 1
-    
-    # Ajuste fino do line spacing
-    line_spacing = base_line_spacing
-    print(base_line_spacing)
-    if num_chars > 100:
-        line_spacing = min(1.0, base_line_spacing + 0.1)
-    # else: 
-    #     line_spacing = min(1.0, base_line_spacing + 0.05)
-    
-    return math.floor(best_size), round(line_spacing, 2), 1 if num_chars > max_caracteres else 0
-
-def dynamic_font_size_and_spacing(text, base_line_height=0.8):
-    """
-    Elegant logarithmic font scaling tuned for visual balance:
-      • 25 chars → ~110 pt
-      • 50 chars → ~82 pt
-      • 80 chars → ~50 pt
-      • 110 chars → ~42 pt
-    """
-    num_chars = max(1, len(text.strip()))
-    print(len(text))
-    print(num_chars)
-
-    # Tuned constants (steeper decay)
-    A = 160   # intercept — base size for very short text
-    B = 25    # decay rate constant
-
-    # Smooth logarithmic decay
-    font_size_pt = A - B * math.log(num_chars-10)
-
-    # Clamp for safety
-    font_size_pt = max(25, min(font_size_pt, 110))
-
-    # Line height increases gently for long text
-    line_spacing = min(0.9, base_line_height + (num_chars / 60) * 0.15)
-
-    return round(font_size_pt, 2), round(line_spacing, 2)
-
 def fill_carousel(post_text, template_path="brand_carousel_template_portrait.pptx", output_path="carousel_filled.pptx"):
+    from pptx import Presentation
+    from pptx.util import Pt
+
     prs = Presentation(template_path)
     parts = parse_post(post_text)
     slides = prs.slides
@@ -148,15 +65,8 @@ def fill_carousel(post_text, template_path="brand_carousel_template_portrait.ppt
         new_hook = "\n".join(parts.get("HOOK", []))
         new_hook_sub = "\n".join(parts.get("HOOK_SUB", []))
         hook_text = new_hook.strip()
-
-        # 🧠 Dynamically calculate font size and line spacing
-        font_size, line_spacing, passed = dynamic_font_size_simple(
-                hook_text,
-                max_width_pt=395,
-                max_height_pt=480,
-                max_caracteres=840
-            )
-        print("FALSE" if passed else "True")
+        # Slightly looser lines for long hooks
+        line_spacing = 0.95 if len(hook_text) > 100 else 0.85
 
         for shape in slides[0].shapes:
             if not shape.has_text_frame:
@@ -172,6 +82,18 @@ def fill_carousel(post_text, template_path="brand_carousel_template_portrait.ppt
 
             # 🖋️ If replacements occurred → apply styles
             if new_text != text:
+                # 🧠 Same glyph-metric fit as append_template, inside this shape's text area
+                with span("font_fit", key="HOOK", chars=len(hook_text)):
+                    font_size, overflow = cached_fit_font_size(
+                        hook_text,
+                        max_width_pt=text_box_width_pt(shape),
+                        max_height_pt=480,
+                        face=resolve_face("Poppins", True),
+                        line_spacing=line_spacing
+                    )
+                if overflow:
+                    print(f"⚠️ HOOK does not fit its box even at {font_size}pt; text may overflow")
+
                 shape.text_frame.text = new_text
 
                 for paragraph in shape.text_frame.paragraphs:
@@ -189,7 +111,6 @@ def fill_carousel(post_text, template_path="brand_carousel_template_portrait.ppt
                         elif new_hook_sub in run.text:
                             # 70% of hook size, minimum 18pt
                             sub_size = max(18, 20)
-                            print(sub_size)
                             run.font.size = Pt(sub_size)
                             run.font.bold = False
                             run.font.name = "Poppins thin"
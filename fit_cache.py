@@ -0,0 +1,201 @@
+"""
+Font-Fit Result Cache
+---------------------
+
+Memoizes `fit_font_size` results keyed on (normalized text, box width/height,
+font face and a digest of its metrics tables, min/max size, line spacing),
+so results computed with other metrics (a rebuilt metrics file, a changed
+font) are never returned. Two tiers:
+
+  • an in-memory LRU, always on;
+  • an optional SQLite file that survives restarts, enabled by passing a path
+    or setting the CAROUSEL_FIT_CACHE environment variable.
+
+Hit/miss counters for both tiers are exposed through `stats()`.
+
+The SQLite file may be shared by many processes (batch and server
+workers): new results are buffered in memory and written in one short
+`BEGIN IMMEDIATE` transaction per batch, so no process holds the write
+lock between calls. Processes that exit without running `atexit` handlers
+(pool workers, forked server workers) must call `flush()` themselves.
+"""
+
+import os
+import time
+import atexit
+import sqlite3
+import threading
+from collections import OrderedDict
+from font_metrics import fit_font_size, get_metrics
+
+
+# Bump when the fitter's results change, so stale on-disk entries are ignored
+FIT_VERSION = 1
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace the way the wrapper sees it (words and paragraphs)."""
+    return "\n".join(" ".join(line.split()) for line in text.strip().split("\n"))
+
+
+def _retry_locked(operation, attempts: int = 50, delay: float = 0.05):
+    """Run `operation`, retrying while another process holds the SQLite lock."""
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) or attempt == attempts - 1:
+                raise
+            time.sleep(delay)
+
+
+class FitCache:
+    """
+    Two-tier cache of font-fit results.
+
+    Args:
+        path (str): Optional SQLite file for the persistent tier.
+        max_entries (int): Size of the in-memory LRU tier.
+        commit_every (int): Number of new results buffered per disk write.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 4096, commit_every: int = 64):
+        self.path = path
+        self.max_entries = max_entries
+        self.commit_every = commit_every
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self._pending = {}  # db key -> (font_size, overflow), not yet written
+        if path:
+            atexit.register(self.flush)
+
+    def _db(self):
+        """Open the SQLite tier lazily (and again after a fork)."""
+        if not self.path:
+            return None
+        if self._conn is None or self._conn_pid != os.getpid():
+            # Autocommit: reads never leave a transaction (and its locks) open
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            # Switching to WAL needs an exclusive lock and does not wait on the busy
+            # timeout, so processes opening a fresh file at once retry it
+            _retry_locked(lambda: conn.execute("PRAGMA journal_mode=WAL"))
+            conn.execute("PRAGMA synchronous=NORMAL")
+            _retry_locked(lambda: conn.execute(
+                "CREATE TABLE IF NOT EXISTS fits ("
+                "key TEXT PRIMARY KEY, font_size INTEGER NOT NULL, overflow INTEGER NOT NULL)"
+            ))
+            self._conn = conn
+            self._conn_pid = os.getpid()
+            self._pending = {}
+        return self._conn
+
+    def _write_pending(self):
+        """Write buffered results in one short transaction (caller holds the lock)."""
+        if not self._pending:
+            return
+        rows = [(key, size, overflow) for key, (size, overflow) in self._pending.items()]
+        db = self._conn
+
+        def write():
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany("INSERT OR REPLACE INTO fits VALUES (?, ?, ?)", rows)
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+        _retry_locked(write)
+        self._pending = {}
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def fit(
+        self,
+        text,
+        max_width_pt=395,
+        max_height_pt=505,
+        face="Poppins-Bold.ttf",
+        line_spacing=1.0,
+        min_font_size=17,
+        max_font_size=110
+    ):
+        """
+        Cached `fit_font_size`. Same arguments and return value.
+        """
+        text = normalize_text(text)
+        key = (text, float(max_width_pt), float(max_height_pt), face, get_metrics(face).digest,
+               int(min_font_size), int(max_font_size), round(float(line_spacing), 4))
+
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return value
+
+            db = self._db()
+            db_key = repr((FIT_VERSION,) + key) if db is not None else None
+            if db is not None:
+                value = self._pending.get(db_key)
+                if value is not None:
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                    return value
+                row = db.execute("SELECT font_size, overflow FROM fits WHERE key = ?", (db_key,)).fetchone()
+                if row is not None:
+                    value = (row[0], row[1])
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            value = fit_font_size(text, max_width_pt, max_height_pt, face, line_spacing,
+                                  min_font_size, max_font_size)
+            self._remember(key, value)
+            if db is not None:
+                self._pending[db_key] = value
+                if len(self._pending) >= self.commit_every:
+                    self._write_pending()
+            return value
+
+    def flush(self):
+        """Write buffered results to the on-disk tier."""
+        with self._lock:
+            if self._conn is not None and self._conn_pid == os.getpid():
+                self._write_pending()
+
+    def clear(self):
+        """Drop the in-memory tier and reset counters (the disk tier is kept)."""
+        with self._lock:
+            self._memory.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for both tiers."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._memory),
+        }
+
+
+# Process-wide default cache (disk tier enabled via CAROUSEL_FIT_CACHE)
+FIT_CACHE = FitCache(path=os.environ.get("CAROUSEL_FIT_CACHE"))
+
+
+def cached_fit_font_size(*args, **kwargs):
+    """`fit_font_size` memoized through the process-wide FIT_CACHE."""
+    return FIT_CACHE.fit(*args, **kwargs)
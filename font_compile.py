@@ -0,0 +1,350 @@
+"""
+Font Metrics Compiler
+---------------------
+
+Build step for font_metrics: reads the bundled TrueType faces once and
+writes what the text fitters need into one compact binary file, so the
+processes that size text load a few arrays instead of parsing fonts.
+
+Per face:
+
+  • advance width of every character the font maps (cmap + hmtx)
+  • pair kerning between Latin characters (GPOS "kern" feature)
+  • ascent, descent and line gap (hhea), units per em
+  • full name (name table), e.g. "Poppins Thin Italic"
+
+File layout (little-endian): b"FMET", u16 version, u16 face count, then
+per face a header (file name, TTF size, full name, units per em, ascent,
+descent, line gap, .notdef advance, char count, kerning pair count)
+followed by u32 codepoints, u16 advances, u32 kerning keys (left << 16 |
+right) and i16 kerning values, all in font units.
+
+    python font_compile.py                 # writes fonts/poppins/metrics.bin
+    python font_compile.py ./fonts out.bin
+
+Only the standard library is needed.
+"""
+
+import os
+import sys
+import struct
+from array import array
+
+
+MAGIC = b"FMET"
+VERSION = 1
+
+# Characters kerning pairs are kept for (same ranges font_metrics pre-samples)
+KERNING_RANGES = ((0x20, 0x250), (0x2000, 0x2070))
+
+_FACE_HEADER = struct.Struct("<IHhhhHII")
+
+
+class _Font:
+    """Just enough of a TrueType file to read metrics (no hinting, no glyph outlines)."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        count = struct.unpack_from(">H", data, 4)[0]
+        self.tables = {}
+        for i in range(count):
+            tag, _, offset, length = struct.unpack_from(">4sIII", data, 12 + 16 * i)
+            self.tables[tag.decode("latin-1")] = offset
+
+    def u16(self, offset):
+        return struct.unpack_from(">H", self.data, offset)[0]
+
+    def units_per_em(self) -> int:
+        return self.u16(self.tables["head"] + 18)
+
+    def vertical_metrics(self) -> tuple:
+        """(ascent, descent, line gap) from hhea; descent is positive below the baseline."""
+        ascender, descender, line_gap = struct.unpack_from(">hhh", self.data, self.tables["hhea"] + 4)
+        return ascender, -descender, line_gap
+
+    def advances(self) -> list:
+        """Advance width of every glyph, in font units."""
+        count = self.u16(self.tables["hhea"] + 34)
+        num_glyphs = self.u16(self.tables["maxp"] + 4)
+        base = self.tables["hmtx"]
+        widths = [self.u16(base + 4 * i) for i in range(count)]
+        return widths + [widths[-1]] * (num_glyphs - count)
+
+    def cmap(self) -> dict:
+        """{codepoint: glyph id} from the best Unicode subtable (format 12, else 4)."""
+        base = self.tables["cmap"]
+        subtables = {}
+        for i in range(self.u16(base + 2)):
+            platform, encoding, offset = struct.unpack_from(">HHI", self.data, base + 4 + 8 * i)
+            fmt = self.u16(base + offset)
+            subtables.setdefault((fmt, platform, encoding), base + offset)
+        for key in ((12, 3, 10), (12, 0, 4), (4, 3, 1), (4, 0, 3), (4, 0, 4)):
+            if key in subtables:
+                return (self._cmap12 if key[0] == 12 else self._cmap4)(subtables[key])
+        raise ValueError("no Unicode cmap subtable")
+
+    def _cmap4(self, offset) -> dict:
+        seg_count = self.u16(offset + 6) // 2
+        ends = offset + 14
+        starts = ends + 2 * seg_count + 2
+        deltas = starts + 2 * seg_count
+        range_offsets = deltas + 2 * seg_count
+        mapping = {}
+        for i in range(seg_count):
+            end, start = self.u16(ends + 2 * i), self.u16(starts + 2 * i)
+            delta = struct.unpack_from(">h", self.data, deltas + 2 * i)[0]
+            range_offset = self.u16(range_offsets + 2 * i)
+            for cp in range(start, min(end, 0xFFFE) + 1):
+                if range_offset == 0:
+                    glyph = (cp + delta) & 0xFFFF
+                else:
+                    glyph = self.u16(range_offsets + 2 * i + range_offset + 2 * (cp - start))
+                    glyph = (glyph + delta) & 0xFFFF if glyph else 0
+                if glyph:
+                    mapping[cp] = glyph
+        return mapping
+
+    def _cmap12(self, offset) -> dict:
+        mapping = {}
+        for i in range(struct.unpack_from(">I", self.data, offset + 12)[0]):
+            start, end, glyph = struct.unpack_from(">III", self.data, offset + 16 + 12 * i)
+            for cp in range(start, end + 1):
+                mapping[cp] = glyph + cp - start
+        return mapping
+
+    def full_name(self) -> str:
+        """Full font name (name ID 4), e.g. "Poppins Bold"; "" when absent."""
+        base = self.tables.get("name")
+        if base is None:
+            return ""
+        count, strings = self.u16(base + 2), base + self.u16(base + 4)
+        found = {}
+        for i in range(count):
+            platform, _, _, name_id, length, offset = struct.unpack_from(">6H", self.data, base + 6 + 12 * i)
+            if name_id == 4 and platform in (1, 3):
+                raw = self.data[strings + offset:strings + offset + length]
+                found.setdefault(platform, raw.decode("utf-16-be" if platform == 3 else "latin-1"))
+        return found.get(3) or found.get(1, "")
+
+    # --- GPOS pair kerning -------------------------------------------------
+
+    def _coverage(self, offset) -> dict:
+        """{glyph: coverage index}"""
+        fmt, count = self.u16(offset), self.u16(offset + 2)
+        if fmt == 1:
+            return {self.u16(offset + 4 + 2 * i): i for i in range(count)}
+        covered = {}
+        for i in range(count):
+            start, end, index = struct.unpack_from(">HHH", self.data, offset + 4 + 6 * i)
+            for glyph in range(start, end + 1):
+                covered[glyph] = index + glyph - start
+        return covered
+
+    def _class_def(self, offset) -> dict:
+        """{glyph: class}; glyphs not listed are class 0."""
+        fmt = self.u16(offset)
+        if fmt == 1:
+            start, count = self.u16(offset + 2), self.u16(offset + 4)
+            return {start + i: self.u16(offset + 6 + 2 * i) for i in range(count)}
+        classes = {}
+        for i in range(self.u16(offset + 2)):
+            start, end, cls = struct.unpack_from(">HHH", self.data, offset + 4 + 6 * i)
+            for glyph in range(start, end + 1):
+                classes[glyph] = cls
+        return classes
+
+    def _kern_lookups(self, gpos) -> list:
+        """Lookup indices of the "kern" feature (Latin script, else default), in LookupList order."""
+        scripts = gpos + self.u16(gpos + 4)
+        features = gpos + self.u16(gpos + 6)
+        by_tag = {}
+        for i in range(self.u16(scripts)):
+            tag, offset = struct.unpack_from(">4sH", self.data, scripts + 2 + 6 * i)
+            by_tag[tag] = scripts + offset
+        script = by_tag.get(b"latn") or by_tag.get(b"DFLT")
+        if script is None or not self.u16(script):
+            return []
+        lang_sys = script + self.u16(script)
+        lookups = set()
+        for i in range(self.u16(lang_sys + 4)):
+            feature_index = self.u16(lang_sys + 6 + 2 * i)
+            tag, offset = struct.unpack_from(">4sH", self.data, features + 2 + 6 * feature_index)
+            if tag == b"kern":
+                feature = features + offset
+                lookups.update(self.u16(feature + 4 + 2 * j) for j in range(self.u16(feature + 2)))
+        return sorted(lookups)
+
+    def _x_advance(self, offset, value_format) -> int:
+        if not value_format & 0x4:
+            return 0
+        skip = 2 * bin(value_format & 0x3).count("1")
+        return struct.unpack_from(">h", self.data, offset + skip)[0]
+
+    def pair_kerning(self, glyphs: set) -> dict:
+        """
+        {(left glyph, right glyph): x advance adjustment} for pairs of `glyphs`,
+        from the pair adjustment lookups of the "kern" feature.
+        """
+        gpos = self.tables.get("GPOS")
+        if gpos is None:
+            return {}
+        lookup_list = gpos + self.u16(gpos + 8)
+        kerning = {}
+        for index in self._kern_lookups(gpos):
+            lookup = lookup_list + self.u16(lookup_list + 2 + 2 * index)
+            lookup_type = self.u16(lookup)
+            # Within a lookup the first subtable covering a pair decides it
+            decided_pairs, decided_lefts = set(), set()
+            for i in range(self.u16(lookup + 4)):
+                sub = lookup + self.u16(lookup + 6 + 2 * i)
+                sub_type = lookup_type
+                if sub_type == 9:  # extension
+                    sub_type = self.u16(sub + 2)
+                    sub += struct.unpack_from(">I", self.data, sub + 4)[0]
+                if sub_type == 2:
+                    self._pair_subtable(sub, glyphs, kerning, decided_pairs, decided_lefts)
+        return {pair: value for pair, value in kerning.items() if value}
+
+    def _pair_subtable(self, sub, glyphs, kerning, decided_pairs, decided_lefts):
+        fmt = self.u16(sub)
+        coverage = self._coverage(sub + self.u16(sub + 2))
+        format1, format2 = self.u16(sub + 4), self.u16(sub + 6)
+        size1 = 2 * bin(format1).count("1")
+        size2 = 2 * bin(format2).count("1")
+        lefts = [g for g in glyphs if g in coverage and g not in decided_lefts]
+
+        if fmt == 1:
+            for left in lefts:
+                pair_set = sub + self.u16(sub + 10 + 2 * coverage[left])
+                record = pair_set + 2
+                for _ in range(self.u16(pair_set)):
+                    right = self.u16(record)
+                    pair = (left, right)
+                    if right in glyphs and pair not in decided_pairs:
+                        decided_pairs.add(pair)
+                        kerning[pair] = kerning.get(pair, 0) + self._x_advance(record + 2, format1)
+                    record += 2 + size1 + size2
+        elif fmt == 2:
+            class1 = self._class_def(sub + self.u16(sub + 8))
+            class2 = self._class_def(sub + self.u16(sub + 10))
+            class2_count = self.u16(sub + 14)
+            rights_by_class = {}
+            for glyph in glyphs:
+                rights_by_class.setdefault(class2.get(glyph, 0), []).append(glyph)
+            row_size = class2_count * (size1 + size2)
+            for left in lefts:
+                row = sub + 16 + class1.get(left, 0) * row_size
+                for cls, rights in rights_by_class.items():
+                    value = self._x_advance(row + cls * (size1 + size2), format1)
+                    for right in rights:
+                        pair = (left, right)
+                        if pair not in decided_pairs:
+                            kerning[pair] = kerning.get(pair, 0) + value
+                decided_lefts.add(left)
+
+
+def compile_face(path: str) -> dict:
+    """
+    Read the metrics of one TrueType face.
+
+    Args:
+        path (str): .ttf file.
+
+    Returns:
+        dict: {"face", "size", "name", "units_per_em", "ascent", "descent",
+        "line_gap", "notdef", "advances": {codepoint: units},
+        "kerning": {(left codepoint, right codepoint): units}}
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    font = _Font(data)
+    widths = font.advances()
+    cmap = font.cmap()
+    ascent, descent, line_gap = font.vertical_metrics()
+
+    kerned = {cp: glyph for cp, glyph in cmap.items() if any(lo <= cp < hi for lo, hi in KERNING_RANGES)}
+    chars_by_glyph = {}
+    for cp, glyph in kerned.items():
+        chars_by_glyph.setdefault(glyph, []).append(cp)
+    kerning = {}
+    for (left, right), value in font.pair_kerning(set(chars_by_glyph)).items():
+        for a in chars_by_glyph[left]:
+            for b in chars_by_glyph[right]:
+                kerning[(a, b)] = value
+
+    return {
+        "face": os.path.basename(path),
+        "size": len(data),
+        "name": font.full_name(),
+        "units_per_em": font.units_per_em(),
+        "ascent": ascent,
+        "descent": descent,
+        "line_gap": line_gap,
+        "notdef": widths[0],
+        "advances": {cp: widths[glyph] for cp, glyph in sorted(cmap.items())},
+        "kerning": dict(sorted(kerning.items())),
+    }
+
+
+def _le(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _string(text: str) -> bytes:
+    raw = text.encode("utf-8")
+    return struct.pack("<H", len(raw)) + raw
+
+
+def compile_fonts(font_dir: str, out_path: str) -> list:
+    """
+    Compile every .ttf of `font_dir` into one metrics file.
+
+    Args:
+        font_dir (str): Directory of TrueType faces.
+        out_path (str): Destination file (replaced atomically).
+
+    Returns:
+        list: The compiled faces (see `compile_face`).
+    """
+    faces = [compile_face(os.path.join(font_dir, name))
+             for name in sorted(os.listdir(font_dir)) if name.lower().endswith(".ttf")]
+
+    chunks = [MAGIC, struct.pack("<HH", VERSION, len(faces))]
+    for face in faces:
+        codepoints = array("I", face["advances"].keys())
+        advances = array("H", face["advances"].values())
+        keys = array("I", (a << 16 | b for a, b in face["kerning"]))
+        values = array("h", face["kerning"].values())
+        chunks += [
+            _string(face["face"]),
+            _FACE_HEADER.pack(face["size"], face["units_per_em"], face["ascent"], face["descent"],
+                              face["line_gap"], face["notdef"], len(codepoints), len(keys)),
+            _string(face["name"]),
+            _le(codepoints), _le(advances), _le(keys), _le(values),
+        ]
+
+    tmp = f"{out_path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"".join(chunks))
+    os.replace(tmp, out_path)
+    return faces
+
+
+def main(argv=None):
+    from font_metrics import FONT_DIR, METRICS_FILE
+
+    argv = sys.argv[1:] if argv is None else argv
+    font_dir = argv[0] if argv else FONT_DIR
+    out_path = argv[1] if len(argv) > 1 else (METRICS_FILE if not argv else os.path.join(font_dir, "metrics.bin"))
+    faces = compile_fonts(font_dir, out_path)
+    for face in faces:
+        print(f"   🔤 {face['face']:28} {face['name']:24} {len(face['advances']):5d} chars "
+              f"{len(face['kerning']):6d} kerning pairs")
+    print(f"✅ Font metrics saved: {out_path} ({os.path.getsize(out_path) / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Glyph-Metric Text Fitting
+-------------------------
+
+Per-face advance-width tables built once from the bundled Poppins fonts, and
+a fitter that simulates word wrapping for each candidate font size to find
+the largest size whose wrapped text fits the bounding box.
+
+Widths are stored in em units (1.0 == font size), so measuring a string at
+any size is a table lookup per character followed by one multiplication.
+
+Tables come from the precompiled metrics file (METRICS_FILE, built by
+`python font_compile.py`): advance widths, kerning pairs, ascent, descent
+and line gap of every bundled face, loaded as arrays without opening the
+fonts. A face missing from it, or whose .ttf changed size since it was
+built, is read from its .ttf instead (also without PIL).
+"""
+
+import os
+import sys
+import math
+import struct
+import hashlib
+from array import array
+from functools import lru_cache
+
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "poppins")
+
+METRICS_FILE = os.environ.get("CAROUSEL_FONT_METRICS") or os.path.join(FONT_DIR, "metrics.bin")
+
+# Style names used by the templates → font file
+FACE_FILES = {
+    "poppins": "Poppins-Regular.ttf",
+    "poppins bold": "Poppins-Bold.ttf",
+    "poppins extrabold": "Poppins-ExtraBold.ttf",
+    "poppins semibold": "Poppins-SemiBold.ttf",
+    "poppins medium": "Poppins-Medium.ttf",
+    "poppins light": "Poppins-Light.ttf",
+    "poppins light italic": "Poppins-LightItalic.ttf",
+    "poppins thin": "Poppins-Thin.ttf",
+    "poppins thin italic": "Poppins-ThinItalic.ttf",
+}
+
+
+def resolve_face(name: str = "Poppins", bold: bool = False) -> str:
+    """
+    Map a run's font name and bold flag to a bundled font file name.
+
+    Names not in FACE_FILES are looked up among the full names recorded
+    in the metrics file (e.g. "Poppins Light Italic").
+
+    Args:
+        name (str): Font name as set on the run (e.g. "Poppins", "Poppins thin").
+        bold (bool): Whether the run is bold.
+
+    Returns:
+        str: Font file name inside FONT_DIR (e.g. "Poppins-Bold.ttf").
+    """
+    key = " ".join((name or "Poppins").lower().split())
+    if bold and key == "poppins":
+        key = "poppins bold"
+    face = FACE_FILES.get(key) or _compiled()[1].get(key)
+    return face or FACE_FILES["poppins bold" if bold else "poppins"]
+
+
+_FACE_HEADER = struct.Struct("<IHhhhHII")
+
+
+def _array(typecode: str, data, offset: int, count: int):
+    values = array(typecode)
+    values.frombytes(data[offset:offset + count * values.itemsize])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values, offset + count * values.itemsize
+
+
+@lru_cache(maxsize=1)
+def _compiled():
+    """
+    Index of the metrics file: ({face: (header, data, offset)}, {full name: face}).
+
+    Only the face headers are read here; arrays are decoded per face on use.
+    """
+    try:
+        with open(METRICS_FILE, "rb") as f:
+            data = memoryview(f.read())
+        if bytes(data[:4]) != b"FMET" or struct.unpack_from("<H", data, 4)[0] != 1:
+            raise ValueError("not a version 1 metrics file")
+        faces, names = {}, {}
+        offset = 8
+        for _ in range(struct.unpack_from("<H", data, 6)[0]):
+            length = struct.unpack_from("<H", data, offset)[0]
+            face = bytes(data[offset + 2:offset + 2 + length]).decode("utf-8")
+            offset += 2 + length
+            header = _FACE_HEADER.unpack_from(data, offset)
+            offset += _FACE_HEADER.size
+            length = struct.unpack_from("<H", data, offset)[0]
+            full_name = bytes(data[offset + 2:offset + 2 + length]).decode("utf-8")
+            offset += 2 + length
+            faces[face] = (header, data, offset)
+            names[" ".join(full_name.lower().split())] = face
+            chars, pairs = header[-2:]
+            offset += chars * 6 + pairs * 6
+        return faces, names
+    except (OSError, ValueError, struct.error):
+        return {}, {}
+
+
+def _load_face(face: str):
+    """(units per em, ascent, descent, line gap, .notdef, {char: units}, {pair key: units}) of `face`."""
+    entry = _compiled()[0].get(face)
+    path = os.path.join(FONT_DIR, face)
+    if entry is not None:
+        header, data, offset = entry
+        size, units, ascent, descent, line_gap, notdef, chars, pairs = header
+        try:
+            stale = os.path.getsize(path) != size
+        except OSError:
+            stale = False  # the metrics file is enough without the fonts
+        if not stale:
+            codepoints, offset = _array("I", data, offset, chars)
+            advances, offset = _array("H", data, offset, chars)
+            keys, offset = _array("I", data, offset, pairs)
+            values, offset = _array("h", data, offset, pairs)
+            return (units, ascent, descent, line_gap, notdef,
+                    dict(zip(map(chr, codepoints), advances)), dict(zip(keys, values)))
+
+    from font_compile import compile_face
+
+    print(f"⚠️ {face} is not in {METRICS_FILE} or changed; reading the font "
+          f"(run `python font_compile.py` to rebuild)", file=sys.stderr)
+    compiled = compile_face(path)
+    return (compiled["units_per_em"], compiled["ascent"], compiled["descent"], compiled["line_gap"],
+            compiled["notdef"], {chr(cp): w for cp, w in compiled["advances"].items()},
+            {a << 16 | b: k for (a, b), k in compiled["kerning"].items()})
+
+
+class FontMetrics:
+    """
+    Advance widths, kerning and vertical metrics of one font face, in em units.
+
+    Args:
+        face (str): Font file name inside FONT_DIR (e.g. "Poppins-Bold.ttf").
+    """
+
+    def __init__(self, face: str):
+        self.face = face
+        units, ascent, descent, line_gap, notdef, advances, kerning = _load_face(face)
+        self.ascent = ascent / units
+        self.descent = descent / units
+        self.line_gap = line_gap / units
+        self._notdef = notdef / units
+        self.widths = {ch: w / units for ch, w in advances.items()}
+        # (ord(left) << 16 | ord(right)) -> adjustment in em units
+        self.kerning = {key: k / units for key, k in kerning.items()}
+        # Identity of the tables, so caches of results derived from them
+        # (fit_cache) miss when the metrics file or the font changes
+        self.digest = hashlib.blake2b(
+            repr((units, ascent, descent, line_gap, notdef, sorted(advances.items()),
+                  sorted(kerning.items()))).encode("utf-8"),
+            digest_size=8,
+        ).hexdigest()
+
+    @property
+    def line_height(self) -> float:
+        """Single line pitch in em units (ascent + descent)."""
+        return self.ascent + self.descent
+
+    def char_width(self, ch: str) -> float:
+        """Return the advance width of `ch` in em units (.notdef's when the face lacks it)."""
+        w = self.widths.get(ch)
+        if w is None:
+            w = self.widths[ch] = self._notdef
+        return w
+
+    def kern(self, left: str, right: str) -> float:
+        """Return the kerning adjustment between two characters, in em units."""
+        return self.kerning.get(ord(left) << 16 | ord(right), 0.0)
+
+    def measure(self, text: str, font_size: float = 1.0, kerning: bool = False) -> float:
+        """
+        Return the advance width of `text` at `font_size` (same unit as font_size).
+
+        Kerning is off by default, as in PowerPoint for runs without a `kern`
+        threshold.
+        """
+        widths = self.widths
+        get = widths.get
+        total = 0.0
+        for ch in text:
+            w = get(ch)
+            if w is None:
+                w = self.char_width(ch)
+            total += w
+        if kerning and self.kerning and len(text) > 1:
+            pairs = self.kerning.get
+            total += sum(pairs(ord(a) << 16 | ord(b), 0.0) for a, b in zip(text, text[1:]))
+        return total * font_size
+
+
+@lru_cache(maxsize=None)
+def get_metrics(face: str = "Poppins-Bold.ttf") -> FontMetrics:
+    """
+    Return the (process-wide cached) metrics table for `face`.
+
+    Args:
+        face (str): Font file name, or a style name ("Poppins thin",
+            "Poppins Bold") resolved with `resolve_face`.
+    """
+    if not face.lower().endswith((".ttf", ".otf")):
+        return get_metrics(resolve_face(face))
+    return FontMetrics(face)
+
+
+def _paragraph_words(text: str, metrics: FontMetrics):
+    """Split text into paragraphs of word widths (em), measured once."""
+    return [[metrics.measure(word) for word in paragraph.split()] for paragraph in text.split("\n")]
+
+
+def _count_lines(paragraphs, space_em: float, max_width_em: float) -> int:
+    """Greedy word wrap of pre-measured paragraphs; returns the number of lines."""
+    lines = 0
+    for words in paragraphs:
+        if not words:
+            lines += 1
+            continue
+        lines += 1
+        current = -space_em
+        for w in words:
+            if w > max_width_em:
+                # Word longer than the box: PowerPoint breaks it across lines
+                if current > 0:
+                    lines += 1
+                extra = math.ceil(w / max_width_em) - 1
+                lines += extra
+                current = w - extra * max_width_em
+                continue
+            if current + space_em + w <= max_width_em:
+                current += space_em + w
+            else:
+                lines += 1
+                current = w
+    return lines
+
+
+def count_lines(text: str, font_size: float, max_width_pt: float, face: str = "Poppins-Bold.ttf") -> int:
+    """
+    Return how many lines `text` wraps to at `font_size` inside `max_width_pt`.
+    """
+    metrics = get_metrics(face)
+    return _count_lines(_paragraph_words(text, metrics), metrics.measure(" "), max_width_pt / font_size)
+
+
+def text_box_width_pt(shape, default: float = 395) -> float:
+    """
+    Width available to text inside a shape, in points: the shape's width
+    minus its text frame's left and right insets (bodyPr lIns / rIns, 0.1"
+    each when not set).
+
+    Args:
+        shape: python-pptx shape with a text frame.
+        default (float): Returned when the shape has no usable width.
+
+    Returns:
+        float: Width in points.
+    """
+    width = shape.width
+    if not width:
+        return default
+    tf = shape.text_frame
+    inner = width - tf.margin_left - tf.margin_right
+    # 12700 EMU per point
+    return inner / 12700 if inner > 0 else default
+
+
+def fit_font_size(
+    text,
+    max_width_pt=395,
+    max_height_pt=505,
+    face="Poppins-Bold.ttf",
+    line_spacing=1.0,
+    min_font_size=17,
+    max_font_size=110
+):
+    """
+    Find the largest integer font size whose word-wrapped text fits the box.
+
+    Word widths are measured once in em units; each candidate size only re-runs
+    the wrap. Line count never decreases as the size grows, so the candidates
+    are binary-searched.
+
+    Args:
+        text (str): Content to fit. Newlines start new paragraphs.
+        max_width_pt (float): Width of the bounding box in points.
+        max_height_pt (float): Height of the bounding box in points.
+        face (str): Font file name (see `resolve_face`).
+        line_spacing (float): Line spacing multiple applied to the paragraph.
+        min_font_size (int): Minimum font size allowed.
+        max_font_size (int): Maximum font size allowed.
+
+    Returns:
+        tuple: (font_size: int, overflow_flag: int) — overflow is 1 when the
+        text does not fit even at `min_font_size`.
+    """
+    metrics = get_metrics(face)
+    paragraphs = _paragraph_words(text.strip(), metrics)
+    space_em = metrics.measure(" ")
+    pitch_em = metrics.line_height * line_spacing
+
+    def fits(size):
+        lines = _count_lines(paragraphs, space_em, max_width_pt / size)
+        return lines * size * pitch_em <= max_height_pt
+
+    low, high = int(min_font_size), int(max_font_size)
+    if not fits(low):
+        return low, 1
+
+    while low < high:
+        mid = (low + high + 1) // 2
+        if fits(mid):
+            low = mid
+        else:
+            high = mid - 1
+    return low, 0
@@ -0,0 +1,225 @@
+"""
+Image Preprocessing
+-------------------
+
+Resamples pictures to the pixel size their placeholder actually needs
+(placeholder EMU size × DPI) and re-encodes them by content before they are
+embedded: photos become JPEG, images with transparency or few colours stay
+PNG. Sources that are already small enough and would not shrink are
+embedded unchanged.
+
+Results are cached keyed on (source SHA-256, target size, quality) in
+memory and, optionally, in a directory that survives restarts (pass
+`cache_dir` or set CAROUSEL_IMAGE_CACHE). The DPI and JPEG quality default
+to CAROUSEL_IMAGE_DPI / CAROUSEL_IMAGE_QUALITY; a DPI of 0 disables the stage.
+"""
+
+import io
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+
+EMU_PER_INCH = 914400
+
+# Bump when the encoding rules change, so stale on-disk entries are ignored
+PIPELINE_VERSION = 1
+
+# Images with at most this many distinct colours are treated as graphics (PNG)
+_GRAPHIC_MAX_COLORS = 256
+
+
+@lru_cache(maxsize=256)
+def _read_source(path: str, mtime_ns: int, size: int):
+    """Read an image file once per (path, mtime, size); returns (blob, sha256)."""
+    with open(path, "rb") as f:
+        blob = f.read()
+    return blob, hashlib.sha256(blob).hexdigest()
+
+
+def target_pixels(width_emu: int, height_emu: int, dpi: float):
+    """Return the (width, height) in pixels a box of the given EMU size needs at `dpi`."""
+    return (max(1, round(width_emu * dpi / EMU_PER_INCH)),
+            max(1, round(height_emu * dpi / EMU_PER_INCH)))
+
+
+def _has_transparency(img) -> bool:
+    if img.mode in ("RGBA", "LA", "PA"):
+        return img.getchannel("A").getextrema()[0] < 255
+    return img.mode == "P" and "transparency" in img.info
+
+
+def encode_image(blob: bytes, target_size, quality: int = 85):
+    """
+    Resample and re-encode one image.
+
+    The image is only ever shrunk: each dimension is clamped to `target_size`
+    (the picture is stretched to its box when shown, so independent clamping
+    keeps the rendered result). JPEG is used for photographic content, PNG for
+    images with transparency or at most 256 colours.
+
+    Args:
+        blob (bytes): Source image bytes.
+        target_size (tuple): (width, height) in pixels needed by the placeholder.
+        quality (int): JPEG quality (1-95).
+
+    Returns:
+        tuple: (blob: bytes, ext: str). The source blob and its own extension
+        are returned when re-encoding would not make it smaller.
+    """
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(blob))
+    src_ext = "jpg" if img.format == "JPEG" else (img.format or "png").lower()
+    size = (min(img.width, target_size[0]), min(img.height, target_size[1]))
+    resized = size != img.size
+
+    if _has_transparency(img):
+        img = img.convert("RGBA")
+        fmt = "PNG"
+    elif img.getcolors(_GRAPHIC_MAX_COLORS) is not None:
+        fmt = "PNG"
+    else:
+        img = img.convert("RGB")
+        fmt = "JPEG"
+
+    if resized:
+        img = img.resize(size, Image.LANCZOS)
+
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        img.save(out, "JPEG", quality=quality, optimize=True)
+    else:
+        # Level 9 / optimize shave ~10% more but take ~7x longer
+        img.save(out, "PNG", compress_level=6)
+    encoded = out.getvalue()
+
+    if not resized and len(encoded) >= len(blob):
+        return blob, src_ext
+    return encoded, "jpg" if fmt == "JPEG" else "png"
+
+
+class ImagePipeline:
+    """
+    Placeholder-sized image preprocessing with a two-tier result cache.
+
+    Args:
+        dpi (float): Output resolution; 0 embeds sources unchanged.
+        quality (int): JPEG quality for photographic content.
+        cache_dir (str): Optional directory for the persistent tier.
+        max_entries (int): Size of the in-memory LRU tier.
+    """
+
+    def __init__(self, dpi: float = 150, quality: int = 85, cache_dir: str = None, max_entries: int = 128):
+        self.dpi = dpi
+        self.quality = quality
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key):
+        name = hashlib.sha256(repr((PIPELINE_VERSION,) + key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, name[:2], name)
+
+    def prepare(self, image_file: str, width_emu: int, height_emu: int):
+        """
+        Return the bytes to embed for `image_file` shown in a box of the given size.
+
+        Args:
+            image_file (str): Path to the source image.
+            width_emu (int): Placeholder width in EMU.
+            height_emu (int): Placeholder height in EMU.
+
+        Returns:
+            tuple: (blob: bytes, filename: str) — the filename keeps the source's
+            base name with the extension of the chosen encoding.
+        """
+        st = os.stat(image_file)
+        source, digest = _read_source(os.path.abspath(image_file), st.st_mtime_ns, st.st_size)
+        base = os.path.splitext(os.path.basename(image_file))[0]
+        if not self.dpi:
+            return source, os.path.basename(image_file)
+
+        size = target_pixels(width_emu, height_emu, self.dpi)
+        key = (digest, size[0], size[1], int(self.quality))
+
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return value[0], f"{base}.{value[1]}"
+
+        value = None
+        if self.cache_dir:
+            path = self._disk_path(key)
+            src_ext = os.path.splitext(image_file)[1].lstrip(".").lower()
+            for ext in ("jpg", "png", src_ext):
+                try:
+                    with open(f"{path}.{ext}", "rb") as f:
+                        value = (f.read(), ext)
+                    break
+                except OSError:
+                    continue
+
+        with self._lock:
+            if value is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+
+        if value is None:
+            value = encode_image(source, size, self.quality)
+            if self.cache_dir:
+                path = self._disk_path(key)
+                try:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp = f"{path}.{os.getpid()}.tmp"
+                    with open(tmp, "wb") as f:
+                        f.write(value[0])
+                    os.replace(tmp, f"{path}.{value[1]}")
+                except OSError as e:
+                    print(f"⚠️ Could not cache processed image {image_file}: {e}")
+
+        with self._lock:
+            self._remember(key, value)
+        return value[0], f"{base}.{value[1]}"
+
+    def clear(self):
+        """Drop the in-memory tier and reset counters (the disk tier is kept)."""
+        with self._lock:
+            self._memory.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for both tiers."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._memory),
+        }
+
+
+# Process-wide default pipeline (configured through the environment)
+IMAGE_PIPELINE = ImagePipeline(
+    dpi=float(os.environ.get("CAROUSEL_IMAGE_DPI", 150)),
+    quality=int(os.environ.get("CAROUSEL_IMAGE_QUALITY", 85)),
+    cache_dir=os.environ.get("CAROUSEL_IMAGE_CACHE"),
+)
@@ -0,0 +1,313 @@
+"""
+Incremental Carousel Builder
+----------------------------
+
+Rebuilds only the slides whose inputs changed. Each template mapping
+depends on its template file, its image and the post sections its `blocks`
+read (their "key"s); those inputs are hashed into one fingerprint per
+mapping. On rebuild, mappings whose fingerprint changed are filled again
+and their slides are spliced into the previously built deck in place of
+the old ones; every other slide is left as it is.
+
+Fingerprints and slide counts are stored next to the deck
+(`deck.pptx` → `deck.pptx.build.json`). A missing or stale state, a changed
+mapping list or a changed first template or colour variant (which provide
+the deck's masters and theme) falls back to a full build.
+
+Watch mode polls the post, templates and images and rebuilds on change,
+keeping the deck parsed in memory between builds.
+
+Usage:
+    python incremental_build.py post.txt --out ./concluded/done/deck.pptx
+    python incremental_build.py post.txt --out deck.pptx --style ./templates/blue-blur/light --watch
+    python incremental_build.py post.txt --out deck.pptx --variant light
+    python incremental_build.py post.txt --out deck.pptx --trace trace.json
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tracing
+from functools import lru_cache
+from append_template import fill_presentation, mappings_for_style, parse_post, template_mappings
+from theme_variants import mappings_for_variant
+from merge_templates import append_slides
+from template_cache import TEMPLATE_CACHE, load_template
+from placeholder_index import load_placeholder_index
+from image_pipeline import IMAGE_PIPELINE
+from package_writer import forget_source_archive, register_source_archive, save_presentation
+
+
+# Bump when fill/merge output changes, so older states force a full build
+BUILD_VERSION = 1
+STATE_SUFFIX = ".build.json"
+
+
+@lru_cache(maxsize=256)
+def _file_digest(path: str, mtime_ns: int, size: int) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file, recomputed only when its mtime/size change."""
+    st = os.stat(path)
+    return _file_digest(os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def section_keys(blocks: dict):
+    """Return the post sections (HOOK, CTA, ...) a mapping's blocks read."""
+    return sorted({cfg if isinstance(cfg, str) else cfg.get("key") for cfg in blocks.values()} - {None})
+
+
+def mapping_fingerprint(mapping: dict, text_parts: dict) -> str:
+    """
+    Hash every input of one mapping: template, image, block styles, colour
+    variant and the text of the sections it reads.
+
+    Args:
+        mapping (dict): One entry of `template_mappings`.
+        text_parts (dict): Parsed post (see `parse_post`).
+
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    image = mapping.get("image")
+    payload = {
+        "version": BUILD_VERSION,
+        "template": TEMPLATE_CACHE.digest(mapping["template"]),
+        "image": file_digest(image) if image and os.path.exists(image) else None,
+        "image_settings": [IMAGE_PIPELINE.dpi, IMAGE_PIPELINE.quality],
+        "blocks": mapping["blocks"],
+        "palette": mapping.get("palette"),
+        "sections": {key: text_parts.get(key, []) for key in section_keys(mapping["blocks"])},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class IncrementalBuilder:
+    """
+    Builds one deck from a post and a list of template mappings, reusing the
+    slides of the previous build whose inputs did not change.
+
+    Args:
+        template_mappings (list): Same format as `append_template.build_carousel`.
+        output_file (str): Deck path; its state is kept in `{output_file}.build.json`.
+    """
+
+    def __init__(self, template_mappings, output_file: str):
+        self.mappings = template_mappings
+        self.output_file = output_file
+        self.state_file = output_file + STATE_SUFFIX
+        self.deck = None
+        self.state = None
+
+    def _load(self):
+        """Load the previous deck and its state from disk, if they still match."""
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") != BUILD_VERSION or state.get("deck") != file_digest(self.output_file):
+                return
+        except (OSError, ValueError):
+            return
+
+        from pptx import Presentation
+
+        self.deck = Presentation(self.output_file)
+        register_source_archive(self.output_file, self.deck.part.package)
+        self.state = state
+
+    def _fill(self, mapping, text_parts):
+        return fill_presentation(load_template(mapping["template"], mapping.get("palette")), mapping["blocks"], text_parts,
+                                 mapping["image"], load_placeholder_index(mapping["template"]))
+
+    def _needs_full(self) -> bool:
+        state = self.state
+        if self.deck is None or state is None:
+            return True
+        previous = state["mappings"]
+        if len(previous) != len(self.mappings):
+            return True
+        if any(p["template"] != m["template"] for p, m in zip(previous, self.mappings)):
+            return True
+        # The first template supplies the deck's masters, layouts and theme
+        if previous[0].get("palette") != self.mappings[0].get("palette"):
+            return True
+        return previous[0]["template_sha"] != TEMPLATE_CACHE.digest(self.mappings[0]["template"])
+
+    def _full_build(self, text_parts):
+        deck, counts = None, []
+        for mapping in self.mappings:
+            prs = self._fill(mapping, text_parts)
+            if deck is None:
+                deck = prs
+                counts.append(len(prs.slides))
+                continue
+            counts.append(append_slides(deck, prs))
+        self.deck = deck
+        return counts
+
+    def _splice(self, text_parts, changed):
+        """Replace the slides of every changed mapping, keeping deck order."""
+        deck = self.deck
+        sld_id_lst = deck.slides._sldIdLst
+        counts = [m["slides"] for m in self.state["mappings"]]
+
+        # Back to front, so the positions of the mappings still to do don't move
+        for i in sorted(changed, reverse=True):
+            start = sum(counts[:i])
+            old = list(sld_id_lst)[start:start + counts[i]]
+
+            # Appended first, while slide partnames are still 1..N, so they can't collide
+            added = append_slides(deck, self._fill(self.mappings[i], text_parts))
+            new = list(sld_id_lst)[len(sld_id_lst) - added:]
+            for el in old:
+                sld_id_lst.remove(el)
+                deck.part.drop_rel(el.rId)
+            for offset, el in enumerate(new):
+                sld_id_lst.remove(el)
+                sld_id_lst.insert(start + offset, el)
+
+            deck.part.rename_slide_parts([el.rId for el in sld_id_lst])
+            counts[i] = added
+        return counts
+
+    def build(self, post_text: str, full: bool = False) -> dict:
+        """
+        Bring the deck up to date with `post_text`.
+
+        Args:
+            post_text (str): Full post text with section tags.
+            full (bool): Ignore the previous build and rebuild every template.
+
+        Returns:
+            dict: {"full": bool, "rebuilt": [mapping indexes], "slides", "seconds"}
+        """
+        start = time.perf_counter()
+        if self.deck is None and not full:
+            self._load()
+
+        text_parts = parse_post(post_text)
+        fingerprints = [mapping_fingerprint(m, text_parts) for m in self.mappings]
+
+        if full or self._needs_full():
+            counts = self._full_build(text_parts)
+            rebuilt, full = list(range(len(self.mappings))), True
+        else:
+            previous = self.state["mappings"]
+            rebuilt = [i for i, fp in enumerate(fingerprints) if previous[i]["fingerprint"] != fp]
+            if not rebuilt:
+                return {"full": False, "rebuilt": [], "slides": len(self.deck.slides),
+                        "seconds": round(time.perf_counter() - start, 4)}
+            with tracing.span("splice", mappings=len(rebuilt)):
+                counts = self._splice(text_parts, rebuilt)
+
+        save_presentation(self.deck, self.output_file)
+        # The previous deck's entries are gone from disk; the next _load registers the new one
+        forget_source_archive(self.output_file)
+        self.state = {
+            "version": BUILD_VERSION,
+            "deck": file_digest(self.output_file),
+            "mappings": [
+                {"template": m["template"], "template_sha": TEMPLATE_CACHE.digest(m["template"]),
+                 "palette": m.get("palette"), "fingerprint": fp, "slides": n}
+                for m, fp, n in zip(self.mappings, fingerprints, counts)
+            ],
+        }
+        with open(self.state_file, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=1)
+
+        return {"full": full, "rebuilt": rebuilt, "slides": len(self.deck.slides),
+                "seconds": round(time.perf_counter() - start, 4)}
+
+    def watched_files(self, post_file: str):
+        """Files whose changes trigger a rebuild: the post, templates and images."""
+        files = [post_file]
+        for mapping in self.mappings:
+            files.append(mapping["template"])
+            if mapping.get("image"):
+                files.append(mapping["image"])
+        return files
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _report(result):
+    what = "full build" if result["full"] else f"rebuilt mapping(s) {result['rebuilt']}" if result["rebuilt"] else "up to date"
+    print(f"🔁 {what}: {result['slides']} slides in {result['seconds']}s")
+
+
+def watch(builder: IncrementalBuilder, post_file: str, interval: float = 0.2):
+    """
+    Rebuild whenever the post, a template or an image changes (polling).
+    Runs until interrupted.
+    """
+    def snapshot():
+        stamps = {}
+        for path in builder.watched_files(post_file):
+            try:
+                st = os.stat(path)
+                stamps[path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                stamps[path] = None
+        return stamps
+
+    seen = snapshot()
+    print(f"👀 Watching {len(seen)} file(s); Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(interval)
+            current = snapshot()
+            if current == seen:
+                continue
+            seen = current
+            try:
+                _report(builder.build(_read_text(post_file)))
+            except Exception as e:
+                print(f"❌ Rebuild failed: {type(e).__name__}: {e}")
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally build a carousel deck from a post file.")
+    parser.add_argument("post", help="Text file with the tagged post")
+    parser.add_argument("--out", default="./concluded/done/carousel.pptx", help="Output deck")
+    parser.add_argument("--style", default=None, help="Template directory (default: template_mappings)")
+    parser.add_argument("--variant", default=None, help="Colour variant: palette name or .json (see theme_variants)")
+    parser.add_argument("--full", action="store_true", help="Ignore the previous build")
+    parser.add_argument("--watch", action="store_true", help="Rebuild on every change")
+    parser.add_argument("--interval", type=float, default=0.2, help="Watch polling interval in seconds")
+    parser.add_argument("--trace", default=None, help="Write a Chrome trace and a stage summary on exit")
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        tracing.configure(args.trace)
+
+    if not os.path.exists(args.post):
+        print(f"❌ Error: File '{args.post}' not found")
+        return 1
+
+    mappings = mappings_for_style(args.style) if args.style else template_mappings
+    if args.variant:
+        mappings = mappings_for_variant(args.variant, mappings)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    builder = IncrementalBuilder(mappings, args.out)
+    _report(builder.build(_read_text(args.post), full=args.full))
+    if args.watch:
+        watch(builder, args.post, args.interval)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
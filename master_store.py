@@ -0,0 +1,300 @@
+"""
+Content-Addressed Masters and Layouts
+-------------------------------------
+
+Keeps one slide master and one slide layout per distinct design in each
+package, so merging decks built from several styles brings in each
+style's master, layouts and theme once, and decks sharing a style add
+nothing.
+
+Identity is a canonical XML hash: the part's XML in C14N form, with root
+`extLst` blocks (creation ids and other per-save identifiers) dropped and
+every relationship id replaced by the identity of its target, plus the
+identities of the parts it relates to (theme, images, the layout's
+master). Two layouts are the same only if their masters are too.
+
+Layouts are imported on demand: a new master comes over without its
+layouts, and each layout follows when the first slide using it arrives.
+"""
+
+import re
+import copy
+import hashlib
+import weakref
+from collections import OrderedDict
+from media_store import MEDIA_PREFIX, dedupe_part
+
+
+_NS = {
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+}
+_R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+_RT_SLIDE_MASTER = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideMaster"
+_RT_SLIDE_LAYOUT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout"
+
+# Master and layout ids share one pool and start at 2^31 (ECMA-376 19.2.1.27)
+_MIN_ID = 2147483648
+
+_NUMBERED_RE = re.compile(r"^(?P<stem>.*?)(?P<n>\d+)(?P<ext>\.\w+)$")
+
+# package -> {"masters": {digest: part}, "layouts": {digest: part}, "names": set(partnames),
+#             "adopted": set(id(part)), "next_id": int, "package": package}
+_REGISTRIES = weakref.WeakKeyDictionary()
+
+# sha256(raw bytes + target digests) -> canonical digest, so templates parsed
+# again (or deep-copied from the template cache) skip the C14N pass
+_DIGESTS = OrderedDict()
+_DIGESTS_MAX = 1024
+
+
+def _canonical_xml(element, targets: dict) -> bytes:
+    from lxml import etree
+
+    el = copy.deepcopy(element)
+    for ext in el.findall("p:extLst", _NS) + el.findall("a:extLst", _NS):
+        el.remove(ext)
+    # A master's layout list is rebuilt on import; it is not part of its design
+    for lst in el.findall("p:sldLayoutIdLst", _NS):
+        el.remove(lst)
+    for node in el.iter():
+        for attr, value in node.attrib.items():
+            if attr.startswith(_R_NS) and value in targets:
+                node.set(attr, targets[value])
+    return etree.tostring(el, method="c14n")
+
+
+def part_digest(part, memo=None) -> str:
+    """
+    Canonical content hash of a part and of everything it relates to
+    (except a master's layouts).
+
+    Args:
+        part (Part): python-pptx part (master, layout, theme, image, ...).
+        memo (dict): Digests already computed, keyed by id(part).
+
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    memo = {} if memo is None else memo
+    key = id(part)
+    digest = memo.get(key)
+    if digest is not None:
+        return digest
+    # Guards against relationship cycles; replaced below
+    memo[key] = "cycle"
+
+    # A master's layouts are not part of its identity (and would make a cycle)
+    rels = sorted((rel for rel in part.rels.values() if not rel.is_external and rel.reltype != _RT_SLIDE_LAYOUT),
+                  key=lambda r: (r.reltype, r.rId))
+    targets = {rel.rId: part_digest(rel.target_part, memo) for rel in rels}
+
+    element = getattr(part, "_element", None)
+    if element is not None:
+        from lxml import etree
+
+        raw = etree.tostring(element)
+    else:
+        raw = part.blob
+    key_hash = hashlib.sha256(raw)
+    key_hash.update(repr(sorted(targets.items())).encode("ascii"))
+    cache_key = key_hash.digest()
+
+    digest = _DIGESTS.get(cache_key)
+    if digest is None:
+        if element is None and part.content_type.endswith("xml"):
+            from lxml import etree
+
+            element = etree.fromstring(raw)
+        h = hashlib.sha256(_canonical_xml(element, targets) if element is not None else raw)
+        for rel in rels:
+            h.update(rel.reltype.encode("utf-8"))
+            h.update(targets[rel.rId].encode("ascii"))
+        digest = h.hexdigest()
+        _DIGESTS[cache_key] = digest
+        while len(_DIGESTS) > _DIGESTS_MAX:
+            _DIGESTS.popitem(last=False)
+
+    memo[key] = digest
+    return digest
+
+
+def _registry(prs) -> dict:
+    """Return the registry of `prs`'s package, indexing its masters and layouts on first use."""
+    package = prs.part.package
+    registry = _REGISTRIES.get(package)
+    if registry is None:
+        memo = {}
+        registry = {"masters": {}, "layouts": {}, "names": {str(p.partname) for p in package.iter_parts()},
+                    "adopted": set(), "package": package}
+        ids = [int(el.get("id")) for el in prs.part._element.findall("p:sldMasterIdLst/p:sldMasterId", _NS)]
+        for master in prs.slide_masters:
+            registry["masters"].setdefault(part_digest(master.part, memo), master.part)
+            ids += [int(el.get("id")) for el in master._element.findall("p:sldLayoutIdLst/p:sldLayoutId", _NS)]
+            for layout in master.slide_layouts:
+                registry["layouts"].setdefault(part_digest(layout.part, memo), layout.part)
+        registry["next_id"] = max(ids + [_MIN_ID - 1]) + 1
+        _REGISTRIES[package] = registry
+    return registry
+
+
+def _next_id(registry) -> str:
+    value = registry["next_id"]
+    registry["next_id"] += 1
+    return str(value)
+
+
+def _free_partname(registry, partname: str):
+    """`partname`, or the first free one with the same stem and extension."""
+    from pptx.opc.packuri import PackURI
+
+    names = registry["names"]
+    match = _NUMBERED_RE.match(partname)
+    if partname in names and match:
+        n = 1
+        while f"{match['stem']}{n}{match['ext']}" in names:
+            n += 1
+        partname = f"{match['stem']}{n}{match['ext']}"
+    names.add(partname)
+    return PackURI(partname)
+
+
+def _set_rels(part, targets: dict):
+    """Replace `part`'s internal relationships (keeping rIds) with fresh ones to `targets`."""
+    from pptx.opc.constants import RELATIONSHIP_TARGET_MODE as RTM
+    from pptx.opc.package import _Relationship
+
+    rels = part.rels
+    for rId, target in targets.items():
+        # New objects: target_ref is cached on a relationship and the target may have been renamed
+        rels._rels[rId] = _Relationship(rels._base_uri, rId, rels[rId].reltype, RTM.INTERNAL, target)
+
+
+def _adopt(registry, part, retarget=None):
+    """
+    Move a foreign part, and the parts it relates to, into the target
+    package: media is deduplicated, other parts get a free partname.
+
+    Args:
+        retarget (dict): {reltype: part} relationships to point elsewhere
+            (e.g. a layout's master); reltypes mapped to None are dropped.
+    """
+    adopted = registry["adopted"]
+    if id(part) in adopted:
+        return part
+    adopted.add(id(part))
+    part.partname = _free_partname(registry, str(part.partname))
+    part._package = registry["package"]
+    retarget = retarget or {}
+
+    targets = {}
+    for rId, rel in list(part.rels.items()):
+        if rel.is_external:
+            continue
+        if rel.reltype in retarget:
+            if retarget[rel.reltype] is None:
+                part.rels.pop(rId)
+            else:
+                targets[rId] = retarget[rel.reltype]
+            continue
+        target = rel.target_part
+        if str(target.partname).startswith(MEDIA_PREFIX):
+            targets[rId] = dedupe_part(registry["package"], target)
+        else:
+            targets[rId] = _adopt(registry, target)
+    _set_rels(part, targets)
+    return part
+
+
+def adopt_part(prs, part):
+    """
+    Move a foreign part (chart, embedded workbook, diagram, ...) and the
+    parts it relates to into `prs`'s package, under free partnames.
+
+    Args:
+        prs (Presentation): Target presentation.
+        part (Part): Part of another package; it is moved, not copied.
+
+    Returns:
+        Part: `part`, now belonging to `prs`'s package.
+    """
+    return _adopt(_registry(prs), part)
+
+
+def _get_or_add_master(prs, registry, master_part, memo):
+    digest = part_digest(master_part, memo)
+    existing = registry["masters"].get(digest)
+    if existing is not None:
+        return existing
+
+    from pptx.oxml.ns import qn
+
+    # Comes over without its layouts; each one follows when a slide needs it
+    _adopt(registry, master_part, {_RT_SLIDE_LAYOUT: None})
+    layout_lst = master_part._element.find("p:sldLayoutIdLst", _NS)
+    if layout_lst is not None:
+        for entry in list(layout_lst):
+            layout_lst.remove(entry)
+
+    rId = prs.part.relate_to(master_part, _RT_SLIDE_MASTER)
+    entry = prs.part._element.get_or_add_sldMasterIdLst()._add_sldMasterId()
+    entry.set("id", _next_id(registry))
+    entry.set(qn("r:id"), rId)
+    registry["masters"][digest] = master_part
+    return master_part
+
+
+def get_or_add_layout(prs, layout_part, memo=None):
+    """
+    Resolve a (possibly foreign) slide layout before a slide is added on it.
+
+    Returns the layout of `prs` with the same canonical content when there
+    is one. Otherwise the layout is moved into `prs`, together with its
+    master and theme unless an identical master is already there.
+
+    Foreign parts are moved, not copied: their source presentation must not
+    be saved afterwards.
+
+    Args:
+        prs (Presentation): Target presentation.
+        layout_part (SlideLayoutPart): Layout of the slide being added.
+        memo (dict): Digests already computed (reuse it across one source deck).
+
+    Returns:
+        SlideLayoutPart: The layout part to use in `prs`.
+    """
+    memo = {} if memo is None else memo
+    registry = _registry(prs)
+    digest = part_digest(layout_part, memo)
+    existing = registry["layouts"].get(digest)
+    if existing is not None:
+        return existing
+
+    from pptx.oxml.ns import qn
+
+    master = _get_or_add_master(prs, registry, layout_part.part_related_by(_RT_SLIDE_MASTER), memo)
+    _adopt(registry, layout_part, {_RT_SLIDE_MASTER: master})
+    rId = master.relate_to(layout_part, _RT_SLIDE_LAYOUT)
+    entry = master._element.get_or_add_sldLayoutIdLst()._add_sldLayoutId()
+    entry.set("id", _next_id(registry))
+    entry.set(qn("r:id"), rId)
+    registry["layouts"][digest] = layout_part
+    return layout_part
+
+
+def find_layout(prs, digest: str):
+    """
+    Layout of `prs` with the given `part_digest`, or None.
+
+    Returns:
+        SlideLayout | None
+    """
+    part = _registry(prs)["layouts"].get(digest)
+    return None if part is None else part.slide_layout
+
+
+def stats(prs) -> dict:
+    """Number of distinct masters and layouts registered for `prs`."""
+    registry = _registry(prs)
+    return {"masters": len(registry["masters"]), "layouts": len(registry["layouts"])}
@@ -0,0 +1,186 @@
+"""
+Content-Addressed Media Store
+-----------------------------
+
+Keeps one media part per distinct blob (SHA-256) in each package, so the
+same picture inserted on several slides, or merged in from several decks,
+is stored once and every relationship points at that single part.
+"""
+
+import os
+import hashlib
+import weakref
+from functools import lru_cache
+
+
+MEDIA_PREFIX = "/ppt/media/"
+
+# package -> {"by_digest": {sha256: part}, "names": set(partnames)}
+_REGISTRIES = weakref.WeakKeyDictionary()
+
+
+def blob_sha256(blob: bytes) -> str:
+    """Return the SHA-256 hex digest of a media blob."""
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _is_media(part) -> bool:
+    return str(part.partname).startswith(MEDIA_PREFIX)
+
+
+def _registry(package, digests: dict = None) -> dict:
+    """
+    Return the media registry of `package`, indexing its existing media on
+    first use (with the {partname: sha256} `digests` already known, if any).
+    """
+    registry = _REGISTRIES.get(package)
+    if registry is None:
+        registry = {"by_digest": {}, "names": set()}
+        digests = digests or {}
+        for part in package.iter_parts():
+            if _is_media(part):
+                name = str(part.partname)
+                digest = digests.get(name) or blob_sha256(part.blob)
+                registry["by_digest"].setdefault(digest, part)
+                registry["names"].add(name)
+        _REGISTRIES[package] = registry
+    return registry
+
+
+def media_digests(package) -> dict:
+    """
+    SHA-256 of every media part of `package`, by partname (e.g. computed
+    once for a cached template and handed to `seed_media` for its copies).
+
+    Returns:
+        dict: {partname: sha256 hex digest}
+    """
+    return {str(part.partname): blob_sha256(part.blob) for part in package.iter_parts() if _is_media(part)}
+
+
+def seed_media(package, digests: dict):
+    """
+    Index the media of `package` from known digests instead of hashing
+    every blob again; a no-op when `package` is already indexed.
+
+    Args:
+        package (Package): Package to index (e.g. a deep copy of a template).
+        digests (dict): {partname: sha256} from `media_digests`.
+    """
+    _registry(package, digests)
+
+
+def media_parts(package) -> dict:
+    """
+    Media stored in `package`, by content.
+
+    Indexes the package on first call; call it before releasing written
+    parts (package_writer.PackageStream), as indexing reads every blob.
+
+    Returns:
+        dict: {sha256 hex digest: media part}
+    """
+    return _registry(package)["by_digest"]
+
+
+@lru_cache(maxsize=256)
+def _load_image(path: str, mtime_ns: int, size: int):
+    """Read an image file once per (path, mtime, size); returns (Image, sha256)."""
+    from pptx.parts.image import Image
+
+    image = Image.from_file(path)
+    return image, blob_sha256(image.blob)
+
+
+def get_or_add_image_part(package, image_file: str):
+    """
+    Return the image part holding `image_file`'s bytes, creating it only
+    when no part with the same SHA-256 exists in `package`.
+
+    Args:
+        package (Package): Target package (e.g. `slide.part.package`).
+        image_file (str): Path to the image.
+
+    Returns:
+        ImagePart: The shared image part.
+    """
+    st = os.stat(image_file)
+    image, digest = _load_image(os.path.abspath(image_file), st.st_mtime_ns, st.st_size)
+    return _get_or_add(package, image, digest)
+
+
+def get_or_add_image_blob(package, blob: bytes, filename: str = None):
+    """
+    Same as `get_or_add_image_part`, for image bytes already in memory
+    (e.g. the output of `image_pipeline`).
+
+    Args:
+        package (Package): Target package.
+        blob (bytes): Encoded image.
+        filename (str): Name recorded as the picture's description.
+
+    Returns:
+        ImagePart: The shared image part.
+    """
+    digest = blob_sha256(blob)
+    part = _registry(package)["by_digest"].get(digest)
+    if part is not None:
+        return part
+
+    from pptx.parts.image import Image
+
+    return _get_or_add(package, Image.from_blob(blob, filename), digest)
+
+
+def _get_or_add(package, image, digest):
+    registry = _registry(package)
+    part = registry["by_digest"].get(digest)
+    if part is None:
+        from pptx.opc.packuri import PackURI
+        from pptx.parts.image import ImagePart
+
+        # Named after its content, so the same image always gets the same partname
+        part = ImagePart(PackURI(f"{MEDIA_PREFIX}image-{digest[:16]}.{image.ext}"),
+                         image.content_type, package, image.blob, image.filename)
+        registry["by_digest"][digest] = part
+        registry["names"].add(str(part.partname))
+    return part
+
+
+def dedupe_part(package, part, digest: str = None):
+    """
+    Resolve a (possibly foreign) part before relating it into `package`.
+
+    Media parts whose blob is already stored in `package` are replaced by the
+    existing part. New media keeps its partname unless that name is taken, in
+    which case it is renamed after its content hash. Non-media parts are
+    returned unchanged.
+
+    Args:
+        package (Package): Target package.
+        part (Part): Part about to be related (may belong to another package).
+        digest (str): SHA-256 of the part's blob, when already known.
+
+    Returns:
+        Part: The part to relate to.
+    """
+    if not _is_media(part):
+        return part
+
+    registry = _registry(package)
+    digest = digest or blob_sha256(part.blob)
+    existing = registry["by_digest"].get(digest)
+    if existing is not None:
+        return existing
+
+    name = str(part.partname)
+    if name in registry["names"]:
+        from pptx.opc.packuri import PackURI
+
+        ext = os.path.splitext(name)[1]
+        part.partname = PackURI(f"{MEDIA_PREFIX}image-{digest[:16]}{ext}")
+    # Moved, not copied: the part no longer keeps its source package alive
+    part._package = package
+    registry["by_digest"][digest] = part
+    registry["names"].add(str(part.partname))
+    return part
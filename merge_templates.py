@@ -1,24 +1,143 @@
 import os
 import sys
-from pptx import Presentation
-from lxml import etree
-import datetime
-from pptx.parts.image import ImagePart
-from pptx.opc.constants import RELATIONSHIP_TYPE as RT
-# Monkeypatch para dar nomes únicos com timestamp aos arquivos de mídia
-def _custom_new_image_part(package, image, ext):
-    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    partname = f"/ppt/media/IMG_{ts}{ext.lower()}"
-    return package._package.create_part(partname, image.content_type, image.blob)
-
-
-def merge_pptx_slides(input_dir: str, output_file: str):
+import argparse
+from collections import deque
+from master_store import find_layout, get_or_add_layout, stats as master_stats
+from slide_clone import clone_slide, export_slides, import_slides
+from media_store import media_parts
+from package_writer import (PackageStream, forget_source_archive, register_archive_entries,
+                            register_source_archive, save_presentation, scan_source_archive)
+from tracing import span
+
+
+_RT_SLIDE_LAYOUT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout"
+
+
+def append_slides(merged_prs, source_prs):
+    """
+    Append every slide of `source_prs` to `merged_prs`, in memory.
+
+    Each slide keeps its own layout: layouts (and their masters and themes)
+    are matched by canonical content against the target's and moved in only
+    when new (see master_store). Slides are copied by slide_clone: their
+    XML tree as is, with media, charts, embeddings and hyperlinks related
+    into the target. `source_prs` must not be saved afterwards.
+
+    Args:
+        merged_prs (Presentation): Target presentation (modified in place).
+        source_prs (Presentation): Presentation whose slides are copied.
+
+    Returns:
+        int: Number of slides appended.
+    """
+    from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+    # source layout part -> target layout, resolved once per source deck
+    layouts, digests = {}, {}
+
+    for source_slide in source_prs.slides:
+        source_layout = source_slide.part.part_related_by(RT.SLIDE_LAYOUT)
+        target_layout = layouts.get(id(source_layout))
+        if target_layout is None:
+            target_layout = get_or_add_layout(merged_prs, source_layout, digests).slide_layout
+            layouts[id(source_layout)] = target_layout
+
+        clone_slide(merged_prs, source_slide, target_layout)
+
+    return len(source_prs.slides)
+
+
+def export_source(path: str) -> dict:
+    """
+    Parse one source deck and export its slides (merge worker side, see
+    `slide_clone.export_slides`). The raw-copy entries of the archive come
+    along, so the parent still copies its media without recompressing it.
+
+    Args:
+        path (str): Source .pptx.
+
+    Returns:
+        dict: Payload for `splice_source`.
+    """
+    from pptx import Presentation
+
+    with span("export_source", file=os.path.basename(path)):
+        prs = Presentation(path)
+        payload = export_slides(prs)
+        payload["archive"] = scan_source_archive(path, prs.part.package)
+    return payload
+
+
+def splice_source(merged_prs, path: str, payload: dict) -> int:
+    """
+    Append the slides of an `export_source` payload to `merged_prs`.
+
+    Layouts already in `merged_prs` are found by digest; the source is only
+    parsed here when one of its layouts is new.
+
+    Args:
+        merged_prs (Presentation): Target presentation (modified in place).
+        path (str): Source .pptx the payload was exported from.
+        payload (dict): Output of `export_source`.
+
+    Returns:
+        int: Number of slides appended.
+    """
+    from pptx import Presentation
+
+    register_archive_entries(*payload["archive"])
+    source = []
+
+    def layout_for(index, digest):
+        layout = find_layout(merged_prs, digest)
+        if layout is None:
+            if not source:
+                source.append(Presentation(path))
+            layout_part = source[0].slides[index].part.part_related_by(_RT_SLIDE_LAYOUT)
+            layout = get_or_add_layout(merged_prs, layout_part).slide_layout
+        return layout
+
+    return import_slides(merged_prs, payload, layout_for)
+
+
+def _exported_sources(paths, workers: int):
+    """Yield (path, payload) in `paths` order, exporting up to 2 × `workers` sources ahead in a process pool."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for path in paths:
+            pending.append((path, pool.submit(export_source, path)))
+            if len(pending) > workers * 2:
+                done, future = pending.popleft()
+                yield done, future.result()
+        while pending:
+            done, future = pending.popleft()
+            yield done, future.result()
+
+
+def _not_layout(rel):
+    return rel.reltype != _RT_SLIDE_LAYOUT
+
+
+def merge_pptx_slides(input_dir: str, output_file: str, stream: bool = False, workers: int = 1):
     """
     Merge multiple PPTX files into a single presentation.
     Preserves backgrounds, layouts, text, images, colors and formatting
     by copying slides exactly as in the originals.
+
+    With `stream`, the slides of each source (with their media, charts and
+    embeddings) are written to `output_file` as soon as the source is
+    merged, and the source is released before the next one is opened; the
+    presentation part, masters, layouts and content types are written at
+    the end. Peak memory then stays about one source deck plus the distinct
+    masters and layouts, however many decks are merged.
+
+    With `workers` > 1, sources are parsed and exported in that many worker
+    processes (`export_source`) while this process splices them in sorted
+    order (`splice_source`); the output is the same as a serial merge.
     """
-    ImagePart._new = staticmethod(_custom_new_image_part)
+    from pptx import Presentation
 
     files = sorted(f for f in os.listdir(input_dir) if f.endswith(".pptx"))
     if not files:
@@ -27,6 +146,7 @@ def merge_pptx_slides(input_dir: str, output_file: str):
     # Create a new empty presentation from the first file (to preserve theme/masters)
     base_file = os.path.join(input_dir, files[0])
     merged_prs = Presentation(base_file)
+    register_source_archive(base_file, merged_prs.part.package)
 
     # Remove all slides from the base
     while len(merged_prs.slides) > 0:
@@ -34,142 +154,67 @@ def merge_pptx_slides(input_dir: str, output_file: str):
         merged_prs.part.drop_rel(rId)
         del merged_prs.slides._sldIdLst[0]
 
+    writer = None
+    if stream:
+        # Index the base's media and layouts while every blob is still in memory
+        media_parts(merged_prs.part.package)
+        master_stats(merged_prs)
+        writer = PackageStream(output_file)
+
+    paths = [os.path.join(input_dir, filename) for filename in files]
+
+    def merged_sources():
+        """Yield (filepath, slides added), merging one source per step."""
+        if workers > 1:
+            for filepath, payload in _exported_sources(paths, workers):
+                with span("merge_source", file=os.path.basename(filepath)):
+                    added = splice_source(merged_prs, filepath, payload)
+                    del payload
+                yield filepath, added
+            return
+        for filepath in paths:
+            with span("merge_source", file=os.path.basename(filepath)):
+                source_prs = Presentation(filepath)
+                register_source_archive(filepath, source_prs.part.package)
+                added = append_slides(merged_prs, source_prs)
+                del source_prs
+            yield filepath, added
+
     # Process each file
-    for filename in files:
-        filepath = os.path.join(input_dir, filename)
-        source_prs = Presentation(filepath)
-
-        for source_slide in source_prs.slides:
-            # Get the source slide layout
-            source_layout = source_slide.slide_layout
-            
-            # Try to find matching layout in merged presentation
-            try:
-                layout_idx = source_prs.slide_layouts.index(source_layout)
-                target_layout = merged_prs.slide_layouts[layout_idx]
-            except (ValueError, IndexError):
-                target_layout = merged_prs.slide_layouts[6]  # Blank layout fallback
-            
-            # Create new slide
-            new_slide = merged_prs.slides.add_slide(target_layout)
-            
-            # Remove all default shapes from the new slide
-            for shape in list(new_slide.shapes):
-                sp = shape.element
-                sp.getparent().remove(sp)
-            
-            # Map to track old rId -> new rId for images and other relationships
-            rid_map = {}
-            
-            # Copy all relationships (images, charts, etc.) from source slide
-            for rel in source_slide.part.rels.values():
-                # Skip slide layout relationship (already handled)
-                if rel.reltype == RT.SLIDE_LAYOUT:
-                    continue
-                
-                try:
-                    # Get the related part (image, chart, etc.)
-                    related_part = rel.target_part
-                    
-                    # Add the related part to the new slide
-                    if rel.reltype == RT.IMAGE:
-                        # For images, copy the image data
-                        new_rel = new_slide.part.relate_to(related_part, rel.reltype)
-                        rid_map[rel.rId] = new_rel.rId
-                    else:
-                        # For other relationships, just create the relationship
-                        try:
-                            new_rel = new_slide.part.relate_to(related_part, rel.reltype)
-                            rid_map[rel.rId] = new_rel.rId
-                        except:
-                            pass
-                except Exception as e:
-                    print(f"⚠️  Warning: Could not copy relationship {rel.rId}: {e}")
-                    continue
-            
-            # Copy the entire slide structure from source
-            for shape in source_slide.shapes:
-                el = shape.element
-                # Clone the element completely
-                new_el = etree.fromstring(etree.tostring(el))
-                
-                # Update image references (rId) in the cloned element
-                # Look for blip elements (images)
-                nsmap = {
-                    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
-                    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
-                    'p': 'http://schemas.openxmlformats.org/presentationml/2006/main'
-                }
-                
-                # Find all image references and update their rIds
-                for blip in new_el.findall('.//a:blip', namespaces=nsmap):
-                    old_rid = blip.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed')
-                    if old_rid and old_rid in rid_map:
-                        blip.set('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed', 
-                                rid_map[old_rid])
-                
-                # Add the shape to the new slide
-                new_slide.shapes._spTree.append(new_el)
-            
-            # Copy slide background
-            try:
-                source_bg = source_slide.element.cSld.bg
-                if source_bg is not None:
-                    # Clone background element
-                    new_bg = etree.fromstring(etree.tostring(source_bg))
-                    
-                    # Update background image references if present
-                    nsmap = {
-                        'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
-                        'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
-                    }
-                    for blip in new_bg.findall('.//a:blip', namespaces=nsmap):
-                        old_rid = blip.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed')
-                        if old_rid and old_rid in rid_map:
-                            blip.set('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed', 
-                                    rid_map[old_rid])
-                    
-                    # Remove existing background if present
-                    existing_bg = new_slide.element.cSld.find('.//p:bg', 
-                        namespaces={'p': 'http://schemas.openxmlformats.org/presentationml/2006/main'})
-                    if existing_bg is not None:
-                        existing_bg.getparent().remove(existing_bg)
-                    # Add new background
-                    new_slide.element.cSld.insert(0, new_bg)
-            except AttributeError:
-                pass  # No background to copy
-            
-            # Copy color map override if present
-            try:
-                source_clrmap = source_slide.element.find('.//p:clrMapOvr',
-                    namespaces={'p': 'http://schemas.openxmlformats.org/presentationml/2006/main'})
-                if source_clrmap is not None:
-                    new_clrmap = etree.fromstring(etree.tostring(source_clrmap))
-                    existing_clrmap = new_slide.element.find('.//p:clrMapOvr',
-                        namespaces={'p': 'http://schemas.openxmlformats.org/presentationml/2006/main'})
-                    if existing_clrmap is not None:
-                        existing_clrmap.getparent().remove(existing_clrmap)
-                    new_slide.element.append(new_clrmap)
-            except:
-                pass
-
-        print(f"✅ Added {len(source_prs.slides)} slide(s) from {filename}")
-
-    merged_prs.save(output_file)
+    for filepath, added in merged_sources():
+        if writer is not None and added:
+            sld_ids = merged_prs.slides._sldIdLst[-added:]
+            writer.write_parts([merged_prs.part.related_part(s.rId) for s in sld_ids], follow=_not_layout)
+            if filepath != base_file:
+                forget_source_archive(filepath)
+
+        print(f"✅ Added {added} slide(s) from {os.path.basename(filepath)}")
+
+    try:
+        if writer is not None:
+            writer.close(merged_prs.part.package)
+        else:
+            save_presentation(merged_prs, output_file)
+    finally:
+        # The raw-copy registrations only serve this merge
+        for filepath in paths:
+            forget_source_archive(filepath)
     print(f"\n🎉 Final merged file saved as: {output_file}")
     print(f"📊 Total slides: {len(merged_prs.slides)}")
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python merge_templates.py ./templates/blue-blur/dark merged-dark.pptx")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Merge every .pptx of a directory into one deck.")
+    parser.add_argument("input_dir", help="Directory of decks, merged in sorted filename order")
+    parser.add_argument("output_file", help="Merged .pptx")
+    parser.add_argument("--stream", action="store_true", help="Write each source's slides as it is merged (bounded memory)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes parsing the sources (0: CPU count; default: 1, no workers)")
+    args = parser.parse_args()
 
-    input_dir = sys.argv[1]
-    output_file = sys.argv[2]
-    
-    if not os.path.exists(input_dir):
-        print(f"❌ Error: Directory '{input_dir}' not found")
+    if not os.path.exists(args.input_dir):
+        print(f"❌ Error: Directory '{args.input_dir}' not found")
         sys.exit(1)
-    
-    merge_pptx_slides(input_dir, output_file)
\ No newline at end of file
+
+    merge_pptx_slides(args.input_dir, args.output_file, stream=args.stream,
+                      workers=args.workers or os.cpu_count() or 1)
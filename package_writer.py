@@ -0,0 +1,477 @@
+"""
+Deterministic Package Writer
+----------------------------
+
+Saves a python-pptx presentation with fixed zip metadata (timestamp,
+permissions, member order), so the same inputs always produce a
+byte-identical .pptx that can be hashed, cached and deduplicated.
+
+`save_package_subset` writes only the parts reachable through the
+relationships a filter keeps, which lets one parsed package be saved as
+several smaller packages (see split_templates).
+
+Zip entries that are unchanged from a registered source archive (see
+`register_source_archive`) are copied byte-for-byte from it, without
+inflating and deflating them again; only parts whose bytes differ are
+compressed. Entries are matched by CRC-32 and size, then confirmed with a
+BLAKE2 digest of the bytes. An entry is only registered for raw copying
+when its stored bytes are exactly what recompressing it would write (at
+DEFAULT_COMPRESSLEVEL), which is checked once, on registration; so whether
+an entry is copied or recompressed never changes the output, and the saved
+file only depends on the presentation. Entries of archives written by
+another deflater (e.g. PowerPoint) are always recompressed.
+
+Raw copies go through zipfile internals, so they are only made on the
+Python versions they were written against (RAW_COPY_PYTHONS) and when
+those internals are present. At most MAX_SOURCE_ARCHIVES archives (env
+CAROUSEL_RAW_ARCHIVES) stay registered, least recently registered first
+out.
+
+`PackageStream` writes a package in several passes for bounded-memory
+merges: parts are written as soon as they are final and their content is
+released, and the remaining parts, the package rels and the content types
+come last, on `close()`.
+"""
+
+import os
+import sys
+import zlib
+import struct
+import hashlib
+import threading
+import zipfile
+from collections import OrderedDict
+from tracing import span
+
+
+# Earliest date representable in a zip header
+FIXED_ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+# Deflate level for entries that are (re)compressed; None uses zlib's default
+DEFAULT_COMPRESSLEVEL = int(os.environ["CAROUSEL_ZIP_LEVEL"]) if os.environ.get("CAROUSEL_ZIP_LEVEL") else None
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+MAX_SOURCE_ARCHIVES = int(os.environ.get("CAROUSEL_RAW_ARCHIVES", "128"))
+
+# Python versions whose zipfile internals `_write_raw` relies on (inclusive)
+RAW_COPY_PYTHONS = ((3, 8), (3, 13))
+_ZIPFILE_INTERNALS = ("_lock", "_seekable", "_writecheck", "_didModify", "start_dir", "filelist", "NameToInfo", "fp")
+
+# (crc32, size) -> (archive path, ZipInfo, blake2b digest, compresslevel) of entries that can be copied raw
+_RAW_ENTRIES = {}
+# archive path -> ((mtime_ns, size) when it was registered, its keys in _RAW_ENTRIES), oldest first
+_ARCHIVES = OrderedDict()
+_RAW_LOCK = threading.Lock()
+
+
+def _digest(blob: bytes) -> bytes:
+    return hashlib.blake2b(blob, digest_size=16).digest()
+
+
+def _deflate(blob: bytes, compresslevel) -> bytes:
+    """The compressed bytes `ZipFile.writestr` stores for `blob` (see zipfile._get_compressor)."""
+    level = zlib.Z_DEFAULT_COMPRESSION if compresslevel is None else compresslevel
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(blob) + compressor.flush()
+
+
+def _read_stored(f, info):
+    """Return the stored (compressed) bytes of `info` from open archive `f`, or None if unusable."""
+    f.seek(info.header_offset)
+    header = f.read(_LOCAL_HEADER.size)
+    if len(header) < _LOCAL_HEADER.size or header[:4] != b"PK\x03\x04":
+        return None
+    name_len, extra_len = _LOCAL_HEADER.unpack(header)[-2:]
+    if f.read(name_len) != info.orig_filename.encode("utf-8" if info.flag_bits & 0x800 else "cp437"):
+        return None
+    f.seek(extra_len, os.SEEK_CUR)
+    data = f.read(info.compress_size)
+    return data if len(data) == info.compress_size else None
+
+
+def scan_source_archive(path: str, package, compresslevel=None) -> tuple:
+    """
+    Match the parts of `package` to the entries of the .pptx it was parsed
+    from, without registering them (e.g. in a worker process; the result
+    is picklable and goes to `register_archive_entries`).
+
+    Only entries stored exactly as recompressing them at `compresslevel`
+    would store them are kept (see the module docstring).
+
+    Args:
+        path (str): Source .pptx.
+        package (Package): The package parsed from `path` (e.g. `prs.part.package`).
+        compresslevel (int): Deflate level the entries are checked against
+            (None uses DEFAULT_COMPRESSLEVEL).
+
+    Returns:
+        tuple: (absolute path, (mtime_ns, size), entries)
+    """
+    if compresslevel is None:
+        compresslevel = DEFAULT_COMPRESSLEVEL
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    with zipfile.ZipFile(path) as zf:
+        infos = {info.filename: info for info in zf.infolist()
+                 if info.compress_type == zipfile.ZIP_DEFLATED
+                 and not info.flag_bits & 0x1}  # skip encrypted entries
+
+    entries = {}
+    with open(path, "rb") as f:
+        for name, blob in _serialized_members(package):
+            info = infos.get(name)
+            if info is None or info.CRC != zlib.crc32(blob) or info.file_size != len(blob):
+                continue
+            if _read_stored(f, info) == _deflate(blob, compresslevel):
+                entries[(info.CRC, len(blob))] = (path, info, _digest(blob), compresslevel)
+    return path, (st.st_mtime_ns, st.st_size), entries
+
+
+def register_archive_entries(path: str, stamp: tuple, entries: dict):
+    """Make entries found by `scan_source_archive` available for raw copying on save."""
+    with _RAW_LOCK:
+        # Re-registered (file changed): forget the entries of the old version
+        _forget(path)
+        _ARCHIVES[path] = (stamp, list(entries))
+        _RAW_ENTRIES.update(entries)
+        while len(_ARCHIVES) > MAX_SOURCE_ARCHIVES:
+            _forget(next(iter(_ARCHIVES)))
+
+
+def _forget(path: str):
+    """Drop a registered archive and its entries (caller holds _RAW_LOCK)."""
+    registered = _ARCHIVES.pop(path, None)
+    if registered is None:
+        return
+    for key in registered[1]:
+        entry = _RAW_ENTRIES.get(key)
+        # Another archive may have registered the same bytes since
+        if entry is not None and entry[0] == path:
+            del _RAW_ENTRIES[key]
+
+
+def register_source_archive(path: str, package):
+    """
+    Make the entries of a .pptx on disk available for raw copying on save.
+
+    Each part of `package` is matched to its original entry through the
+    bytes python-pptx writes for it; parts whose XML re-serializes
+    differently (line endings, declarations) are recompressed.
+
+    Args:
+        path (str): Source .pptx.
+        package (Package): The package parsed from `path` (e.g. `prs.part.package`).
+    """
+    register_archive_entries(*scan_source_archive(path, package))
+
+
+def _serialized_members(package):
+    """Yield (member name, bytes as saved) for every part and rels file of `package`."""
+    from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+    from pptx.opc.oxml import serialize_part_xml
+    from pptx.opc.serialized import _ContentTypesItem
+
+    items = list(iter_package_parts(package))
+    yield CONTENT_TYPES_URI.membername, serialize_part_xml(_ContentTypesItem.xml_for([p for p, _ in items]))
+    yield PACKAGE_URI.rels_uri.membername, _rels_xml(_kept_rels(package, package._rels, None))
+    for part, rels in items:
+        yield part.partname.membername, part.blob
+        if rels:
+            yield part.partname.rels_uri.membername, _rels_xml(rels)
+
+
+class _RawSource:
+    """Open source archives for one save, validated against their registration."""
+
+    def __init__(self):
+        self._files = {}
+
+    def read(self, path, info):
+        """Return the stored (compressed) bytes of `info`, or None if unusable."""
+        f = self._files.get(path, False)
+        if f is False:
+            f = None
+            try:
+                st = os.stat(path)
+                registered = _ARCHIVES.get(path)
+                if registered is not None and registered[0] == (st.st_mtime_ns, st.st_size):
+                    f = open(path, "rb")
+            except OSError:
+                pass
+            self._files[path] = f
+        return None if f is None else _read_stored(f, info)
+
+    def close(self):
+        for f in self._files.values():
+            if f is not None:
+                f.close()
+
+
+def forget_source_archive(path: str):
+    """Drop the raw-copy entries of a registered archive (e.g. once its parts are written)."""
+    with _RAW_LOCK:
+        _forget(os.path.abspath(path))
+
+
+def _can_write_raw(zf: zipfile.ZipFile) -> bool:
+    """Whether `_write_raw` may be used on `zf` (see RAW_COPY_PYTHONS)."""
+    return (RAW_COPY_PYTHONS[0] <= sys.version_info[:2] <= RAW_COPY_PYTHONS[1]
+            and all(hasattr(zf, name) for name in _ZIPFILE_INTERNALS))
+
+
+def _write_raw(zf: zipfile.ZipFile, name: str, source: zipfile.ZipInfo, data: bytes):
+    """
+    Append an already-compressed entry to `zf`. zipfile has no public API
+    for this, so it writes through its internals; callers check
+    `_can_write_raw` first.
+    """
+    info = zipfile.ZipInfo(name, date_time=FIXED_ZIP_DATE)
+    info.compress_type = source.compress_type
+    info.external_attr = 0o644 << 16
+    info.CRC = source.CRC
+    info.compress_size = source.compress_size
+    info.file_size = source.file_size
+    with zf._lock:
+        if zf._seekable:
+            zf.fp.seek(zf.start_dir)
+        info.header_offset = zf.fp.tell()
+        zf._writecheck(info)
+        zf._didModify = True
+        zf.fp.write(info.FileHeader())
+        zf.fp.write(data)
+        zf.start_dir = zf.fp.tell()
+        zf.filelist.append(info)
+        zf.NameToInfo[name] = info
+
+
+def _write_member(zf: zipfile.ZipFile, name: str, blob: bytes, compresslevel=None, raw=None):
+    if raw is not None and _RAW_ENTRIES and _can_write_raw(zf):
+        entry = _RAW_ENTRIES.get((zlib.crc32(blob), len(blob)))
+        if entry is not None and entry[3] == compresslevel and entry[2] == _digest(blob):
+            data = raw.read(entry[0], entry[1])
+            if data is not None:
+                _write_raw(zf, name, entry[1], data)
+                return
+    info = zipfile.ZipInfo(name, date_time=FIXED_ZIP_DATE)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.external_attr = 0o644 << 16
+    zf.writestr(info, blob, compresslevel=compresslevel)
+
+
+def _kept_rels(source, rels, include_rel):
+    """Relationships of `source` that pass `include_rel`, in numerical rId order."""
+    def order(rId):
+        return int(rId[3:]) if rId.startswith("rId") and rId[3:].isdigit() else 0
+    kept = [rels[rId] for rId in sorted(rels.keys(), key=order)]
+    if include_rel is not None:
+        kept = [rel for rel in kept if include_rel(source, rel)]
+    return kept
+
+
+def _rels_xml(rels) -> bytes:
+    from pptx.opc.oxml import CT_Relationships
+
+    rels_elm = CT_Relationships.new()
+    for rel in rels:
+        rels_elm.add_rel(rel.rId, rel.reltype, rel.target_ref, rel.is_external)
+    return rels_elm.xml_file_bytes
+
+
+def iter_package_parts(package, include_rel=None, exclude=()):
+    """
+    Yield (part, kept_rels) for every part reachable from the package rels.
+
+    Walks the relationship graph depth-first in the same order as
+    python-pptx, skipping relationships for which `include_rel(source, rel)`
+    is False (source is the package itself for package-level rels), and
+    parts in `exclude` along with what is only reachable through them.
+    """
+    visited = set(exclude)
+
+    def walk(source, rels):
+        for rel in rels:
+            if rel.is_external:
+                continue
+            part = rel.target_part
+            if part in visited:
+                continue
+            visited.add(part)
+            part_rels = _kept_rels(part, part.rels, include_rel) if part._rels else []
+            yield part, part_rels
+            yield from walk(part, part_rels)
+
+    yield from walk(package, _kept_rels(package, package._rels, include_rel))
+
+
+def save_package_subset(package, pkg_file, include_rel=None, blob_overrides=None, compresslevel=None,
+                        raw_copy=True):
+    """
+    Save the parts of `package` reachable through the kept relationships.
+
+    Args:
+        package (Package): python-pptx package (e.g. `prs.part.package`).
+        pkg_file (str | file-like): Destination path or binary stream.
+        include_rel (callable): `include_rel(source, rel) -> bool`; None keeps all.
+        blob_overrides (dict): {part: bytes} written instead of `part.blob`.
+        compresslevel (int): Deflate level 0-9 for recompressed entries
+            (None uses DEFAULT_COMPRESSLEVEL).
+        raw_copy (bool): Copy entries unchanged from a registered source
+            archive without recompressing them.
+    """
+    from pptx.opc.oxml import serialize_part_xml
+    from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+    from pptx.opc.serialized import _ContentTypesItem
+
+    blob_overrides = blob_overrides or {}
+    if compresslevel is None:
+        compresslevel = DEFAULT_COMPRESSLEVEL
+    items = list(iter_package_parts(package, include_rel))
+    parts = [part for part, _ in items]
+    raw = _RawSource() if raw_copy else None
+
+    try:
+        with span("save", parts=len(parts)), zipfile.ZipFile(pkg_file, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            _write_member(zf, CONTENT_TYPES_URI.membername,
+                          serialize_part_xml(_ContentTypesItem.xml_for(parts)), compresslevel, raw)
+            _write_member(zf, PACKAGE_URI.rels_uri.membername,
+                          _rels_xml(_kept_rels(package, package._rels, include_rel)), compresslevel, raw)
+            for part, rels in items:
+                blob = blob_overrides.get(part)
+                _write_member(zf, part.partname.membername, part.blob if blob is None else blob,
+                              compresslevel, raw)
+                if rels:
+                    _write_member(zf, part.partname.rels_uri.membername, _rels_xml(rels), compresslevel, raw)
+    finally:
+        if raw is not None:
+            raw.close()
+
+
+def save_presentation(prs, pkg_file, compresslevel=None, raw_copy=True):
+    """
+    Save `prs` with deterministic zip metadata.
+
+    Parts are written in the package's relationship-walk order, which only
+    depends on the presentation content.
+
+    Args:
+        prs (Presentation): Presentation to save.
+        pkg_file (str | file-like): Destination path or binary stream.
+        compresslevel (int): Deflate level 0-9 for recompressed entries.
+        raw_copy (bool): Copy entries unchanged from a registered source archive.
+    """
+    save_package_subset(prs.part.package, pkg_file, compresslevel=compresslevel, raw_copy=raw_copy)
+
+
+# Attributes kept on a part written by a PackageStream: name, type and relationships
+_RELEASED_KEEP = frozenset({"_partname", "_content_type", "_package", "_rels", "rels"})
+
+
+def _release(part):
+    """Drop the content of a written part, and the proxies python-pptx cached over it."""
+    attrs = vars(part)
+    for name in [n for n in attrs if n not in _RELEASED_KEEP]:
+        del attrs[name]
+
+
+class PackageStream:
+    """
+    Write a package to a .pptx in several passes, keeping memory bounded.
+
+    `write_parts` writes parts that are final (e.g. the slides of one merged
+    source, with their media and charts) and releases their content; they
+    stay in the package as empty shells so relationships to them still
+    resolve, but must not be read or modified again. `close` writes every
+    part not written yet, the package rels and the content types.
+
+    Entries are deterministic as with `save_presentation`, but ordered by
+    write pass, so the file differs from a single-pass save of the same
+    presentation.
+
+        stream = PackageStream("merged.pptx")
+        stream.write_parts(slide_parts, follow=lambda rel: rel.reltype != RT.SLIDE_LAYOUT)
+        stream.close(prs.part.package)
+    """
+
+    def __init__(self, pkg_file, compresslevel=None, raw_copy=True):
+        """
+        Args:
+            pkg_file (str | file-like): Destination path or binary stream.
+            compresslevel (int): Deflate level 0-9 for recompressed entries
+                (None uses DEFAULT_COMPRESSLEVEL).
+            raw_copy (bool): Copy entries unchanged from a registered source archive.
+        """
+        self._zf = zipfile.ZipFile(pkg_file, "w", compression=zipfile.ZIP_DEFLATED)
+        self._compresslevel = DEFAULT_COMPRESSLEVEL if compresslevel is None else compresslevel
+        self._raw_copy = raw_copy
+        # Written parts, in write order (dict as an ordered set)
+        self._written = {}
+
+    def _write(self, items):
+        raw = _RawSource() if self._raw_copy else None
+        try:
+            with span("save", parts=len(items), streamed=True):
+                for part, rels in items:
+                    _write_member(self._zf, part.partname.membername, part.blob, self._compresslevel, raw)
+                    if rels:
+                        _write_member(self._zf, part.partname.rels_uri.membername, _rels_xml(rels),
+                                      self._compresslevel, raw)
+        finally:
+            if raw is not None:
+                raw.close()
+
+    def write_parts(self, parts, follow=None) -> int:
+        """
+        Write `parts`, and the parts they reach, then release their content.
+
+        Args:
+            parts (iterable of Part): Parts whose content is final.
+            follow (callable): `follow(rel) -> bool`, whether the target of
+                one of their relationships is written too (and so on
+                recursively); None follows all. Every relationship is still
+                written in the parts' rels.
+
+        Returns:
+            int: Number of parts written (already written ones are skipped).
+        """
+        items = []
+
+        def walk(part):
+            if part in self._written:
+                return
+            self._written[part] = None
+            rels = _kept_rels(part, part.rels, None) if part._rels else []
+            items.append((part, rels))
+            for rel in rels:
+                if not rel.is_external and (follow is None or follow(rel)):
+                    walk(rel.target_part)
+
+        for part in parts:
+            walk(part)
+        self._write(items)
+        for part, _ in items:
+            _release(part)
+        return len(items)
+
+    def close(self, package):
+        """
+        Write the parts of `package` not written yet, the package rels and
+        the content types, and finish the file.
+
+        Args:
+            package (Package): The package being written (e.g. `prs.part.package`).
+        """
+        from pptx.opc.oxml import serialize_part_xml
+        from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+        from pptx.opc.serialized import _ContentTypesItem
+
+        try:
+            items = list(iter_package_parts(package, exclude=self._written))
+            self._write(items)
+            parts = list(self._written) + [part for part, _ in items]
+            _write_member(self._zf, PACKAGE_URI.rels_uri.membername,
+                          _rels_xml(_kept_rels(package, package._rels, None)), self._compresslevel)
+            _write_member(self._zf, CONTENT_TYPES_URI.membername,
+                          serialize_part_xml(_ContentTypesItem.xml_for(parts)), self._compresslevel)
+        finally:
+            self._zf.close()
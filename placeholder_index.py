@@ -0,0 +1,122 @@
+"""
+Placeholder Index
+-----------------
+
+One-time scan of a template that records every shape holding text (with
+that text) and every picture placeholder. Rendering then jumps straight to
+those shapes and matches the mapping's placeholder keys ([HOOK], {{CTA}},
+any string) against the recorded text, instead of walking every shape and
+reading its text frame.
+
+Indexes are kept in memory and cached on disk next to the template
+(`Cover.pptx` → `Cover.pptx.phindex.json`), keyed by the template's SHA-256.
+"""
+
+import os
+import json
+from template_cache import TEMPLATE_CACHE
+from tracing import span
+
+
+INDEX_VERSION = 2
+INDEX_SUFFIX = ".phindex.json"
+
+# (abs path, sha256) -> index
+_INDEXES = {}
+
+
+def compile_placeholder_index(prs) -> dict:
+    """
+    Scan a presentation and record every shape rendering needs to touch.
+
+    Args:
+        prs (Presentation): Parsed template.
+
+    Returns:
+        dict: {"version", "shapes": [{"slide", "pos", "shape_id", "kind", "text"}]}
+        where `pos` is the shape's position inside the slide's spTree and
+        `kind` is "picture" or "text". Placeholder keys are not known here:
+        every shape with text is recorded and matched at fill time.
+    """
+    from pptx.enum.shapes import MSO_SHAPE_TYPE, PP_PLACEHOLDER
+
+    shapes = []
+    with span("placeholder_scan", slides=len(prs.slides)):
+        for slide_idx, slide in enumerate(prs.slides):
+            sp_tree = slide.shapes._spTree
+            for shape in slide.shapes:
+                entry = {"slide": slide_idx, "pos": sp_tree.index(shape.element), "shape_id": shape.shape_id}
+                if shape.is_placeholder and shape.placeholder_format.type == PP_PLACEHOLDER.PICTURE:
+                    entry.update(kind="picture", text="")
+                elif shape.shape_type == MSO_SHAPE_TYPE.PICTURE or not shape.has_text_frame:
+                    continue
+                else:
+                    text = shape.text_frame.text
+                    if not text:
+                        continue
+                    entry.update(kind="text", text=text)
+                shapes.append(entry)
+    return {"version": INDEX_VERSION, "shapes": shapes}
+
+
+def load_placeholder_index(template_path: str) -> dict:
+    """
+    Return the placeholder index of a template, compiling it at most once
+    per template content.
+
+    Looks in memory, then in `{template}.phindex.json` (accepted only when its
+    SHA-256 matches the template), and finally compiles and writes it.
+
+    Args:
+        template_path (str): Path to the .pptx template.
+
+    Returns:
+        dict: The index (see `compile_placeholder_index`).
+    """
+    path = os.path.abspath(template_path)
+    digest = TEMPLATE_CACHE.digest(path)
+    index = _INDEXES.get((path, digest))
+    if index is not None:
+        return index
+
+    cache_file = path + INDEX_SUFFIX
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("sha256") == digest and data.get("version") == INDEX_VERSION:
+            index = data
+    except (OSError, ValueError):
+        pass
+
+    if index is None:
+        index = compile_placeholder_index(TEMPLATE_CACHE.get(path))
+        index["sha256"] = digest
+        try:
+            with open(cache_file, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False, indent=1)
+        except OSError as e:
+            print(f"⚠️ Could not cache placeholder index for {template_path}: {e}")
+
+    _INDEXES[(path, digest)] = index
+    return index
+
+
+def iter_indexed_shapes(prs, index):
+    """
+    Yield (slide, shape, entry) for every indexed shape of `prs`.
+
+    Shapes are looked up by their recorded spTree position and checked by id,
+    falling back to an id search if the tree no longer matches.
+    """
+    slides = prs.slides
+    for entry in index["shapes"]:
+        slide = slides[entry["slide"]]
+        shapes = slide.shapes
+        sp_tree = shapes._spTree
+        pos = entry["pos"]
+        el = sp_tree[pos] if pos < len(sp_tree) else None
+        if el is None or getattr(el, "shape_id", None) != entry["shape_id"]:
+            el = next((e for e in sp_tree.iter_shape_elms() if e.shape_id == entry["shape_id"]), None)
+            if el is None:
+                continue
+        yield slide, shapes._shape_factory(el), entry
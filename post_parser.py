@@ -0,0 +1,196 @@
+"""
+Post Parser
+-----------
+
+Single tokenizer for tagged posts, shared by every entry point. Works in
+one pass over a string, a file or any iterable of lines, and yields posts
+one at a time, so an export with hundreds of posts is never loaded whole.
+
+An export holds one or more posts separated by a line of three or more
+dashes, optionally followed by the post's id:
+
+    --- post-001
+    [HOOK]
+    Transforming Business with AI Agents
+    [CTA]
+    What would you automate first?
+    --- post-002
+    ...
+
+Inside a post, a line `[TAG]` starts a section when TAG is a known section
+name; following non-empty lines belong to it. Unknown tags, text before
+the first tag and repeated sections are reported as line-numbered
+diagnostics instead of being dropped silently.
+
+Delimiters only apply to exports (`iter_posts`, `iter_posts_file`): a
+single post (`parse_post`) may contain dash lines as content.
+
+Usage:
+    python post_parser.py export.txt        # lint an export, print diagnostics
+"""
+
+import re
+import sys
+from tracing import span
+
+
+# Supported post sections. Any block outside these tags will be ignored.
+SECTIONS = frozenset({
+    "HOOK",
+    "HOOK_SUB",
+    "STORY",
+    "STORY_SUB",
+    "TOPIC",
+    "TOPIC_SUB",
+    "SUBJECT",
+    "ONE",
+    "ONE_SUB",
+    "IMAGE_TOP",
+    "IMAGE_TOP_SUB",
+    "IMAGE_BOTTOM",
+    "IMAGE_BOTTOM_SUB",
+    "IMAGE_BOTTOM_RIGHT",
+    "IMAGE_BOTTOM_RIGHT_SUB",
+    "IMAGE_BOTTOM_RIGHT_CAP",
+    "IMAGE_BOTTOM_LEFT",
+    "IMAGE_BOTTOM_LEFT_SUB",
+    "IMAGE_BOTTOM_LEFT_CAP",
+    "CTA",
+    "CTA_SUB",
+})
+
+# "---" or "--- post-001" between posts
+POST_DELIMITER_RE = re.compile(r"^-{3,}(?:\s+(?P<id>\S.*?))?\s*$")
+
+
+
+def _iter_lines(source):
+    """Lines of a str (split on newlines) or of any iterable of lines (e.g. an open file)."""
+    if isinstance(source, str):
+        return iter(source.splitlines())
+    return (line.rstrip("\r\n") for line in source)
+
+
+def _new_post(post_id, line_no):
+    return {"id": post_id, "line": line_no, "sections": {}, "diagnostics": [], "text": []}
+
+
+def _finish(post):
+    post["text"] = "\n".join(post["text"])
+    return post
+
+
+def _tag(line: str, sections, bare_tags: bool):
+    """Tag named by a stripped line (known or not), or None when the line is content."""
+    tag = line.strip("[]").upper()
+    if line.startswith("[") and line.endswith("]"):
+        return tag
+    # Bare words are content unless they name a section
+    return tag if bare_tags and tag in sections else None
+
+
+def iter_posts(source, sections=SECTIONS, bare_tags: bool = False, delimiters: bool = True):
+    """
+    Parse a document of one or more posts, yielding each post as soon as it ends.
+
+    Args:
+        source (str | iterable): Document text, an open text file or an
+            iterable of lines.
+        sections (iterable): Section names accepted as tags.
+        bare_tags (bool): Also accept tags written without brackets
+            (`HOOK` alone on a line), as the original fill_carousel did.
+        delimiters (bool): Split posts on `---` / `--- <id>` lines; when
+            False the whole source is one post and dash lines are content.
+
+    Yields:
+        dict: {"id": str | None, "line": first line number, "sections":
+        {SECTION: [lines]}, "diagnostics": [{"line", "message"}], "text": raw post text}
+    """
+    sections = frozenset(s.upper() for s in sections)
+    post = _new_post(None, 1)
+    current = None
+
+    for line_no, raw in enumerate(_iter_lines(source), start=1):
+        line = raw.strip()
+
+        delimiter = POST_DELIMITER_RE.match(line) if delimiters else None
+        if delimiter:
+            if post["sections"] or post["text"] or post["id"]:
+                yield _finish(post)
+            post = _new_post(delimiter.group("id"), line_no + 1)
+            current = None
+            continue
+
+        post["text"].append(raw)
+        if not line:
+            continue
+
+        tag = _tag(line, sections, bare_tags)
+
+        if tag is not None:
+            if tag in sections:
+                if tag in post["sections"]:
+                    post["diagnostics"].append(
+                        {"line": line_no, "message": f"section [{tag}] repeated; earlier text replaced"})
+                current = tag
+                post["sections"][current] = []
+            else:
+                post["diagnostics"].append({"line": line_no, "message": f"unknown tag [{tag}] ignored"})
+            continue
+
+        if current:
+            post["sections"][current].append(line)
+        else:
+            post["diagnostics"].append({"line": line_no, "message": "text before the first section tag ignored"})
+
+    if post["sections"] or post["text"] or post["id"]:
+        yield _finish(post)
+
+
+def iter_posts_file(path: str, **kwargs):
+    """`iter_posts` over a file, read lazily line by line."""
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_posts(f, **kwargs)
+
+
+def parse_post(post_text: str, sections=SECTIONS, bare_tags: bool = False):
+    """
+    Parse LinkedIn-like post text into structured parts.
+
+    Args:
+        post_text (str): The full post text containing section tags like [HOOK], [STORY].
+        sections (iterable): Section names accepted as tags.
+        bare_tags (bool): Also accept tags written without brackets.
+
+    Returns:
+        dict: Mapping from section name (e.g., 'HOOK') to list of lines.
+        `---` lines are content here, not post delimiters.
+    """
+    with span("post_parse", chars=len(post_text)):
+        post = next(iter_posts(post_text, sections, bare_tags, delimiters=False), None)
+    return post["sections"] if post else {}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Usage: python post_parser.py <export.txt>")
+        return 1
+
+    posts = warnings = 0
+    for post in iter_posts_file(argv[0]):
+        posts += 1
+        label = post["id"] or f"post {posts}"
+        for diag in post["diagnostics"]:
+            warnings += 1
+            print(f"⚠️ {argv[0]}:{diag['line']} ({label}): {diag['message']}")
+        if not post["sections"]:
+            warnings += 1
+            print(f"⚠️ {argv[0]}:{post['line']} ({label}): no sections found")
+
+    print(f"📊 {posts} post(s), {warnings} diagnostic(s)")
+    return 0 if not warnings else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""
+Carousel Render Server
+----------------------
+
+Long-running local HTTP server returning .pptx bytes for a post. The parent
+process imports everything, parses the style's templates, builds their
+placeholder indexes and loads the font metrics, then pre-forks workers that
+share that warm state copy-on-write and accept on one listening socket.
+
+Endpoints:
+    POST /render   {"post": "...", "style": "<dir>", "variant": "<palette name>"}  → .pptx bytes
+    POST /render   {"post": "...", "mappings": [{"template": "<file>", "image": null, "blocks": {...}}]}
+    GET  /health   worker pid and cache counters
+
+Requests only reach files under --styles-root: "style" must be a directory
+inside it, and the "template" and "image" of each of a request's own
+"mappings" (see append_template.template_mappings) files inside it; paths
+are resolved (symlinks included) before the check. A mapping's "palette",
+if any, must be a palette object, and "variant" a palette name from
+theme_variants.PALETTE_DIR. Connections carry one request each (HTTP/1.0)
+and idle sockets are dropped after --timeout seconds, so a client cannot
+pin a worker.
+
+Usage:
+    python render_server.py --style ./templates/blue-blur/dark --workers 4 --port 8765
+    python render_server.py --style ./templates/blue-blur/dark --variant light
+    python render_server.py --unix /tmp/carousel.sock
+    python render_server.py --trace trace.json    # trace.<pid>.json per worker, written on shutdown
+"""
+
+import io
+import os
+import re
+import gc
+import sys
+import json
+import time
+import signal
+import argparse
+import socketserver
+import tracing
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from append_template import build_carousel_in_memory, mappings_for_style, template_mappings
+from theme_variants import mappings_for_variant
+from template_cache import TEMPLATE_CACHE, load_template
+from placeholder_index import load_placeholder_index
+from font_metrics import get_metrics, resolve_face
+from fit_cache import FIT_CACHE
+from image_pipeline import IMAGE_PIPELINE
+
+
+PPTX_MIME = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+_PALETTE_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Keys a request's own mappings may set
+MAPPING_KEYS = frozenset({"template", "image", "blocks", "palette"})
+
+
+def warm_up(mappings):
+    """
+    Load everything a render needs into this process: parsed templates,
+    placeholder indexes and the font metric tables for every face used.
+    """
+    # Library modules are imported lazily elsewhere; load them before workers fork
+    import pptx.util, pptx.enum.text, pptx.parts.image, pptx.opc.serialized  # noqa: F401
+
+    for mapping in mappings:
+        load_template(mapping["template"])
+        load_placeholder_index(mapping["template"])
+        for cfg in mapping["blocks"].values():
+            if isinstance(cfg, dict):
+                bold = bool(cfg.get("bold", False))
+                get_metrics(resolve_face(cfg.get("font", "Poppins" if bold else "Poppins thin"), bold))
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    """
+    Handles /render and /health; `server.mappings` holds the default style
+    and variant, `server.base_mappings` the default style alone.
+    """
+
+    def setup(self):
+        # Socket timeout for reading the request and writing the response
+        self.timeout = self.server.request_timeout
+        super().setup()
+
+    def address_string(self):
+        # Unix sockets have no (host, port) client address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body: bytes, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode("utf-8"))
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self._send_json(404, {"error": "not found"})
+        self._send_json(200, {"pid": os.getpid(), "templates": TEMPLATE_CACHE.stats(),
+                              "fits": FIT_CACHE.stats(), "images": IMAGE_PIPELINE.stats()})
+
+    def do_POST(self):
+        if self.path != "/render":
+            return self._send_json(404, {"error": "not found"})
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            post = request.get("post")
+            if not post:
+                raise ValueError("missing 'post'")
+            if request.get("mappings") is not None:
+                if request.get("style"):
+                    raise ValueError("give 'style' or 'mappings', not both")
+                mappings = self._request_mappings(request["mappings"])
+            elif request.get("style"):
+                mappings = mappings_for_style(self._style_dir(request["style"]))
+            elif request.get("variant"):
+                mappings = self.server.base_mappings
+            else:
+                mappings = self.server.mappings
+            if request.get("variant"):
+                variant = request["variant"]
+                if not isinstance(variant, str) or not _PALETTE_NAME_RE.match(variant):
+                    raise ValueError(f"invalid variant {variant!r}: expected a palette name")
+                mappings = mappings_for_variant(variant, mappings)
+
+            buffer = io.BytesIO()
+            with tracing.span("render", chars=len(post)):
+                build_carousel_in_memory(post, mappings, buffer)
+        except (ValueError, KeyError, TypeError, FileNotFoundError) as e:
+            return self._send_json(400, {"error": f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            return self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._send(200, buffer.getvalue(), PPTX_MIME, {"X-Render-Ms": f"{elapsed_ms:.1f}"})
+
+    def _resolve(self, value, what: str, exists) -> str:
+        """Resolve a requested path, refusing anything outside the styles root."""
+        if not isinstance(value, str):
+            raise ValueError(f"'{what}' must be a string")
+        root = self.server.styles_root
+        path = os.path.realpath(value)
+        if os.path.commonpath([root, path]) != root or not exists(path):
+            raise ValueError(f"unknown {what} {value!r}")
+        return path
+
+    def _style_dir(self, style) -> str:
+        """Resolve a requested style directory inside the styles root."""
+        return self._resolve(style, "style", os.path.isdir)
+
+    def _request_mappings(self, mappings) -> list:
+        """
+        Validate a request's own mappings, with their template and image
+        paths resolved inside the styles root.
+        """
+        if not isinstance(mappings, list) or not mappings:
+            raise ValueError("'mappings' must be a non-empty list")
+        result = []
+        for mapping in mappings:
+            if not isinstance(mapping, dict) or not isinstance(mapping.get("blocks"), dict):
+                raise ValueError("each mapping needs a 'template' and a 'blocks' object")
+            if not all(isinstance(cfg, (str, dict)) for cfg in mapping["blocks"].values()):
+                raise ValueError("each block must be a key or a style object")
+            unknown = set(mapping) - MAPPING_KEYS
+            if unknown:
+                raise ValueError(f"unknown mapping keys: {', '.join(sorted(unknown))}")
+            if mapping.get("palette") is not None and not isinstance(mapping["palette"], dict):
+                raise ValueError("a mapping's 'palette' must be an object")
+            image = mapping.get("image")
+            result.append({
+                **mapping,
+                "template": self._resolve(mapping.get("template"), "template", os.path.isfile),
+                "image": self._resolve(image, "image", os.path.isfile) if image is not None else None,
+            })
+        return result
+
+
+class _TCPRenderServer(HTTPServer):
+    allow_reuse_address = True
+
+
+class _UnixRenderServer(socketserver.UnixStreamServer):
+    pass
+
+
+def _make_server(args, mappings, base_mappings):
+    """Bind the listening socket once, in the parent, so every worker shares it."""
+    if args.unix:
+        if os.path.exists(args.unix):
+            os.remove(args.unix)
+        server = _UnixRenderServer(args.unix, RenderHandler)
+    else:
+        server = _TCPRenderServer((args.host, args.port), RenderHandler)
+    server.mappings = mappings
+    server.base_mappings = base_mappings
+    server.verbose = args.verbose
+    server.styles_root = os.path.realpath(args.styles_root)
+    server.request_timeout = args.timeout
+    return server
+
+
+def _exit_worker(*_):
+    # os._exit skips atexit: write what this worker still holds
+    FIT_CACHE.flush()
+    tracing.flush()
+    os._exit(0)
+
+
+def _worker(server):
+    """Worker loop: serve requests on the shared socket until terminated."""
+    signal.signal(signal.SIGTERM, _exit_worker)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if not server.verbose:
+        sys.stdout = open(os.devnull, "w")
+    try:
+        server.serve_forever()
+    finally:
+        _exit_worker()
+
+
+def serve(args):
+    base_mappings = mappings_for_style(args.style) if args.style else template_mappings
+    mappings = mappings_for_variant(args.variant, base_mappings) if args.variant else base_mappings
+
+    print("🔥 Warming templates and fonts...")
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            warm_up(mappings)
+            # One throwaway render pulls in every lazily-imported code path
+            build_carousel_in_memory("[HOOK]\nwarm up", mappings, io.BytesIO())
+        finally:
+            sys.stdout = stdout
+    print(f"✅ Warm in {(time.perf_counter() - start) * 1000:.0f} ms")
+    # Workers trace their own requests, not the warm-up
+    tracing.reset()
+
+    server = _make_server(args, mappings, base_mappings)
+    # Move everything allocated so far out of the GC's reach, so collections
+    # in the workers don't touch (and un-share) the warm pages
+    gc.collect()
+    gc.freeze()
+
+    children = set()
+
+    def spawn():
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            _worker(server)
+        children.add(pid)
+
+    for _ in range(args.workers):
+        spawn()
+
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"🚀 Serving on {where} with {args.workers} worker(s)")
+
+    def shutdown(*_):
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(children):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        server.server_close()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    # Supervise: replace workers that die
+    while True:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        if pid in children:
+            children.discard(pid)
+            print(f"⚠️  Worker {pid} exited ({status}), respawning")
+            spawn()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-forked carousel render server.")
+    parser.add_argument("--style", default=None, help="Template directory served by default")
+    parser.add_argument("--variant", default=None, help="Colour variant served by default (palette name or .json)")
+    parser.add_argument("--styles-root", default="./templates", help="Directory holding the styles requests may pick")
+    parser.add_argument("--timeout", type=float, default=30, help="Seconds a connection may stay idle")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="Listen on a Unix socket path instead of TCP")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    parser.add_argument("--trace", default=None, help="Write a Chrome trace per worker on shutdown")
+    args = parser.parse_args(argv)
+    if args.trace:
+        tracing.configure(args.trace)
+    serve(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Slide Cloning
+-------------
+
+Copies slides between presentations without serializing and re-parsing
+XML: the source slide's tree is deep-copied in lxml, its relationships are
+recreated on the new slide part, and every r:embed / r:link / r:id (any
+attribute in the relationships namespace) of the copy is rewritten from one
+rId map in a single compiled-XPath pass.
+
+Relationships carried over:
+
+  • media (images, audio, video): deduplicated by content (media_store)
+  • external targets (hyperlinks, linked media): related again as external
+  • other parts (charts and their workbooks, diagrams, OLE objects, tags):
+    moved into the target under a free partname (master_store)
+
+Notes slides and links to other slides are not copied; hyperlinks that
+pointed at another slide are removed from the copy.
+
+`export_slides` / `import_slides` split a clone in two halves for
+parallel merges: a worker process parses the source and exports its
+slides as serialized XML with relationships already renumbered, media
+already hashed, and the other parts they need as blobs; the parent only
+splices them in. Both halves follow `clone_slide`, so the result is the
+same as cloning the slides in order.
+
+`slide_subset` applies the same rules when a slide is saved on its own
+(split_templates): the slide is written from its parsed package rather
+than copied, links to other slides are left out (with their hyperlinks
+removed), and the package lists shrink to what is kept.
+"""
+
+import copy
+from functools import lru_cache
+from media_store import MEDIA_PREFIX, blob_sha256, dedupe_part, media_parts
+from master_store import adopt_part, part_digest
+
+
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+_RT_SLIDE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+_RT_SLIDE_LAYOUT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout"
+_RT_NOTES_SLIDE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide"
+_RT_COMMENTS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments"
+
+_CT_SLIDE = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+
+# Slide relationships that are not carried over to a cloned slide
+NOT_CLONED = frozenset({_RT_SLIDE, _RT_NOTES_SLIDE, _RT_COMMENTS})
+
+_HYPERLINK_TAGS = frozenset({"hlinkClick", "hlinkHover", "hlinkMouseOver"})
+
+
+@lru_cache(maxsize=None)
+def _r_attributes():
+    from lxml import etree
+
+    return etree.XPath("descendant-or-self::*/@*[namespace-uri()=$ns]")
+
+
+def rewrite_rids(element, rid_map: dict) -> list:
+    """
+    Rewrite every relationship reference in `element` and its descendants.
+
+    Args:
+        element: lxml element (modified in place).
+        rid_map (dict): {old rId: new rId}.
+
+    Returns:
+        list: Elements holding a reference missing from `rid_map`.
+    """
+    dangling = []
+    # The XPath result is a snapshot, so swapped rIds are never mapped twice
+    for value in _r_attributes()(element, ns=R_NS):
+        owner = value.getparent()
+        new = rid_map.get(str(value))
+        if new is None:
+            dangling.append(owner)
+        else:
+            owner.set(value.attrname, new)
+    return dangling
+
+
+def _drop_dangling_links(element, rid_map: dict):
+    """Rewrite `element` through `rid_map`, removing hyperlinks whose target was not kept."""
+    for owner in rewrite_rids(element, rid_map):
+        if owner.tag.rsplit("}", 1)[-1] in _HYPERLINK_TAGS:
+            owner.getparent().remove(owner)
+
+
+def clone_slide(target_prs, source_slide, target_layout):
+    """
+    Append a copy of `source_slide` to `target_prs`, on `target_layout`.
+
+    Foreign parts the slide relates to (media, charts, ...) are moved into
+    the target, not copied: the source presentation must not be saved
+    afterwards.
+
+    Args:
+        target_prs (Presentation): Presentation receiving the slide.
+        source_slide (Slide): Slide to copy (usually from another presentation).
+        target_layout (SlideLayout): Layout of `target_prs` for the new slide
+            (see `master_store.get_or_add_layout`).
+
+    Returns:
+        Slide: The new slide.
+    """
+    # Added without the layout's placeholders: the whole tree is replaced below
+    rId, new_slide = target_prs.part.add_slide(target_layout)
+    target_prs.slides._sldIdLst.add_sldId(rId)
+    new_part = new_slide.part
+    package = target_prs.part.package
+
+    rid_map = {}
+    for src_rId, rel in source_slide.part.rels.items():
+        if rel.reltype == _RT_SLIDE_LAYOUT:
+            rid_map[src_rId] = new_part.relate_to(target_layout.part, _RT_SLIDE_LAYOUT)
+        elif rel.is_external:
+            rid_map[src_rId] = new_part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+        elif rel.reltype in NOT_CLONED:
+            continue
+        else:
+            target = rel.target_part
+            if str(target.partname).startswith(MEDIA_PREFIX):
+                target = dedupe_part(package, target)
+            else:
+                target = adopt_part(target_prs, target)
+            rid_map[src_rId] = new_part.relate_to(target, rel.reltype)
+
+    _copy_tree(source_slide._element, new_slide._element, rid_map)
+    return new_slide
+
+
+def _copy_tree(src_el, new_el, rid_map: dict):
+    """Replace the content of the `new_el` slide root with a copy of `src_el`'s, rewritten through `rid_map`."""
+    for child in list(new_el):
+        new_el.remove(child)
+    for name, value in src_el.attrib.items():
+        new_el.set(name, value)
+    for child in src_el:
+        new_el.append(copy.deepcopy(child))
+    _drop_dangling_links(new_el, rid_map)
+
+
+def _export_part(parts: dict, part):
+    """Add `part` and every part it reaches to `parts` as {partname: (content_type, blob, rels_xml)}."""
+    partname = str(part.partname)
+    if partname in parts:
+        return
+    rels = part.rels
+    parts[partname] = (part.content_type, part.blob, rels.xml if len(rels) else None)
+    for rel in rels.values():
+        if not rel.is_external:
+            _export_part(parts, rel.target_part)
+
+
+def export_slides(prs) -> dict:
+    """
+    Export every slide of `prs` for `import_slides` (typically in a worker
+    process; the result is picklable).
+
+    Each slide's XML is built as `clone_slide` builds it, with its
+    relationship ids renumbered to the order in which `import_slides`
+    creates them: rId1 for the layout, then one per distinct target.
+
+    Args:
+        prs (Presentation): Parsed source presentation (not modified).
+
+    Returns:
+        dict: {"slides": [{"xml", "layout", "rels"}], "media": {sha256:
+        (partname, content_type, blob)}, "parts": {partname: (content_type,
+        blob, rels_xml)}}. "layout" is the layout's `master_store.part_digest`;
+        "rels" lists one key per new rId: ("layout",), ("external", reltype,
+        url), ("media", reltype, sha256) or ("part", reltype, partname).
+    """
+    from pptx.opc.oxml import serialize_part_xml
+    from pptx.oxml.slide import CT_Slide
+
+    payload = {"slides": [], "media": {}, "parts": {}}
+    digests, media_digests = {}, {}
+    for slide in prs.slides:
+        keys = {("layout",): "rId1"}
+        rid_map = {}
+        for src_rId, rel in slide.part.rels.items():
+            if rel.reltype == _RT_SLIDE_LAYOUT:
+                key = ("layout",)
+                layout_part = rel.target_part
+            elif rel.is_external:
+                key = ("external", rel.reltype, rel.target_ref)
+            elif rel.reltype in NOT_CLONED:
+                continue
+            else:
+                target = rel.target_part
+                if str(target.partname).startswith(MEDIA_PREFIX):
+                    digest = media_digests.get(id(target))
+                    if digest is None:
+                        digest = media_digests[id(target)] = blob_sha256(target.blob)
+                        payload["media"].setdefault(digest, (str(target.partname), target.content_type, target.blob))
+                    key = ("media", rel.reltype, digest)
+                else:
+                    _export_part(payload["parts"], target)
+                    key = ("part", rel.reltype, str(target.partname))
+            rid_map[src_rId] = keys.setdefault(key, f"rId{len(keys) + 1}")
+
+        new_el = CT_Slide.new()
+        _copy_tree(slide._element, new_el, rid_map)
+        payload["slides"].append({
+            "xml": serialize_part_xml(new_el),
+            "layout": part_digest(layout_part, digests),
+            "rels": list(keys),
+        })
+    return payload
+
+
+def import_slides(target_prs, payload: dict, layout_for) -> int:
+    """
+    Append the slides exported by `export_slides` to `target_prs`.
+
+    Media is deduplicated by the exported hash and other parts are moved
+    in as `clone_slide` moves them, so importing the exports of several
+    decks in order gives the same presentation as cloning their slides.
+
+    Args:
+        target_prs (Presentation): Presentation receiving the slides.
+        payload (dict): Output of `export_slides`.
+        layout_for (callable): `layout_for(index, layout_digest) -> SlideLayout`
+            of `target_prs` for the slide at `index` in the payload.
+
+    Returns:
+        int: Number of slides appended.
+    """
+    from pptx.opc.package import PartFactory
+    from pptx.opc.packuri import PackURI
+    from pptx.opc.oxml import parse_xml
+
+    pres_part = target_prs.part
+    package = pres_part.package
+    media = media_parts(package)
+
+    # The exported parts are loaded once, as python-pptx loads a package
+    parts = {name: PartFactory(PackURI(name), content_type, package, blob)
+             for name, (content_type, blob, _) in payload["parts"].items()}
+    for name, (_, _, rels_xml) in payload["parts"].items():
+        if rels_xml is not None:
+            parts[name].load_rels_from_xml(parse_xml(rels_xml), parts)
+
+    for index, exported in enumerate(payload["slides"]):
+        layout = layout_for(index, exported["layout"])
+        slide_part = PartFactory(pres_part._next_slide_partname, _CT_SLIDE, package, exported["xml"])
+
+        rid_map = {}
+        for n, key in enumerate(exported["rels"], 1):
+            kind, reltype = key[0], key[1] if len(key) > 1 else _RT_SLIDE_LAYOUT
+            if kind == "layout":
+                rId = slide_part.relate_to(layout.part, _RT_SLIDE_LAYOUT)
+            elif kind == "external":
+                rId = slide_part.relate_to(key[2], reltype, is_external=True)
+            elif kind == "media":
+                target = media.get(key[2])
+                if target is None:
+                    name, content_type, blob = payload["media"][key[2]]
+                    target = dedupe_part(package, PartFactory(PackURI(name), content_type, package, blob), key[2])
+                rId = slide_part.relate_to(target, reltype)
+            else:
+                rId = slide_part.relate_to(adopt_part(target_prs, parts[key[2]]), reltype)
+            rid_map[f"rId{n}"] = rId
+
+        # Only rewritten if relationships did not come out as numbered by the export
+        if any(old != new for old, new in rid_map.items()):
+            rewrite_rids(slide_part._element, rid_map)
+
+        target_prs.slides._sldIdLst.add_sldId(pres_part.relate_to(slide_part, _RT_SLIDE))
+    return len(payload["slides"])
+
+
+def _rid_of(part, target_part):
+    """Return the rId of the relationship from `part` to `target_part`."""
+    for rId, rel in part.rels.items():
+        if not rel.is_external and rel.target_part is target_part:
+            return rId
+    return None
+
+
+def _keep_only(element, list_tag, keep_rId):
+    """Drop every child of `list_tag` in `element` except the one related by `keep_rId`."""
+    from pptx.oxml.ns import qn
+
+    lst = element.find(qn(list_tag))
+    if lst is not None:
+        for child in list(lst):
+            if child.get(qn("r:id")) != keep_rId:
+                lst.remove(child)
+
+
+def slide_subset(prs, slide) -> dict:
+    """
+    What saving `slide` on its own needs from its parsed presentation.
+
+    Args:
+        prs (Presentation): Parsed source presentation (not modified).
+        slide (Slide): Slide of `prs`.
+
+    Returns:
+        dict: {"include_rel", "blob_overrides"} keyword arguments for
+        `package_writer.save_package_subset`: the relationship filter keeping
+        only this slide, its layout, master, theme and media, and
+        presentation.xml / slideMaster.xml (and the slide, when it links to
+        other slides) rewritten to match.
+    """
+    from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+    from pptx.opc.oxml import serialize_part_xml
+    from pptx.oxml.ns import qn
+
+    pres_part = prs.part
+    slide_part = slide.part
+    layout_part = slide.slide_layout.part
+    master_part = slide.slide_layout.slide_master.part
+    has_notes = any(rel.reltype == RT.NOTES_SLIDE for rel in slide_part.rels.values())
+    slide_links = {rId for rId, rel in slide_part.rels.items() if rel.reltype == _RT_SLIDE}
+
+    def include_rel(source, rel):
+        if source is pres_part:
+            if rel.reltype == RT.SLIDE:
+                return rel.target_part is slide_part
+            if rel.reltype == RT.SLIDE_MASTER:
+                return rel.target_part is master_part
+            if rel.reltype == RT.NOTES_MASTER:
+                return has_notes
+            if rel.reltype == RT.HANDOUT_MASTER:
+                return False
+        elif source is master_part and rel.reltype == RT.SLIDE_LAYOUT:
+            return rel.target_part is layout_part
+        elif source is slide_part:
+            return rel.rId not in slide_links
+        return True
+
+    pres_el = copy.deepcopy(pres_part._element)
+    _keep_only(pres_el, "p:sldIdLst", _rid_of(pres_part, slide_part))
+    _keep_only(pres_el, "p:sldMasterIdLst", _rid_of(pres_part, master_part))
+    for tag in (("p:handoutMasterIdLst",) if has_notes else ("p:notesMasterIdLst", "p:handoutMasterIdLst")):
+        lst = pres_el.find(qn(tag))
+        if lst is not None:
+            pres_el.remove(lst)
+
+    master_el = copy.deepcopy(master_part._element)
+    _keep_only(master_el, "p:sldLayoutIdLst", _rid_of(master_part, layout_part))
+
+    overrides = {
+        pres_part: serialize_part_xml(pres_el),
+        master_part: serialize_part_xml(master_el),
+    }
+    if slide_links:
+        slide_el = copy.deepcopy(slide_part._element)
+        _drop_dangling_links(slide_el, {rId: rId for rId in slide_part.rels if rId not in slide_links})
+        overrides[slide_part] = serialize_part_xml(slide_el)
+
+    return {"include_rel": include_rel, "blob_overrides": overrides}
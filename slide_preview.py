@@ -0,0 +1,740 @@
+"""
+Slide Preview Renderer
+----------------------
+
+Draws slides to PNG with PIL, without PowerPoint or a headless office
+conversion: the background (solid colour, first gradient stop or picture),
+the master and layout artwork, pictures and filled shapes at their EMU
+positions, and text wrapped with the bundled Poppins fonts at the sizes set
+on the runs (the ones `fill_presentation` picked).
+
+It is a preview, not a full renderer: rotation, effects, charts, tables and
+text autofit are ignored, and every typeface is drawn with the closest
+Poppins face.
+
+Rendered slides are cached keyed on a hash of the slide XML plus everything
+it draws from elsewhere (layout, master, theme and image bytes), in memory
+and, optionally, in a directory that survives restarts (pass `cache_dir` or
+set CAROUSEL_PREVIEW_CACHE). The width defaults to CAROUSEL_PREVIEW_WIDTH.
+
+Usage:
+    python slide_preview.py deck.pptx --out-dir ./previews --width 540
+"""
+
+import io
+import os
+import re
+import sys
+import colorsys
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from font_metrics import FONT_DIR, get_metrics, resolve_face
+from tracing import span
+
+
+# Bump when the drawing changes, so stale on-disk previews are ignored
+PREVIEW_VERSION = 1
+
+EMU_PER_PT = 12700
+DEFAULT_FONT_SIZE_PT = 18
+
+# bodyPr defaults: 0.1" left/right and 0.05" top/bottom insets
+_INSET_X = 91440
+_INSET_Y = 45720
+
+_NS = {
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+}
+_R_EMBED = f"{{{_NS['r']}}}embed"
+
+_RT_IMAGE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+_RT_THEME = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/theme"
+
+# Line breaks python-pptx leaves inside run text ("\n" as is, "\v" escaped)
+_BREAK_RE = re.compile(r"\n|\v|_x000B_|_x000A_")
+_TOKEN_RE = re.compile(r"\s+|\S+")
+
+_PRESET_COLORS = {"white": (255, 255, 255), "black": (0, 0, 0), "red": (255, 0, 0),
+                  "green": (0, 128, 0), "blue": (0, 0, 255), "gray": (128, 128, 128)}
+
+_PLACEHOLDER_STYLES = {"title": "p:titleStyle", "ctrTitle": "p:titleStyle"}
+_NON_BODY_PLACEHOLDERS = {"dt", "ftr", "sldNum", "hdr"}
+
+
+def _local(el) -> str:
+    tag = el.tag
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _find(el, path):
+    return None if el is None else el.find(path, _NS)
+
+
+def _hex(value: str):
+    value = (value or "000000").lstrip("#")
+    return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _emu(value, default=0) -> int:
+    return int(value) if value is not None else default
+
+
+class _Theme:
+    """Scheme colours of one slide master (its theme's clrScheme through the master's clrMap)."""
+
+    def __init__(self, master_part):
+        from lxml import etree
+
+        self.colors = {}
+        self.clr_map = {}
+        clr_map = _find(master_part._element, "p:clrMap")
+        if clr_map is not None:
+            self.clr_map = dict(clr_map.attrib)
+        try:
+            theme = etree.fromstring(master_part.part_related_by(_RT_THEME).blob)
+        except KeyError:
+            return
+        scheme = _find(theme, ".//a:clrScheme")
+        for entry in (scheme if scheme is not None else ()):
+            for clr in entry:
+                if _local(clr) == "srgbClr":
+                    self.colors[_local(entry)] = _hex(clr.get("val"))
+                elif _local(clr) == "sysClr":
+                    self.colors[_local(entry)] = _hex(clr.get("lastClr"))
+
+    def scheme(self, name: str):
+        name = self.clr_map.get(name, name)
+        return self.colors.get(name, (0, 0, 0))
+
+
+def _color(el, theme):
+    """RGBA of the first colour child of `el` (srgbClr, schemeClr, sysClr, prstClr), or None."""
+    if el is None:
+        return None
+    for clr in el:
+        kind = _local(clr)
+        if kind == "srgbClr":
+            rgb = _hex(clr.get("val"))
+        elif kind == "schemeClr":
+            rgb = theme.scheme(clr.get("val"))
+        elif kind == "sysClr":
+            rgb = _hex(clr.get("lastClr"))
+        elif kind == "prstClr":
+            rgb = _PRESET_COLORS.get(clr.get("val"), (0, 0, 0))
+        else:
+            continue
+
+        alpha, lum_mod, lum_off = 255, 1.0, 0.0
+        for mod in clr:
+            val = int(mod.get("val", 100000)) / 100000
+            if _local(mod) == "alpha":
+                alpha = round(255 * val)
+            elif _local(mod) == "lumMod":
+                lum_mod = val
+            elif _local(mod) == "lumOff":
+                lum_off = val
+        if lum_mod != 1.0 or lum_off:
+            h, l, s = colorsys.rgb_to_hls(*(c / 255 for c in rgb))
+            rgb = tuple(round(c * 255) for c in colorsys.hls_to_rgb(h, min(1.0, max(0.0, l * lum_mod + lum_off)), s))
+        return rgb + (alpha,)
+    return None
+
+
+def _fill(props, part, theme):
+    """
+    Fill of a spPr / bgPr element.
+
+    Returns:
+        tuple | None: ("color", rgba), ("image", blob, srcRect element) or
+        None for no (or an unsupported) fill. Gradients use their first stop.
+    """
+    for child in (props if props is not None else ()):
+        kind = _local(child)
+        if kind == "noFill":
+            return None
+        if kind == "solidFill":
+            return "color", _color(child, theme)
+        if kind == "gradFill":
+            stop = _find(child, "a:gsLst/a:gs")
+            return ("color", _color(stop, theme)) if stop is not None else None
+        if kind == "blipFill":
+            blip = _find(child, "a:blip")
+            if blip is None or blip.get(_R_EMBED) is None:
+                return None
+            return "image", part.related_part(blip.get(_R_EMBED)).blob, _find(child, "a:srcRect")
+    return None
+
+
+@lru_cache(maxsize=256)
+def _font(face: str, size_px: int):
+    from PIL import ImageFont
+
+    return ImageFont.truetype(os.path.join(FONT_DIR, face), size=max(1, size_px))
+
+
+@lru_cache(maxsize=64)
+def _picture(blob: bytes, width: int, height: int, crop: tuple):
+    """Decode, crop and resize one picture (decoded at reduced size when the format allows)."""
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(blob))
+    if crop == (0, 0, 0, 0):
+        img.draft("RGB", (width, height))
+    img = img.convert("RGBA")
+    if crop != (0, 0, 0, 0):
+        l, t, r, b = crop
+        img = img.crop((round(img.width * l / 100000), round(img.height * t / 100000),
+                        round(img.width * (1 - r / 100000)), round(img.height * (1 - b / 100000))))
+    return img.resize((max(1, width), max(1, height)), Image.BILINEAR)
+
+
+class _Canvas:
+    """One slide being drawn: the image, its scale and the master's colours."""
+
+    def __init__(self, slide, width_px: int):
+        from PIL import Image, ImageDraw
+
+        self.master_part = slide.slide_layout.slide_master.part
+        self.theme = _theme(self.master_part)
+        prs_part = slide.part.package.presentation_part
+        sld_sz = _find(prs_part._element, "p:sldSz")
+        self.slide_w = _emu(sld_sz.get("cx"), 12192000)
+        self.slide_h = _emu(sld_sz.get("cy"), 6858000)
+        self.scale = width_px / self.slide_w
+        self.image = Image.new("RGBA", (width_px, max(1, round(self.slide_h * self.scale))), (255, 255, 255, 255))
+        self.draw = ImageDraw.Draw(self.image, "RGBA")
+        self.default_text_style = _find(prs_part._element, "p:defaultTextStyle")
+
+    def px(self, emu) -> int:
+        return round(emu * self.scale)
+
+    def paint(self, fill, box):
+        """Paint a fill over `box` (x, y, w, h in pixels)."""
+        if fill is None:
+            return
+        x, y, w, h = box
+        if fill[0] == "color":
+            if fill[1] is not None:
+                self.draw.rectangle((x, y, x + w - 1, y + h - 1), fill=fill[1])
+            return
+        _, blob, src_rect = fill
+        crop = tuple(int(src_rect.get(k, 0)) for k in ("l", "t", "r", "b")) if src_rect is not None else (0, 0, 0, 0)
+        try:
+            img = _picture(blob, w, h, crop)
+        except Exception as e:
+            print(f"⚠️ Could not draw picture: {type(e).__name__}: {e}", file=sys.stderr)
+            return
+        self.image.paste(img, (x, y), img)
+
+
+def _background(slide, theme):
+    """The slide's own background, else its layout's, else its master's."""
+    layout = slide.slide_layout
+    for part in (slide.part, layout.part, layout.slide_master.part):
+        bg = _find(part._element, "p:cSld/p:bg")
+        if bg is None:
+            continue
+        bg_pr = _find(bg, "p:bgPr")
+        if bg_pr is not None:
+            return _fill(bg_pr, part, theme)
+        # bgRef points at a theme background style; drawn with its colour
+        return "color", _color(_find(bg, "p:bgRef"), theme)
+    return "color", (255, 255, 255, 255)
+
+
+def _style_sources(shape, canvas):
+    """
+    lstStyle-like elements a shape's text inherits from, nearest first:
+    the shape, its layout and master placeholders, then the master's
+    title/body style (placeholders) or the presentation default (text boxes).
+    """
+    sources = [_find(shape._element, "p:txBody/a:lstStyle")]
+    bodies = [_find(shape._element, "p:txBody/a:bodyPr")]
+    if not shape.is_placeholder:
+        return sources + [canvas.default_text_style], bodies
+
+    base = shape
+    while True:
+        base = getattr(base, "_base_placeholder", None)
+        if base is None:
+            break
+        sources.append(_find(base._element, "p:txBody/a:lstStyle"))
+        bodies.append(_find(base._element, "p:txBody/a:bodyPr"))
+
+    ph_type = shape._element.ph_type
+    ph_type = getattr(ph_type, "xml_value", None) or str(ph_type or "body")
+    master = canvas.master_part._element
+    if ph_type in _PLACEHOLDER_STYLES:
+        sources.append(_find(master, f"p:txStyles/{_PLACEHOLDER_STYLES[ph_type]}"))
+    elif ph_type not in _NON_BODY_PLACEHOLDERS:
+        sources.append(_find(master, "p:txStyles/p:bodyStyle"))
+    else:
+        sources.append(_find(master, "p:txStyles/p:otherStyle"))
+    return sources, bodies
+
+
+def _first(elements, attr, default=None):
+    for el in elements:
+        if el is not None and el.get(attr) is not None:
+            return el.get(attr)
+    return default
+
+
+def _first_child(elements, path):
+    for el in elements:
+        found = _find(el, path)
+        if found is not None:
+            return found
+    return None
+
+
+def _run_style(r_pr, paragraph_levels, canvas):
+    """(face, size_px, rgba) of a run: its rPr, then the defRPr of every level style."""
+    chain = [r_pr] + [_find(lvl, "a:defRPr") for lvl in paragraph_levels]
+    size_pt = int(_first(chain, "sz", DEFAULT_FONT_SIZE_PT * 100)) / 100
+    bold = _first(chain, "b", "0") in ("1", "true")
+    latin = _first_child(chain, "a:latin")
+    typeface = latin.get("typeface") if latin is not None else "Poppins"
+    color = _color(_first_child(chain, "a:solidFill"), canvas.theme) or canvas.theme.scheme("tx1") + (255,)
+    return resolve_face(typeface, bold), size_pt, color
+
+
+def _line_pitch(levels, size_pt, face):
+    """Line pitch in points for the largest run of a line."""
+    ln_spc = _first_child(levels, "a:lnSpc")
+    if ln_spc is not None:
+        pts = _find(ln_spc, "a:spcPts")
+        if pts is not None:
+            return int(pts.get("val", 0)) / 100
+        pct = _find(ln_spc, "a:spcPct")
+        if pct is not None:
+            return size_pt * get_metrics(face).line_height * int(pct.get("val", 100000)) / 100000
+    return size_pt * get_metrics(face).line_height
+
+
+def _wrap(pieces, max_width, canvas):
+    """
+    Greedy word wrap of styled pieces.
+
+    Args:
+        pieces (list): [(text, face, size_pt, rgba)], "\\n" pieces force a break.
+        max_width (float): Line width in pixels (None: no wrapping).
+
+    Returns:
+        list: Lines, each a list of (text, font, size_pt, face, rgba, width_px).
+    """
+    pt = canvas.scale * EMU_PER_PT
+    lines, line, width = [], [], 0.0
+    for text, face, size_pt, color in pieces:
+        if text == "\n":
+            lines.append(line)
+            line, width = [], 0.0
+            continue
+        font = _font(face, round(size_pt * pt))
+        for token in _TOKEN_RE.findall(text):
+            w = font.getlength(token)
+            if token.isspace():
+                if line:
+                    line.append((token, font, size_pt, face, color, w))
+                    width += w
+                continue
+            if max_width is not None and line and width + w > max_width:
+                while line and line[-1][0].isspace():
+                    width -= line.pop()[5]
+                lines.append(line)
+                line, width = [], 0.0
+            line.append((token, font, size_pt, face, color, w))
+            width += w
+    lines.append(line)
+    return lines
+
+
+def _draw_text(shape, canvas, box):
+    """Draw a shape's text frame inside `box` (pixels)."""
+    sources, bodies = _style_sources(shape, canvas)
+    body = [b for b in bodies if b is not None]
+    x, y, w, h = box
+    left = canvas.px(_emu(_first(body, "lIns"), _INSET_X))
+    right = canvas.px(_emu(_first(body, "rIns"), _INSET_X))
+    top = canvas.px(_emu(_first(body, "tIns"), _INSET_Y))
+    bottom = canvas.px(_emu(_first(body, "bIns"), _INSET_Y))
+    max_width = None if _first(body, "wrap") == "none" else max(1, w - left - right)
+    pt = canvas.scale * EMU_PER_PT
+
+    # Lay out every paragraph first: the vertical anchor needs the total height
+    laid_out, total = [], 0.0
+    for p in shape._element.findall("p:txBody/a:p", _NS):
+        p_pr = _find(p, "a:pPr")
+        level = int(p_pr.get("lvl", 0)) if p_pr is not None else 0
+        levels = [p_pr] + [_find(src, f"a:lvl{level + 1}pPr") for src in sources]
+        pieces = []
+        for child in p:
+            kind = _local(child)
+            if kind == "br":
+                pieces.append(("\n", None, 0, None))
+            elif kind in ("r", "fld"):
+                face, size_pt, color = _run_style(_find(child, "a:rPr"), levels, canvas)
+                for i, part in enumerate(_BREAK_RE.split(_find(child, "a:t").text or "")):
+                    if i:
+                        pieces.append(("\n", None, 0, None))
+                    if part:
+                        pieces.append((part, face, size_pt, color))
+        if not any(piece[1] for piece in pieces):
+            # Empty paragraph: one blank line at the end-of-paragraph size
+            face, size_pt, _ = _run_style(_find(p, "a:endParaRPr"), levels, canvas)
+            pitch = _line_pitch(levels, size_pt, face) * pt
+            laid_out.append((levels, [([], pitch, 0.0)]))
+            total += pitch
+            continue
+
+        lines = []
+        for line in _wrap(pieces, max_width, canvas):
+            size_pt, face = max(((s, f) for _, _, s, f, _, _ in line), default=(pieces[0][2] or DEFAULT_FONT_SIZE_PT, pieces[0][1]))
+            pitch = _line_pitch(levels, size_pt, face) * pt
+            ascent = get_metrics(face).ascent * size_pt * pt
+            lines.append((line, pitch, ascent))
+            total += pitch
+        laid_out.append((levels, lines))
+
+    anchor = _first(body, "anchor", "t")
+    inner_h = h - top - bottom
+    cursor = y + top + (inner_h - total if anchor == "b" else (inner_h - total) / 2 if anchor == "ctr" else 0)
+    inner_w = max_width if max_width is not None else w - left - right
+
+    for levels, lines in laid_out:
+        align = _first(levels, "algn", "l")
+        for line, pitch, ascent in lines:
+            line_w = sum(t[5] for t in line)
+            start = x + left + ((inner_w - line_w) / 2 if align == "ctr" else inner_w - line_w if align == "r" else 0)
+            baseline = cursor + min(ascent, pitch)
+            for text, font, _, _, color, width in line:
+                if not text.isspace():
+                    canvas.draw.text((start, baseline), text, font=font, fill=color, anchor="ls")
+                start += width
+            cursor += pitch
+
+
+def _draw_geometry(el, canvas, box, fill):
+    """Draw the filled/outlined preset shape of a p:sp."""
+    x, y, w, h = box
+    prst = _find(el, "p:spPr/a:prstGeom")
+    prst = prst.get("prst") if prst is not None else "rect"
+    ln = _find(el, "p:spPr/a:ln")
+    outline = _color(_find(ln, "a:solidFill"), canvas.theme) if ln is not None else None
+    line_w = max(1, canvas.px(_emu(ln.get("w"), 12700))) if outline is not None else 0
+
+    if fill is not None and fill[0] == "image":
+        canvas.paint(fill, box)
+        fill = None
+    color = fill[1] if fill is not None else None
+    if color is None and outline is None:
+        return
+
+    shape_box = (x, y, x + max(0, w - 1), y + max(0, h - 1))
+    if prst == "line":
+        canvas.draw.line(shape_box, fill=outline or color, width=line_w or 1)
+    elif prst == "ellipse":
+        canvas.draw.ellipse(shape_box, fill=color, outline=outline, width=line_w)
+    elif prst == "roundRect":
+        canvas.draw.rounded_rectangle(shape_box, radius=round(min(w, h) * 0.16667), fill=color,
+                                      outline=outline, width=line_w)
+    else:
+        canvas.draw.rectangle(shape_box, fill=color, outline=outline, width=line_w)
+
+
+def _draw_shapes(shapes, canvas, part, transform=None, skip_placeholders=False):
+    """
+    Draw a shape collection in z-order.
+
+    Args:
+        shapes: python-pptx shape collection (slide, layout, master or group).
+        part: Part owning the shapes (resolves picture relationships).
+        transform (callable): Maps (x, y, w, h) EMU of grouped shapes to slide EMU.
+        skip_placeholders (bool): Leave placeholders out (layout/master artwork only).
+    """
+    for shape in shapes:
+        if skip_placeholders and shape.is_placeholder:
+            continue
+        el = shape._element
+        kind = _local(el)
+        try:
+            geometry = (shape.left, shape.top, shape.width, shape.height)
+        except (AttributeError, KeyError):
+            continue
+        if None in geometry:
+            continue
+        if transform is not None:
+            geometry = transform(*geometry)
+        box = tuple(canvas.px(v) for v in geometry)
+
+        if kind == "grpSp":
+            xfrm = _find(el, "p:grpSpPr/a:xfrm")
+            ch_off, ch_ext = _find(xfrm, "a:chOff"), _find(xfrm, "a:chExt")
+            if ch_off is None or ch_ext is None:
+                continue
+            gx, gy, gw, gh = geometry
+            cx, cy = int(ch_off.get("x")), int(ch_off.get("y"))
+            sx = gw / max(1, int(ch_ext.get("cx")))
+            sy = gh / max(1, int(ch_ext.get("cy")))
+            _draw_shapes(shape.shapes, canvas, part,
+                         lambda x, y, w, h: (gx + (x - cx) * sx, gy + (y - cy) * sy, w * sx, h * sy))
+        elif kind == "pic":
+            # p:pic keeps its blipFill as a direct child
+            canvas.paint(_fill(el, part, canvas.theme), box)
+        elif kind in ("sp", "cxnSp"):
+            _draw_geometry(el, canvas, box, _fill(_find(el, "p:spPr"), part, canvas.theme))
+            if kind == "sp" and shape.has_text_frame:
+                _draw_text(shape, canvas, box)
+
+
+def render_slide_image(slide, width_px: int = 540):
+    """
+    Draw one slide.
+
+    Args:
+        slide (Slide): python-pptx slide.
+        width_px (int): Output width; the height follows the slide's aspect ratio.
+
+    Returns:
+        PIL.Image.Image: RGB image of the slide.
+    """
+    canvas = _Canvas(slide, width_px)
+    layout = slide.slide_layout
+    master = layout.slide_master
+
+    canvas.paint(_background(slide, canvas.theme), (0, 0) + canvas.image.size)
+    # Master and layout artwork, unless hidden (showMasterSp="0")
+    if slide._element.get("showMasterSp") != "0":
+        if layout._element.get("showMasterSp") != "0":
+            _draw_shapes(master.shapes, canvas, master.part, skip_placeholders=True)
+        _draw_shapes(layout.shapes, canvas, layout.part, skip_placeholders=True)
+    _draw_shapes(slide.shapes, canvas, slide.part)
+    return canvas.image.convert("RGB")
+
+
+_THEMES = {}
+
+
+def _theme(master_part):
+    """Scheme colours of a master, cached on the master and theme bytes."""
+    h = hashlib.sha256(master_part.blob)
+    try:
+        h.update(master_part.part_related_by(_RT_THEME).blob)
+    except KeyError:
+        pass
+    key = h.digest()
+    theme = _THEMES.get(key)
+    if theme is None:
+        theme = _THEMES[key] = _Theme(master_part)
+        while len(_THEMES) > 32:
+            _THEMES.pop(next(iter(_THEMES)))
+    return theme
+
+
+def _part_digest(part, memo) -> bytes:
+    """Digest of a part's bytes plus the bytes of the images it references (memoized per deck)."""
+    key = str(part.partname)
+    digest = memo.get(key)
+    if digest is None:
+        h = hashlib.sha256(part.blob)
+        for rId in sorted(part.rels.keys()):
+            rel = part.rels[rId]
+            if rel.reltype == _RT_IMAGE and not rel.is_external:
+                h.update(rId.encode("ascii"))
+                h.update(_part_digest(rel.target_part, memo))
+        digest = memo[key] = h.digest()
+    return digest
+
+
+def slide_key(slide, width_px: int, memo=None) -> str:
+    """
+    Cache key of one slide preview: its XML and images, plus the layout,
+    master and theme it is drawn on.
+
+    Args:
+        slide (Slide): python-pptx slide.
+        width_px (int): Preview width.
+        memo (dict): Digests of shared parts, reused across the slides of a deck.
+
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    memo = {} if memo is None else memo
+    layout = slide.slide_layout
+    master = layout.slide_master
+    h = hashlib.sha256(f"{PREVIEW_VERSION}:{width_px}".encode("ascii"))
+    for part in (slide.part, layout.part, master.part):
+        h.update(_part_digest(part, memo))
+    try:
+        h.update(_part_digest(master.part.part_related_by(_RT_THEME), memo))
+    except KeyError:
+        pass
+    if "default_text_style" not in memo:
+        from lxml import etree
+
+        style = _find(slide.part.package.presentation_part._element, "p:defaultTextStyle")
+        memo["default_text_style"] = hashlib.sha256(etree.tostring(style) if style is not None else b"").digest()
+    h.update(memo["default_text_style"])
+    return h.hexdigest()
+
+
+class SlidePreviewer:
+    """
+    PNG previews of slides with a two-tier cache keyed by `slide_key`.
+
+    Args:
+        width (int): Preview width in pixels.
+        cache_dir (str): Optional directory for the persistent tier.
+        max_entries (int): Size of the in-memory LRU tier.
+    """
+
+    def __init__(self, width: int = 540, cache_dir: str = None, max_entries: int = 256):
+        self.width = width
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def render(self, slide, width: int = None, memo=None) -> bytes:
+        """
+        Return the PNG preview of one slide, drawing it only on a cache miss.
+
+        Args:
+            slide (Slide): python-pptx slide.
+            width (int): Preview width (defaults to the previewer's).
+            memo (dict): Shared-part digests reused across one deck's slides.
+
+        Returns:
+            bytes: PNG image.
+        """
+        width = width or self.width
+        key = slide_key(slide, width, memo)
+
+        with self._lock:
+            png = self._memory.get(key)
+            if png is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return png
+
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    png = f.read()
+            except OSError:
+                pass
+
+        with self._lock:
+            if png is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+
+        if png is None:
+            with span("preview_slide", width=width):
+                out = io.BytesIO()
+                render_slide_image(slide, width).save(out, "PNG", compress_level=1)
+                png = out.getvalue()
+            if self.cache_dir:
+                path = self._disk_path(key)
+                try:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp = f"{path}.{os.getpid()}.tmp"
+                    with open(tmp, "wb") as f:
+                        f.write(png)
+                    os.replace(tmp, path)
+                except OSError as e:
+                    print(f"⚠️ Could not cache slide preview: {e}", file=sys.stderr)
+
+        with self._lock:
+            self._memory[key] = png
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+        return png
+
+    def render_deck(self, prs, out_dir: str = None, prefix: str = "slide", width: int = None) -> list:
+        """
+        Preview every slide of a presentation.
+
+        Args:
+            prs (Presentation | str): Presentation or path to a .pptx.
+            out_dir (str): When given, also write `{prefix}-01.png`, ... there.
+            prefix (str): File name prefix for written previews.
+            width (int): Preview width (defaults to the previewer's).
+
+        Returns:
+            list: PNG bytes, one per slide, in deck order.
+        """
+        if isinstance(prs, str):
+            from pptx import Presentation
+
+            prs = Presentation(prs)
+        memo = {}
+        pngs = [self.render(slide, width, memo) for slide in prs.slides]
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+            for n, png in enumerate(pngs, start=1):
+                with open(os.path.join(out_dir, f"{prefix}-{n:02d}.png"), "wb") as f:
+                    f.write(png)
+        return pngs
+
+    def clear(self):
+        """Drop the in-memory tier and reset counters (the disk tier is kept)."""
+        with self._lock:
+            self._memory.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for both tiers."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._memory),
+        }
+
+
+# Process-wide default previewer (configured through the environment)
+PREVIEWER = SlidePreviewer(
+    width=int(os.environ.get("CAROUSEL_PREVIEW_WIDTH", 540)),
+    cache_dir=os.environ.get("CAROUSEL_PREVIEW_CACHE"),
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render PNG previews of every slide of a deck.")
+    parser.add_argument("decks", nargs="+", help=".pptx files to preview")
+    parser.add_argument("--out-dir", default="./concluded/previews", help="Directory for the PNGs")
+    parser.add_argument("--width", type=int, default=None, help="Preview width in pixels")
+    args = parser.parse_args(argv)
+
+    for deck in args.decks:
+        if not os.path.exists(deck):
+            print(f"❌ Error: File '{deck}' not found")
+            return 1
+        prefix = os.path.splitext(os.path.basename(deck))[0]
+        pngs = PREVIEWER.render_deck(deck, args.out_dir, prefix, args.width)
+        print(f"🖼️ {deck}: {len(pngs)} preview(s) → {args.out_dir}")
+    stats = PREVIEWER.stats()
+    print(f"📊 Cache: {stats['memory_hits'] + stats['disk_hits']} hit(s), {stats['misses']} drawn")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,37 @@
 import os
 import sys
-import shutil
-from pptx import Presentation
+from package_writer import forget_source_archive, register_source_archive, save_package_subset
+from slide_clone import slide_subset
+from tracing import span
+
+
+def save_single_slide(prs, slide, out_path):
+    """
+    Save one slide of an already-parsed presentation as its own .pptx.
+
+    Only the parts the slide reaches are written: the slide, its layout,
+    master, theme and referenced media (plus package-level parts such as
+    presProps and docProps). Other slides, unused layouts/masters and their
+    media are left out, as are links to other slides (see slide_clone).
+    The parsed presentation is not modified.
+
+    Args:
+        prs (Presentation): Parsed source presentation.
+        slide (Slide): Slide of `prs` to export.
+        out_path (str | file-like): Destination of the single-slide deck.
+    """
+    save_package_subset(prs.part.package, out_path, **slide_subset(prs, slide))
+
 
 def split_pptx_by_layout(input_dir: str):
     """
     Split each PPTX into separate files by slide layout.
     Each output file contains the slide exactly as it appeared in the original.
+
+    Every source is parsed once; each slide is then written straight from
+    the parsed package with only the parts it needs.
     """
+    from pptx import Presentation
 
     if not os.path.exists(input_dir):
         raise FileNotFoundError(f"Directory not found: {input_dir}")
@@ -28,27 +52,18 @@ def split_pptx_by_layout(input_dir: str):
         print(f"🔎 Processing {filename} (style={style})")
 
         prs = Presentation(filepath)
+        register_source_archive(filepath, prs.part.package)
 
-        for idx, slide in enumerate(prs.slides):
-            layout_name = slide.slide_layout.name.strip().replace(" ", "_")
-            # Export strategy: copy the entire .pptx file and then delete other slides
-            tmp_copy = os.path.join(style_dir, f"__tmp_{layout_name}_{idx}.pptx")
-            shutil.copy(filepath, tmp_copy)
-
-            tmp_prs = Presentation(tmp_copy)
-
-            # Delete all slides except the one we want
-            for i in reversed(range(len(tmp_prs.slides))):
-                if i != idx:
-                    r_id = tmp_prs.slides._sldIdLst[i].rId
-                    tmp_prs.part.drop_rel(r_id)
-                    del tmp_prs.slides._sldIdLst[i]
-
-            out_path = os.path.join(style_dir, f"{layout_name}.pptx")
-            tmp_prs.save(out_path)
-            os.remove(tmp_copy)
+        try:
+            for idx, slide in enumerate(prs.slides):
+                layout_name = slide.slide_layout.name.strip().replace(" ", "_")
+                out_path = os.path.join(style_dir, f"{layout_name}.pptx")
+                with span("split_slide", file=filename, slide=idx + 1, layout=layout_name):
+                    save_single_slide(prs, slide, out_path)
 
-            print(f"   ✅ Slide {idx+1} → {out_path}")
+                print(f"   ✅ Slide {idx+1} → {out_path}")
+        finally:
+            forget_source_archive(filepath)
 
 
 if __name__ == "__main__":
@@ -57,4 +72,4 @@ if __name__ == "__main__":
         sys.exit(1)
 
     input_dir = sys.argv[1]
-    split_pptx_by_layout(input_dir)
\ No newline at end of file
+    split_pptx_by_layout(input_dir)
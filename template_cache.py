@@ -0,0 +1,143 @@
+"""
+Parsed Template Cache
+---------------------
+
+Process-wide cache of parsed PPTX templates. Each template file is unzipped
+and parsed once; every render receives an independent deep copy of the
+parsed presentation (media blobs are immutable and shared between copies).
+
+Entries are evicted in LRU order and invalidated when the file's mtime/size
+changes and its SHA-256 content hash no longer matches.
+
+The SHA-256 of each media part is also computed once per parse and carried
+onto every copy (media_store.seed_media), so deduplicating images into a
+copy never re-hashes the template's media.
+"""
+
+import os
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from package_writer import forget_source_archive, register_source_archive
+from media_store import media_digests, seed_media
+from tracing import span
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class TemplateCache:
+    """
+    LRU cache of parsed templates keyed by absolute path.
+
+    Args:
+        max_entries (int): Maximum number of parsed templates kept in memory.
+        always_hash (bool): Hash the file on every lookup, not only when its
+            mtime/size changed (catches edits on filesystems with coarse mtimes).
+    """
+
+    def __init__(self, max_entries: int = 64, always_hash: bool = False):
+        self.max_entries = max_entries
+        self.always_hash = always_hash
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # path -> [stat_key, sha256, Presentation, media digests]
+        self._lock = threading.Lock()
+
+    def _lookup(self, path: str):
+        """Return the cached (sha256, Presentation, media digests) for `path`, parsing it if needed."""
+        st = os.stat(path)
+        stat_key = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                if entry[0] == stat_key and not self.always_hash:
+                    self._entries.move_to_end(path)
+                    self.hits += 1
+                    return entry[1], entry[2], entry[3]
+
+                # mtime changed (or always_hash): only re-parse if the content did
+                digest = _file_sha256(path)
+                if digest == entry[1]:
+                    entry[0] = stat_key
+                    self._entries.move_to_end(path)
+                    self.hits += 1
+                    return entry[1], entry[2], entry[3]
+
+            from pptx import Presentation
+
+            self.misses += 1
+            digest = _file_sha256(path)
+            prs = Presentation(path)
+            register_source_archive(path, prs.part.package)
+            media = media_digests(prs.part.package)
+            self._entries[path] = [stat_key, digest, prs, media]
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                forget_source_archive(self._entries.popitem(last=False)[0])
+            return digest, prs, media
+
+    def get(self, path: str):
+        """
+        Return an independent copy of the parsed template at `path`.
+
+        Args:
+            path (str): Path to the .pptx template.
+
+        Returns:
+            Presentation: A deep copy safe to modify and save.
+        """
+        with span("template_load", template=os.path.basename(path)):
+            _, prs, media = self._lookup(os.path.abspath(path))
+            prs = copy.deepcopy(prs)
+            seed_media(prs.part.package, media)
+            return prs
+
+    def digest(self, path: str) -> str:
+        """Return the SHA-256 content hash of the cached template at `path`."""
+        digest, _, _ = self._lookup(os.path.abspath(path))
+        return digest
+
+    def invalidate(self, path: str = None):
+        """Drop one template (or every template when `path` is None) from the cache."""
+        with self._lock:
+            paths = list(self._entries) if path is None else [os.path.abspath(path)]
+            for path in paths:
+                if self._entries.pop(path, None) is not None:
+                    forget_source_archive(path)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current number of entries."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+# Process-wide default cache
+TEMPLATE_CACHE = TemplateCache()
+
+
+def load_template(path: str, palette: dict = None):
+    """
+    Load a template through the process-wide cache.
+
+    Args:
+        path (str): Path to the .pptx template.
+        palette (dict): Colour variant applied to the copy (see
+            theme_variants); every variant shares the one cached parse.
+
+    Returns:
+        Presentation: An independent copy of the parsed template.
+    """
+    prs = TEMPLATE_CACHE.get(path)
+    if palette:
+        from theme_variants import apply_palette
+
+        with span("apply_palette", template=os.path.basename(path)):
+            apply_palette(prs, palette)
+    return prs
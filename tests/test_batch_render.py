@@ -0,0 +1,57 @@
+import os
+import json
+
+import pytest
+
+import batch_render
+from batch_render import output_name, run_batch
+
+
+def _render_or_die(line_no, job, out_dir, *args):
+    # Stands in for render_job inside the pool workers
+    if job["post"] == "CRASH":
+        os._exit(1)
+    return {"line": line_no, "output": os.path.join(out_dir, output_name(line_no, job)), "ok": True,
+            "error": None, "seconds": 0.0}
+
+
+def _write_jobs(path, jobs):
+    with open(path, "w", encoding="utf-8") as f:
+        for job in jobs:
+            f.write(json.dumps(job) + "\n")
+    return str(path)
+
+
+def test_a_dead_worker_fails_only_its_post(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_render, "render_job", _render_or_die)
+    jobs = [{"post": "a"}, {"post": "CRASH"}, {"post": "b"}, {"post": "c"}]
+
+    summary = run_batch(_write_jobs(tmp_path / "posts.jsonl", jobs), str(tmp_path / "out"), workers=2)
+
+    assert summary["ok"] == 3
+    assert [(e["line"], e["error"]) for e in summary["errors"]] == [(2, "worker process died")]
+
+
+def test_duplicate_outputs_are_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_render, "render_job", _render_or_die)
+    jobs = [{"post": "a", "id": "x"}, {"post": "b", "output": "x.pptx"}, {"post": "c", "id": "../x"}]
+
+    summary = run_batch(_write_jobs(tmp_path / "posts.jsonl", jobs), str(tmp_path / "out"), workers=1)
+
+    assert summary["ok"] == 1
+    assert [e["line"] for e in summary["errors"]] == [2, 3]
+
+
+@pytest.mark.parametrize("job, name", [
+    ({"output": "/etc/deck.pptx"}, "deck.pptx"),
+    ({"output": "../../deck.pptx"}, "deck.pptx"),
+    ({"id": "a/b"}, "b.pptx"),
+    ({}, "7.pptx"),
+])
+def test_output_names_stay_in_the_output_dir(job, name):
+    assert output_name(7, job) == name
+
+
+def test_empty_output_name_is_rejected():
+    with pytest.raises(ValueError):
+        output_name(1, {"output": "decks/"})
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from batch_sizing import fit_font_size_batch
+from fit_cache import FitCache, normalize_text
+from font_metrics import fit_font_size
+
+WORDS = ("AI", "agents", "plan", "act", "and", "learn", "Transforming", "business", "with", "a",
+         "workflow", "automation", "in", "2026", "—", "naïve", "résumé", "data-driven", "x", "!")
+
+
+def _corpus():
+    rng = random.Random(7)
+    texts = [
+        "",
+        "Hi",
+        "Supercalifragilisticexpialidocious" * 3,
+        "Short\n\nWith an empty paragraph",
+        "\n".join(["Line"] * 40),
+        " ".join(["word"] * 400),
+    ]
+    for _ in range(80):
+        paragraphs = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 40)))
+                      for _ in range(rng.randint(1, 4))]
+        texts.append("\n".join(paragraphs))
+    return [normalize_text(text) for text in texts]
+
+
+def test_batch_sizes_equal_scalar_render_sizes(tmp_path):
+    rng = random.Random(11)
+    texts = _corpus()
+    widths = [rng.choice([120, 250.5, 379.3, 395, 640]) for _ in texts]
+    heights = [rng.choice([60, 200, 480, 505, 900]) for _ in texts]
+    spacings = [rng.choice([0.85, 0.95, 1.0, 1.2]) for _ in texts]
+
+    sizes, overflow = fit_font_size_batch(texts, widths, heights, line_spacing=spacings)
+
+    cache = FitCache(str(tmp_path / "fit.sqlite3"))
+    expected = [cache.fit(text, w, h, line_spacing=ls) for text, w, h, ls in zip(texts, widths, heights, spacings)]
+    assert list(zip(sizes.tolist(), overflow.tolist())) == [tuple(e) for e in expected]
+    assert 0 < overflow.sum() < len(texts)
+
+
+def test_per_text_faces_and_bounds():
+    texts = _corpus()[:20]
+    faces = ["Poppins-Bold.ttf", "Poppins-Regular.ttf"] * 10
+    sizes, overflow = fit_font_size_batch(texts, 300, 400, face=faces, min_font_size=12, max_font_size=64)
+
+    expected = [fit_font_size(text, 300, 400, face, min_font_size=12, max_font_size=64)
+                for text, face in zip(texts, faces)]
+    assert list(zip(sizes.tolist(), overflow.tolist())) == expected
+
+
+def test_empty_batch():
+    sizes, overflow = fit_font_size_batch([])
+    assert sizes.shape == overflow.shape == (0,)
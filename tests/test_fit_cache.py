@@ -0,0 +1,67 @@
+import sqlite3
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from fit_cache import FitCache
+
+
+def _fill(path, barrier, worker, count):
+    cache = FitCache(path, commit_every=4)
+    for i in range(count):
+        cache.fit(f"worker {worker} text {i}", max_height_pt=200)
+        # Both workers are mid-batch here: neither may hold the write lock
+        barrier.wait(timeout=10)
+    cache.flush()
+    return cache.stats()["misses"]
+
+
+def test_workers_share_the_disk_tier(tmp_path):
+    path = str(tmp_path / "fits.sqlite")
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=2) as pool:
+        barrier = manager.Barrier(2)
+        futures = [pool.submit(_fill, path, barrier, w, 25) for w in range(2)]
+        misses = [f.result(timeout=60) for f in futures]
+
+    assert misses == [25, 25]
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM fits").fetchone()[0] == 50
+
+
+def test_results_are_read_back_from_disk(tmp_path):
+    path = str(tmp_path / "fits.sqlite")
+    first = FitCache(path)
+    value = first.fit("Transforming Business with AI Agents")
+    first.flush()
+
+    second = FitCache(path)
+    assert second.fit("Transforming  Business with AI Agents") == value
+    assert second.stats()["disk_hits"] == 1
+
+
+def test_no_write_lock_held_between_calls(tmp_path):
+    path = str(tmp_path / "fits.sqlite")
+    cache = FitCache(path, commit_every=64)
+    cache.fit("pending result")
+
+    other = sqlite3.connect(path, timeout=0)
+    other.execute("BEGIN IMMEDIATE")
+    other.execute("ROLLBACK")
+    other.close()
+
+
+def test_results_of_other_metrics_are_not_reused(tmp_path, monkeypatch):
+    from font_metrics import get_metrics
+
+    path = str(tmp_path / "fits.sqlite")
+    cache = FitCache(path)
+    cache.fit("Transforming Business with AI Agents")
+    cache.flush()
+
+    # A rebuilt metrics file (or changed font) gives the face other tables
+    monkeypatch.setattr(get_metrics("Poppins-Bold.ttf"), "digest", "rebuilt")
+    cache.fit("Transforming Business with AI Agents")
+    fresh = FitCache(path)
+    fresh.fit("Transforming Business with AI Agents")
+
+    assert cache.stats()["misses"] == 2
+    assert fresh.stats()["disk_hits"] == 0 and fresh.stats()["misses"] == 1
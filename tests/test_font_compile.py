@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+import font_metrics
+from font_compile import compile_face, compile_fonts
+from font_metrics import FONT_DIR, FontMetrics
+
+FACES = sorted(name for name in os.listdir(FONT_DIR) if name.endswith(".ttf"))
+
+
+@pytest.fixture
+def compiled(tmp_path, monkeypatch):
+    """Fonts compiled to a fresh metrics file, loaded through font_metrics."""
+    path = str(tmp_path / "metrics.bin")
+    faces = compile_fonts(FONT_DIR, path)
+    monkeypatch.setattr(font_metrics, "METRICS_FILE", path)
+    font_metrics._compiled.cache_clear()
+    yield {face["face"]: face for face in faces}
+    font_metrics._compiled.cache_clear()
+
+
+def test_every_face_round_trips(compiled):
+    assert sorted(compiled) == FACES
+    for name in FACES:
+        face = compile_face(os.path.join(FONT_DIR, name))
+        units, ascent, descent, line_gap, notdef, advances, kerning = font_metrics._load_face(name)
+
+        assert (units, ascent, descent, line_gap, notdef) == (
+            face["units_per_em"], face["ascent"], face["descent"], face["line_gap"], face["notdef"])
+        assert advances == {chr(cp): w for cp, w in face["advances"].items()}
+        assert kerning == {a << 16 | b: k for (a, b), k in face["kerning"].items()}
+        assert font_metrics._compiled()[1][" ".join(face["name"].lower().split())] == name
+
+
+@pytest.mark.parametrize("name", ["Poppins-Bold.ttf", "Poppins-Regular.ttf", "Poppins-ThinItalic.ttf"])
+def test_loaded_metrics_match_the_ttf(compiled, name):
+    from PIL import ImageFont
+
+    metrics = FontMetrics(name)
+    units = compiled[name]["units_per_em"]
+    # At size == units per em, FreeType's advances are in font units
+    font = ImageFont.truetype(os.path.join(FONT_DIR, name), size=units, layout_engine=ImageFont.Layout.BASIC)
+
+    assert (metrics.ascent * units, metrics.descent * units) == font.getmetrics()
+    text = "Transforming Business with AI Agents — naïve façade, 2026!"
+    assert metrics.measure(text) * units == pytest.approx(font.getlength(text))
+    for ch in map(chr, range(0x20, 0x250)):
+        if ch in metrics.widths:
+            assert metrics.char_width(ch) * units == pytest.approx(font.getlength(ch))
+
+
+def test_bundled_metrics_file_is_up_to_date(tmp_path):
+    path = str(tmp_path / "metrics.bin")
+    compile_fonts(FONT_DIR, path)
+
+    with open(path, "rb") as fresh, open(os.path.join(FONT_DIR, "metrics.bin"), "rb") as bundled:
+        assert fresh.read() == bundled.read()
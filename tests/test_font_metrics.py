@@ -0,0 +1,52 @@
+import pytest
+
+from font_metrics import count_lines, fit_font_size, get_metrics, text_box_width_pt
+
+FACE = "Poppins-Bold.ttf"
+TEXT = "Transforming Business with AI Agents that plan, act and learn"
+
+
+def _height(text, size, width, line_spacing=1.0):
+    return count_lines(text, size, width, FACE) * size * get_metrics(FACE).line_height * line_spacing
+
+
+@pytest.mark.parametrize("width, height", [(395, 505), (379.3, 430), (250, 200), (500, 120)])
+def test_fit_is_the_largest_size_that_fits(width, height):
+    size, overflow = fit_font_size(TEXT, width, height, FACE)
+
+    assert overflow == 0
+    assert _height(TEXT, size, width) <= height
+    assert size == 110 or _height(TEXT, size + 1, width) > height
+
+
+def test_exact_height_fits_and_one_point_less_does_not():
+    size, _ = fit_font_size(TEXT, 395, 505, FACE)
+    exact = _height(TEXT, size, 395)
+
+    assert fit_font_size(TEXT, 395, exact, FACE) == (size, 0)
+    assert fit_font_size(TEXT, 395, exact - 0.01, FACE)[0] < size
+
+
+def test_overflow_when_nothing_fits():
+    assert fit_font_size(TEXT * 20, 100, 50, FACE, min_font_size=17) == (17, 1)
+
+
+def test_narrower_boxes_get_smaller_text():
+    wide, _ = fit_font_size(TEXT, 395, 300, FACE)
+    narrow, _ = fit_font_size(TEXT, 200, 300, FACE)
+
+    assert narrow < wide
+
+
+def test_text_box_width_excludes_the_insets():
+    from pptx import Presentation
+    from pptx.util import Pt
+
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    box = slide.shapes.add_textbox(Pt(10), Pt(10), Pt(400), Pt(100))
+    assert text_box_width_pt(box) == pytest.approx(400 - 2 * 7.2)
+
+    box.text_frame.margin_left = Pt(20)
+    box.text_frame.margin_right = 0
+    assert text_box_width_pt(box) == pytest.approx(380)
@@ -0,0 +1,71 @@
+import io
+import random
+
+from image_pipeline import ImagePipeline, encode_image, target_pixels
+
+
+def _encode(img, fmt, **kwargs):
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, **kwargs)
+    return buffer.getvalue()
+
+
+def _photo(size):
+    from PIL import Image
+
+    rng = random.Random(3)
+    img = Image.new("RGB", size)
+    img.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(size[0] * size[1])])
+    return img
+
+
+def _open(blob):
+    from PIL import Image
+
+    return Image.open(io.BytesIO(blob))
+
+
+def test_target_pixels():
+    # 2" × 1" at 150 dpi
+    assert target_pixels(2 * 914400, 914400, 150) == (300, 150)
+    assert target_pixels(10, 10, 150) == (1, 1)
+
+
+def test_each_dimension_is_clamped_and_never_enlarged():
+    source = _encode(_photo((400, 100)), "PNG")
+
+    blob, _ = encode_image(source, (200, 300))
+    assert _open(blob).size == (200, 100)
+
+    # Already small enough: embedded as is rather than re-encoded bigger
+    small = _encode(_photo((40, 30)), "JPEG", quality=40, optimize=True)
+    assert encode_image(small, (200, 300)) == (small, "jpg")
+
+
+def test_photos_become_jpeg_and_graphics_stay_png():
+    from PIL import Image
+
+    photo, ext = encode_image(_encode(_photo((300, 200)), "PNG"), (150, 100))
+    assert (ext, _open(photo).format) == ("jpg", "JPEG")
+
+    flat = Image.new("RGB", (300, 200), (20, 40, 60))
+    flat.paste((200, 10, 10), (0, 0, 150, 100))
+    graphic, ext = encode_image(_encode(flat, "PNG"), (150, 100))
+    assert (ext, _open(graphic).format) == ("png", "PNG")
+
+    transparent = _photo((300, 200)).convert("RGBA")
+    transparent.putpixel((0, 0), (0, 0, 0, 0))
+    blob, ext = encode_image(_encode(transparent, "PNG"), (150, 100))
+    assert (ext, _open(blob).mode) == ("png", "RGBA")
+
+
+def test_prepare_caches_by_content_and_size(tmp_path):
+    path = tmp_path / "photo.png"
+    path.write_bytes(_encode(_photo((300, 200)), "PNG"))
+    pipeline = ImagePipeline(dpi=96, cache_dir=str(tmp_path / "cache"))
+
+    blob, name = pipeline.prepare(str(path), 914400, 914400)
+    assert name == "photo.jpg" and _open(blob).size == (96, 96)
+    assert pipeline.prepare(str(path), 914400, 914400) == (blob, name)
+    assert ImagePipeline(dpi=96, cache_dir=str(tmp_path / "cache")).prepare(str(path), 914400, 914400)[0] == blob
+    assert pipeline.stats()["memory_hits"] == 1
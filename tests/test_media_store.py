@@ -0,0 +1,44 @@
+import io
+
+import media_store
+from media_store import get_or_add_image_blob, media_parts
+from template_cache import TemplateCache
+
+
+def _png(color):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _template(path, colors):
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    prs = Presentation()
+    for color in colors:
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        slide.shapes.add_picture(io.BytesIO(_png(color)), Inches(1), Inches(1))
+    prs.save(str(path))
+
+
+def test_template_media_is_hashed_once_per_parse(tmp_path, monkeypatch):
+    _template(tmp_path / "t.pptx", [(255, 0, 0), (0, 0, 255)])
+    cache = TemplateCache()
+    cache.get(str(tmp_path / "t.pptx"))
+
+    hashed = []
+    blob_sha256 = media_store.blob_sha256
+    monkeypatch.setattr(media_store, "blob_sha256", lambda blob: (hashed.append(blob), blob_sha256(blob))[1])
+
+    for _ in range(3):
+        prs = cache.get(str(tmp_path / "t.pptx"))
+        # Already in the template: found by the carried digest, not added again
+        part = get_or_add_image_blob(prs.part.package, _png((255, 0, 0)))
+        assert part in media_parts(prs.part.package).values()
+        assert len(media_parts(prs.part.package)) == 2
+
+    # Only the inserted blob itself
+    assert hashed == [_png((255, 0, 0))] * 3
@@ -0,0 +1,110 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from merge_templates import merge_pptx_slides
+
+R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+RT_SLIDE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+
+
+def _png(color):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), color).save(buffer, "PNG")
+    return buffer
+
+
+def _deck(path, layouts, branded=False, image=(200, 30, 30)):
+    """A deck with one titled slide per layout index, each showing the same image."""
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    prs = Presentation()
+    if branded:
+        # Another design: a master (and so layouts) with different content
+        prs.slide_masters[0]._element.cSld.set("name", "Brand")
+    for index in layouts:
+        slide = prs.slides.add_slide(prs.slide_layouts[index])
+        if slide.shapes.title is not None:
+            slide.shapes.title.text = f"{os.path.basename(path)} {index}"
+        slide.shapes.add_picture(_png(image), Inches(1), Inches(1))
+    prs.save(str(path))
+    return prs
+
+
+@pytest.fixture
+def sources(tmp_path):
+    from pptx import Presentation
+
+    src = tmp_path / "src"
+    src.mkdir()
+    _deck(src / "a.pptx", [0, 1])
+    _deck(src / "b.pptx", [1, 5])
+    _deck(src / "c.pptx", [5], branded=True)
+    _deck(src / "d.pptx", [5, 5], branded=True)
+
+    # a.pptx: its first slide links to its second
+    prs = Presentation(str(src / "a.pptx"))
+    prs.slides[0].shapes.title.click_action.target_slide = prs.slides[1]
+    prs.save(str(src / "a.pptx"))
+    return src
+
+
+def _merge(sources, out, **kwargs):
+    merge_pptx_slides(str(sources), str(out), **kwargs)
+    with open(out, "rb") as f:
+        return f.read()
+
+
+def test_masters_layouts_and_media_are_deduplicated(sources, tmp_path):
+    from pptx import Presentation
+
+    out = tmp_path / "merged.pptx"
+    _merge(sources, out)
+    prs = Presentation(str(out))
+
+    assert len(prs.slides) == 7
+    # The base deck's master and layouts, plus the branded master with the one layout its slides use
+    assert len(prs.slide_masters) == 2
+    assert [len(master.slide_layouts) for master in prs.slide_masters] == [11, 1]
+    with zipfile.ZipFile(out) as zf:
+        assert [name for name in zf.namelist() if name.startswith("ppt/media/")] == ["ppt/media/image1.png"]
+
+
+def test_slide_links_are_dropped_without_dangling_rels(sources, tmp_path):
+    from pptx import Presentation
+
+    out = tmp_path / "merged.pptx"
+    _merge(sources, out)
+    prs = Presentation(str(out))
+
+    for slide in prs.slides:
+        rels = slide.part.rels
+        assert all(rel.reltype != RT_SLIDE for rel in rels.values())
+        for element in slide._element.iter():
+            rId = element.get(R_ID)
+            assert rId is None or rId in rels
+        assert not slide._element.xpath(".//a:hlinkClick")
+
+
+def test_streamed_merge_reopens_with_every_slide(sources, tmp_path):
+    from pptx import Presentation
+
+    out = tmp_path / "streamed.pptx"
+    _merge(sources, out, stream=True)
+    prs = Presentation(str(out))
+
+    assert len(prs.slides) == 7
+    assert [len(master.slide_layouts) for master in prs.slide_masters] == [11, 1]
+    assert prs.slides[0].shapes.title.text == "a.pptx 0"
+
+
+def test_parallel_merge_equals_serial_merge(sources, tmp_path):
+    serial = _merge(sources, tmp_path / "serial.pptx")
+    parallel = _merge(sources, tmp_path / "parallel.pptx", workers=2)
+
+    assert parallel == serial
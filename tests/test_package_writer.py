@@ -0,0 +1,96 @@
+import io
+import zipfile
+
+import package_writer
+from package_writer import forget_source_archive, register_source_archive, save_presentation
+
+
+def _deck(path):
+    from pptx import Presentation
+
+    prs = Presentation()
+    prs.slides.add_slide(prs.slide_layouts[0]).shapes.title.text = "Hello"
+    prs.save(str(path))
+    return Presentation(str(path))
+
+
+def _entries(buffer):
+    with zipfile.ZipFile(buffer) as zf:
+        return {info.filename: zf.read(info) for info in zf.infolist()}
+
+
+def test_raw_copy_and_recompressing_fallback_write_the_same_parts(tmp_path, monkeypatch):
+    prs = _deck(tmp_path / "deck.pptx")
+    register_source_archive(str(tmp_path / "deck.pptx"), prs.part.package)
+    try:
+        raw = io.BytesIO()
+        save_presentation(prs, raw)
+        monkeypatch.setattr(package_writer, "RAW_COPY_PYTHONS", ((3, 0), (3, 0)))
+        recompressed = io.BytesIO()
+        save_presentation(prs, recompressed)
+    finally:
+        forget_source_archive(str(tmp_path / "deck.pptx"))
+
+    assert _entries(raw) == _entries(recompressed)
+
+
+def test_registered_archives_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(package_writer, "MAX_SOURCE_ARCHIVES", 2)
+    paths = [str(tmp_path / f"deck{i}.pptx") for i in range(3)]
+    try:
+        for path in paths:
+            register_source_archive(path, _deck(path).part.package)
+
+        assert list(package_writer._ARCHIVES) == paths[1:]
+        assert {entry[0] for entry in package_writer._RAW_ENTRIES.values()} <= set(paths[1:])
+    finally:
+        for path in paths:
+            forget_source_archive(path)
+
+    assert not package_writer._ARCHIVES and not package_writer._RAW_ENTRIES
+
+
+def _rezip(src, dst, compresslevel):
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED,
+                                                      compresslevel=compresslevel) as zout:
+        for info in zin.infolist():
+            zout.writestr(info.filename, zin.read(info))
+
+
+def _save(prs, **kwargs):
+    buffer = io.BytesIO()
+    save_presentation(prs, buffer, **kwargs)
+    return buffer.getvalue()
+
+
+def test_output_does_not_depend_on_registered_sources(tmp_path, monkeypatch):
+    from pptx import Presentation
+
+    copies = []
+    write_raw = package_writer._write_raw
+    monkeypatch.setattr(package_writer, "_write_raw", lambda zf, name, *a: (copies.append(name), write_raw(zf, name, *a)))
+
+    prs = _deck(tmp_path / "deck.pptx")
+    with open(tmp_path / "saved.pptx", "wb") as f:
+        f.write(_save(prs))
+    _rezip(tmp_path / "saved.pptx", tmp_path / "stored.pptx", 0)
+
+    raw_copied = {}
+    for name in ("deck.pptx", "saved.pptx", "stored.pptx"):
+        path = str(tmp_path / name)
+        prs = Presentation(path)
+        plain, fast = _save(prs), _save(prs, compresslevel=1)
+        register_source_archive(path, prs.part.package)
+        try:
+            copies.clear()
+            assert _save(prs) == plain
+            raw_copied[name] = len(copies)
+            copies.clear()
+            assert _save(prs, compresslevel=1) == fast
+            assert not copies
+        finally:
+            forget_source_archive(path)
+
+    # Only entries stored as this writer would store them are copied
+    assert raw_copied["saved.pptx"] == len(_entries(io.BytesIO(plain)))
+    assert raw_copied["stored.pptx"] == 0
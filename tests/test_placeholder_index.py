@@ -0,0 +1,56 @@
+import io
+
+from append_template import fill_presentation
+from placeholder_index import compile_placeholder_index
+
+
+def _template(*texts):
+    from pptx import Presentation
+    from pptx.util import Pt
+
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    for i, text in enumerate(texts):
+        slide.shapes.add_textbox(Pt(20), Pt(20 + 60 * i), Pt(300), Pt(50)).text_frame.text = text
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    buffer.seek(0)
+    return Presentation(buffer)
+
+
+def test_every_text_shape_is_indexed():
+    prs = _template("{{HOOK}}", "[HOOK SUB]", "plain words", "")
+    index = compile_placeholder_index(prs)
+
+    assert [entry["text"] for entry in index["shapes"]] == ["{{HOOK}}", "[HOOK SUB]", "plain words"]
+
+
+def test_any_placeholder_key_is_filled():
+    prs = _template("{{HOOK}}", "[HOOK SUB]", "by TAGLINE")
+    blocks = {
+        "{{HOOK}}": {"key": "HOOK", "size": 20},
+        "[HOOK SUB]": {"key": "HOOK_SUB", "size": 12},
+        "TAGLINE": {"key": "CTA", "size": 12},
+    }
+    parts = {"HOOK": ["Big news"], "HOOK_SUB": ["Details"], "CTA": ["us"]}
+
+    fill_presentation(prs, blocks, parts)
+
+    texts = [shape.text_frame.text for shape in prs.slides[0].shapes]
+    assert texts == ["Big news", "Details", "by us"]
+
+
+def test_text_is_fitted_to_its_own_box():
+    from pptx import Presentation
+    from pptx.util import Pt
+
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    for width in (400, 200):
+        slide.shapes.add_textbox(Pt(20), Pt(20), Pt(width), Pt(300)).text_frame.text = "[HOOK]"
+    blocks = {"[HOOK]": {"key": "HOOK", "bold": True, "text-block-height": 300}}
+
+    fill_presentation(prs, blocks, {"HOOK": ["Transforming Business with AI Agents"]})
+
+    wide, narrow = [shape.text_frame.paragraphs[0].runs[0].font.size.pt for shape in slide.shapes]
+    assert narrow < wide
@@ -0,0 +1,34 @@
+from post_parser import iter_posts, parse_post
+
+
+def test_dash_lines_are_content_in_a_single_post():
+    text = "[HOOK]\nBig news\n---\nmore hook text\n[STORY]\nOnce upon\n---\nthe end"
+
+    assert parse_post(text) == {
+        "HOOK": ["Big news", "---", "more hook text"],
+        "STORY": ["Once upon", "---", "the end"],
+    }
+
+
+def test_parse_post_matches_the_original_tokenizer():
+    text = "intro\n[hook]\n  Line one  \n\n[UNKNOWN]\nstill hook\n[[CTA]]\nGo\n[HOOK]\nagain"
+
+    assert parse_post(text) == {"HOOK": ["again"], "CTA": ["Go"]}
+
+
+def test_exports_split_on_delimiters():
+    text = "--- post-001\n[HOOK]\nFirst\n---\n[HOOK]\nSecond\n--- post-003\n[CTA]\nThird"
+    posts = list(iter_posts(text))
+
+    assert [p["id"] for p in posts] == ["post-001", None, "post-003"]
+    assert [p["sections"] for p in posts] == [{"HOOK": ["First"]}, {"HOOK": ["Second"]}, {"CTA": ["Third"]}]
+    assert posts[2]["line"] == 8
+
+
+def test_bare_tags():
+    sections = ["HOOK", "CTA"]
+
+    assert parse_post("HOOK\nHello\nhook words\ncta\nBye", sections, bare_tags=True) == {
+        "HOOK": ["Hello", "hook words"],
+        "CTA": ["Bye"],
+    }
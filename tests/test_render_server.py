@@ -0,0 +1,52 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from render_server import RenderHandler
+
+
+@pytest.fixture
+def handler(tmp_path):
+    root = tmp_path / "styles"
+    (root / "dark").mkdir(parents=True)
+    (root / "dark" / "Cover.pptx").write_bytes(b"")
+    (root / "dark" / "photo.png").write_bytes(b"")
+    (tmp_path / "outside.pptx").write_bytes(b"")
+    os.symlink(tmp_path / "outside.pptx", root / "dark" / "link.pptx")
+
+    handler = RenderHandler.__new__(RenderHandler)
+    handler.server = SimpleNamespace(styles_root=os.path.realpath(root))
+    return handler
+
+
+def test_request_mappings_are_resolved_inside_the_styles_root(handler):
+    root = handler.server.styles_root
+    blocks = {"[HOOK]": {"key": "HOOK", "bold": True}}
+    mappings = handler._request_mappings([
+        {"template": os.path.join(root, "dark", "..", "dark", "Cover.pptx"), "image": None, "blocks": blocks},
+        {"template": os.path.join(root, "dark", "Cover.pptx"), "image": os.path.join(root, "dark", "photo.png"),
+         "blocks": {"[STORY]": "STORY"}},
+    ])
+
+    assert [m["template"] for m in mappings] == [os.path.join(root, "dark", "Cover.pptx")] * 2
+    assert [m["image"] for m in mappings] == [None, os.path.join(root, "dark", "photo.png")]
+    assert mappings[0]["blocks"] == blocks
+
+
+@pytest.mark.parametrize("mapping", [
+    {"template": "{root}/../outside.pptx", "blocks": {}},
+    {"template": "{root}/dark/link.pptx", "blocks": {}},
+    {"template": "{root}/dark/missing.pptx", "blocks": {}},
+    {"template": "{root}/dark/Cover.pptx", "image": "/etc/hostname", "blocks": {}},
+    {"template": "{root}/dark/Cover.pptx", "blocks": {}, "output": "/tmp/x.pptx"},
+    {"template": "{root}/dark/Cover.pptx", "blocks": {}, "palette": "../../secret.json"},
+    {"template": "{root}/dark/Cover.pptx", "blocks": {"[HOOK]": 3}},
+    {"template": "{root}/dark/Cover.pptx"},
+])
+def test_request_mappings_outside_the_styles_root_are_refused(handler, mapping):
+    root = handler.server.styles_root
+    mapping = {key: value.format(root=root) if isinstance(value, str) else value for key, value in mapping.items()}
+
+    with pytest.raises(ValueError):
+        handler._request_mappings([mapping])
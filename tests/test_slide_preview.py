@@ -0,0 +1,50 @@
+import io
+
+from slide_preview import SlidePreviewer, slide_key
+
+
+def _png(color):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _deck():
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[5])
+    slide.shapes.title.text = "Preview"
+    picture = slide.shapes.add_picture(io.BytesIO(_png((255, 0, 0))), Inches(1), Inches(2), Inches(4), Inches(3))
+    return prs, slide, picture
+
+
+def test_key_follows_the_image_bytes():
+    prs, slide, picture = _deck()
+    key = slide_key(slide, 540)
+    assert slide_key(slide, 540) == key
+    assert slide_key(slide, 270) != key
+
+    # Same slide XML and partname, other pixels
+    image_part = slide.part.related_part(picture._element.blipFill.blip.rEmbed)
+    image_part._blob = _png((0, 0, 255))
+
+    assert slide_key(slide, 540) != key
+
+
+def test_previews_are_cached_and_redrawn_when_the_image_changes():
+    from PIL import Image
+
+    prs, slide, picture = _deck()
+    previewer = SlidePreviewer(width=270)
+    first = previewer.render(slide)
+    assert previewer.render(slide) == first
+    assert Image.open(io.BytesIO(first)).width == 270
+
+    image_part = slide.part.related_part(picture._element.blipFill.blip.rEmbed)
+    image_part._blob = _png((0, 0, 255))
+    assert previewer.render(slide) != first
+    assert previewer.stats()["memory_hits"] == 1
@@ -0,0 +1,43 @@
+import io
+import os
+import zipfile
+
+from split_templates import split_pptx_by_layout
+
+
+def _png(color):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), color).save(buffer, "PNG")
+    return buffer
+
+
+def test_each_output_holds_one_slide_its_layout_and_its_media(tmp_path):
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    prs = Presentation()
+    slides = [(0, (255, 0, 0)), (1, (0, 0, 255)), (6, None)]
+    for layout, color in slides:
+        slide = prs.slides.add_slide(prs.slide_layouts[layout])
+        if color is not None:
+            slide.shapes.add_picture(_png(color), Inches(1), Inches(1))
+    prs.slides[0].shapes.title.click_action.target_slide = prs.slides[1]
+    prs.save(str(tmp_path / "blue-dark.pptx"))
+
+    split_pptx_by_layout(str(tmp_path))
+
+    names = {layout: prs.slide_layouts[layout].name.replace(" ", "_") for layout, _ in slides}
+    assert sorted(os.listdir(tmp_path / "blue")) == sorted(f"{name}.pptx" for name in names.values())
+    for layout, color in slides:
+        path = tmp_path / "blue" / f"{names[layout]}.pptx"
+        out = Presentation(str(path))
+
+        assert len(out.slides) == 1
+        assert len(out.slide_masters) == 1
+        assert [l.name for l in out.slide_masters[0].slide_layouts] == [prs.slide_layouts[layout].name]
+        assert out.slides[0].slide_layout.name == prs.slide_layouts[layout].name
+        with zipfile.ZipFile(path) as zf:
+            media = [zf.read(n) for n in zf.namelist() if n.startswith("ppt/media/")]
+        assert media == ([_png(color).getvalue()] if color is not None else [])
@@ -0,0 +1,54 @@
+import os
+
+from template_cache import TemplateCache
+
+
+def _template(path, title="Cover"):
+    from pptx import Presentation
+
+    prs = Presentation()
+    prs.slides.add_slide(prs.slide_layouts[0]).shapes.title.text = title
+    prs.save(str(path))
+    return str(path)
+
+
+def test_touched_but_unchanged_file_is_a_hit(tmp_path):
+    path = _template(tmp_path / "t.pptx")
+    cache = TemplateCache()
+    cache.get(path)
+    digest = cache.digest(path)
+
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    cache.get(path)
+
+    assert cache.stats() == {"hits": 2, "misses": 1, "entries": 1}
+    assert cache.digest(path) == digest
+
+
+def test_changed_file_is_parsed_again(tmp_path):
+    path = _template(tmp_path / "t.pptx")
+    cache = TemplateCache()
+    cache.get(path)
+
+    _template(tmp_path / "t.pptx", title="Changed")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+
+    assert cache.get(path).slides[0].shapes.title.text == "Changed"
+    assert cache.stats()["misses"] == 2
+
+
+def test_copies_do_not_change_the_cached_parse(tmp_path):
+    path = _template(tmp_path / "t.pptx")
+    cache = TemplateCache()
+
+    first = cache.get(path)
+    first.slides[0].shapes.title.text = "Edited"
+    first.slides.add_slide(first.slide_layouts[1])
+
+    second = cache.get(path)
+    assert second is not first
+    assert len(second.slides) == 1
+    assert second.slides[0].shapes.title.text == "Cover"
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,91 @@
+from lxml import etree
+
+from template_cache import load_template
+from theme_variants import apply_palette, load_palette, mappings_for_variant, variant_blocks
+
+NS = {"a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+      "p": "http://schemas.openxmlformats.org/presentationml/2006/main"}
+RT_THEME = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/theme"
+
+PALETTE = {
+    "theme": {"dk1": "#102040", "accent1": "#1f6feb"},
+    "background": "#F5F7FA",
+    "colors": {"#FFFFFF": "#102040"},
+    "text": "#102040",
+    "blocks": {"[CTA]": "#E5533D"},
+}
+
+
+def _template(path):
+    from pptx import Presentation
+    from pptx.dml.color import RGBColor
+    from pptx.enum.shapes import MSO_SHAPE
+    from pptx.util import Inches
+
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    slide.background.fill.solid()
+    slide.background.fill.fore_color.rgb = RGBColor(0x00, 0x00, 0x00)
+    shape = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(1), Inches(1), Inches(2), Inches(2))
+    shape.fill.solid()
+    shape.fill.fore_color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
+    prs.save(str(path))
+    return str(path)
+
+
+def _scheme(prs):
+    theme = prs.slide_masters[0].part.part_related_by(RT_THEME)
+    scheme = etree.fromstring(theme.blob).find("a:themeElements/a:clrScheme", NS)
+    return {slot: scheme.find(f"a:{slot}/a:srgbClr", NS).get("val") for slot in ("dk1", "accent1")
+            if scheme.find(f"a:{slot}/a:srgbClr", NS) is not None}
+
+
+def _colors(prs):
+    slide = prs.slides[0]
+    background = slide._element.find("p:cSld/p:bg/p:bgPr/a:solidFill/a:srgbClr", NS).get("val")
+    return background, str(slide.shapes[0].fill.fore_color.rgb)
+
+
+def test_palette_is_applied_to_a_copy(tmp_path):
+    path = _template(tmp_path / "t.pptx")
+    original = load_template(path)
+
+    painted = load_template(path, load_palette(PALETTE))
+
+    assert _scheme(painted) == {"dk1": "102040", "accent1": "1F6FEB"}
+    assert _colors(painted) == ("F5F7FA", "102040")
+    # The cached parse, and so every later copy, is untouched
+    again = load_template(path)
+    assert _scheme(again) == _scheme(original) != _scheme(painted)
+    assert _colors(again) == _colors(original) == ("000000", "FFFFFF")
+
+
+def test_apply_palette_without_design_keys_leaves_the_deck_alone(tmp_path):
+    prs = load_template(_template(tmp_path / "t.pptx"))
+    before = _colors(prs), _scheme(prs)
+
+    assert apply_palette(prs, {"text": "#123456"}) is prs
+    assert (_colors(prs), _scheme(prs)) == before
+
+
+def test_block_colours():
+    palette = load_palette(PALETTE)
+    blocks = {"[HOOK]": "HOOK", "[STORY]": {"key": "STORY", "color": "#fff"}, "[CTA]": {"key": "CTA"}}
+
+    result = variant_blocks(blocks, palette)
+
+    assert result == {"[HOOK]": {"key": "HOOK", "color": "#102040"},
+                      "[STORY]": {"key": "STORY", "color": "#102040"},
+                      "[CTA]": {"key": "CTA", "color": "#E5533D"}}
+    assert blocks["[STORY]"] == {"key": "STORY", "color": "#fff"}
+
+
+def test_named_variant_resolves_from_the_module_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mappings = [{"template": "t.pptx", "image": None, "blocks": {"[HOOK]": "HOOK"}}]
+
+    (light,) = mappings_for_variant("light", mappings)
+
+    assert light["palette"] == load_palette("light")
+    assert light["blocks"]["[HOOK]"]["color"] == "#102040"
+    assert "palette" not in mappings[0]
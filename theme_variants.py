@@ -0,0 +1,272 @@
+"""
+Render-Time Theme Variants
+--------------------------
+
+Applies a palette to a parsed template in memory, so one template file
+(and one cached parse of it, see template_cache) serves the dark, light
+and client-branded variants of a style instead of one set of template
+copies per variant.
+
+A palette is a JSON object; every key is optional:
+
+    {
+      "theme": {"dk1": "#102040", "lt1": "#FFFFFF", "accent1": "#1F6FEB"},
+      "background": "#F5F7FA",
+      "colors": {"#102040": "#F5F7FA", "#FFFFFF": "#102040"},
+      "text": "#102040",
+      "blocks": {"HOOK": "#1F6FEB", "[CTA]": "#E5533D"}
+    }
+
+- "theme": colours of the themes' colour scheme (dk1, lt1, dk2, lt2,
+  accent1-6, hlink, folHlink), i.e. everything drawn with a scheme colour.
+- "background": solid fill of the slide, layout and master backgrounds
+  that are solid or follow the theme; picture and gradient backgrounds are
+  kept (recolour gradients through "colors").
+- "colors": explicit RGB colours of the slides, layouts and masters to
+  replace, e.g. the dark template's fills and text.
+- "text" / "blocks": the `color` of the mapping blocks (see
+  append_template.fill_presentation). A block takes its colour from
+  "blocks" (by placeholder or key), else its own colour through "colors",
+  else "text".
+
+Named palettes are `{name}.json` files in PALETTE_DIR (env
+CAROUSEL_PALETTE_DIR, default templates/palettes next to this file, not
+the working directory); a path to a .json file works too.
+
+Usage:
+    mappings = mappings_for_variant("light", mappings_for_style("./templates/blue-blur/dark"))
+    build_carousel_in_memory(post, mappings, "deck.pptx")
+"""
+
+import os
+import re
+import json
+from functools import lru_cache
+
+
+PALETTE_DIR = (os.environ.get("CAROUSEL_PALETTE_DIR")
+               or os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "palettes"))
+
+SCHEME_SLOTS = ("dk1", "lt1", "dk2", "lt2", "accent1", "accent2", "accent3", "accent4", "accent5", "accent6",
+                "hlink", "folHlink")
+
+_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+_NS = {"a": _A, "p": "http://schemas.openxmlformats.org/presentationml/2006/main"}
+_RT_THEME = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/theme"
+
+_HEX_RE = re.compile(r"^#?([0-9a-fA-F]{3}|[0-9a-fA-F]{6})$")
+
+
+def _hex(value: str) -> str:
+    """Normalise "#fff" / "#FFFFFF" / "ffffff" to "FFFFFF"."""
+    match = _HEX_RE.match(str(value).strip())
+    if not match:
+        raise ValueError(f"invalid colour {value!r}")
+    digits = match.group(1).upper()
+    return "".join(c * 2 for c in digits) if len(digits) == 3 else digits
+
+
+def normalize_palette(palette: dict) -> dict:
+    """
+    Validate a palette and normalise its colours to "RRGGBB".
+
+    Args:
+        palette (dict): Palette as documented in this module.
+
+    Returns:
+        dict: A new palette with only the known keys.
+
+    Raises:
+        ValueError: On unknown theme slots or invalid colours.
+    """
+    theme = palette.get("theme") or {}
+    unknown = set(theme) - set(SCHEME_SLOTS)
+    if unknown:
+        raise ValueError(f"unknown theme colours: {', '.join(sorted(unknown))}")
+
+    result = {}
+    if theme:
+        result["theme"] = {slot: _hex(value) for slot, value in theme.items()}
+    if palette.get("background"):
+        result["background"] = _hex(palette["background"])
+    if palette.get("colors"):
+        result["colors"] = {_hex(old): _hex(new) for old, new in palette["colors"].items()}
+    if palette.get("text"):
+        result["text"] = _hex(palette["text"])
+    if palette.get("blocks"):
+        result["blocks"] = {name: _hex(value) for name, value in palette["blocks"].items()}
+    return result
+
+
+@lru_cache(maxsize=64)
+def _read_palette(path: str, mtime_ns: int, size: int) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.dumps(normalize_palette(json.load(f)), sort_keys=True)
+
+
+def load_palette(variant) -> dict:
+    """
+    Resolve a variant to a normalised palette.
+
+    Args:
+        variant (str | dict): Palette name (`{PALETTE_DIR}/{name}.json`),
+            path to a palette .json, or a palette dict.
+
+    Returns:
+        dict: Normalised palette (a new dict on every call).
+    """
+    if isinstance(variant, dict):
+        return normalize_palette(variant)
+    path = variant if variant.endswith(".json") else os.path.join(PALETTE_DIR, f"{variant}.json")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Palette '{variant}' not found ({path})")
+    st = os.stat(path)
+    return json.loads(_read_palette(os.path.abspath(path), st.st_mtime_ns, st.st_size))
+
+
+@lru_cache(maxsize=128)
+def _recolor_theme(blob: bytes, scheme: tuple) -> bytes:
+    """Theme XML with the given (slot, "RRGGBB") colours in its colour scheme."""
+    from lxml import etree
+
+    root = etree.fromstring(blob)
+    clr_scheme = root.find("a:themeElements/a:clrScheme", _NS)
+    if clr_scheme is None:
+        return blob
+    for slot, value in scheme:
+        el = clr_scheme.find(f"a:{slot}", _NS)
+        if el is None:
+            continue
+        # sysClr (windowText, window) included: the palette colour wins
+        for child in list(el):
+            el.remove(child)
+        etree.SubElement(el, f"{{{_A}}}srgbClr", val=value)
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def _set_background(element, value: str):
+    """Give a slide/layout/master a solid background, unless it has a picture or gradient one."""
+    from lxml import etree
+
+    bg = element.find("p:cSld/p:bg", _NS)
+    if bg is None:
+        return
+    bg_pr = bg.find("p:bgPr", _NS)
+    if bg_pr is not None:
+        if bg_pr.find("a:solidFill", _NS) is None and bg_pr.find("a:noFill", _NS) is None:
+            return
+    elif bg.find("p:bgRef/a:schemeClr", _NS) is None:
+        # Theme background with an explicit colour: recoloured through "colors"
+        return
+
+    for child in list(bg):
+        bg.remove(child)
+    bg_pr = etree.SubElement(bg, f"{{{_NS['p']}}}bgPr")
+    fill = etree.SubElement(bg_pr, f"{{{_A}}}solidFill")
+    etree.SubElement(fill, f"{{{_A}}}srgbClr", val=value)
+    etree.SubElement(bg_pr, f"{{{_A}}}effectLst")
+
+
+def _remap_colors(element, colors: dict):
+    for el in element.iter(f"{{{_A}}}srgbClr"):
+        new = colors.get(el.get("val", "").upper())
+        if new is not None:
+            el.set("val", new)
+
+
+def _design_parts(prs):
+    """Every master, its layouts and theme, and every slide of `prs` (each once)."""
+    themes, elements = {}, []
+    for master in prs.slide_masters:
+        elements.append(master._element)
+        elements.extend(layout._element for layout in master.slide_layouts)
+        theme = master.part.part_related_by(_RT_THEME)
+        themes[id(theme)] = theme
+    elements.extend(slide._element for slide in prs.slides)
+    return list(themes.values()), elements
+
+
+def apply_palette(prs, palette: dict):
+    """
+    Recolour a presentation in memory: its themes' colour schemes,
+    backgrounds and explicit colours (see the module docstring).
+
+    Modifies `prs` in place; use it on a copy from the template cache
+    (`load_template(path, palette)` does), never on the cached parse.
+
+    Args:
+        prs (Presentation): Presentation to recolour.
+        palette (dict): Palette (normalised by `load_palette` /
+            `normalize_palette`; raw dicts are normalised here).
+
+    Returns:
+        Presentation: The same `prs`.
+    """
+    palette = normalize_palette(palette)
+    if not any(key in palette for key in ("theme", "background", "colors")):
+        return prs
+
+    themes, elements = _design_parts(prs)
+    if "theme" in palette:
+        scheme = tuple(sorted(palette["theme"].items()))
+        for theme in themes:
+            theme._blob = _recolor_theme(theme.blob, scheme)
+    for element in elements:
+        if "colors" in palette:
+            _remap_colors(element, palette["colors"])
+        if "background" in palette:
+            _set_background(element, palette["background"])
+    return prs
+
+
+def variant_blocks(blocks: dict, palette: dict) -> dict:
+    """
+    Block styles with the palette's text colours (see the module docstring).
+
+    Args:
+        blocks (dict): Placeholder → key or style config (a mapping's "blocks").
+        palette (dict): Normalised palette.
+
+    Returns:
+        dict: New block configs; `blocks` is not modified.
+    """
+    overrides = palette.get("blocks", {})
+    colors = palette.get("colors", {})
+    result = {}
+    for placeholder, cfg in blocks.items():
+        cfg = {"key": cfg} if isinstance(cfg, str) else dict(cfg)
+        color = overrides.get(placeholder) or overrides.get(cfg.get("key"))
+        if color is None and "color" in cfg:
+            own = _hex(cfg["color"])
+            color = colors.get(own, own)
+        if color is None:
+            color = palette.get("text")
+        if color is not None:
+            cfg["color"] = f"#{color}"
+        result[placeholder] = cfg
+    return result
+
+
+def mappings_for_variant(variant, mappings=None):
+    """
+    Render a set of template mappings in another colour variant.
+
+    Each mapping gets the resolved "palette" (applied to its template by
+    `template_cache.load_template`) and blocks with the palette's colours.
+
+    Args:
+        variant (str | dict): Palette name, path or dict (see `load_palette`).
+        mappings (list): Mappings to rewrite (defaults to
+            `append_template.template_mappings`).
+
+    Returns:
+        list: New mapping dicts (the originals are not modified).
+    """
+    if mappings is None:
+        from append_template import template_mappings as mappings
+
+    palette = load_palette(variant)
+    return [
+        {**mapping, "palette": palette, "blocks": variant_blocks(mapping["blocks"], palette)}
+        for mapping in mappings
+    ]
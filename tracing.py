@@ -0,0 +1,261 @@
+"""
+Pipeline Tracing
+----------------
+
+Lightweight spans around the pipeline stages (post parsing, template load,
+placeholder scan, font fit, image insert, save, merge per source, split
+per slide), exported as Chrome trace-event JSON (open it in
+chrome://tracing or https://ui.perfetto.dev) plus a per-stage summary table.
+
+Tracing is off unless enabled with `enable()`, a --trace flag, or the
+CAROUSEL_TRACE environment variable (the path of the trace file). When
+off, `span()` returns a shared no-op context manager, so instrumented code
+costs one global lookup and one call per span.
+
+When enabled through the environment or `configure()`, the trace is
+written and the summary printed at exit. Child processes (batch and server
+workers) inherit the setting and write `trace.<pid>.json` next to the
+parent's file; the parent merges those into its own trace and summary
+when it exits after them. At most CAROUSEL_TRACE_MAX_EVENTS (default 200000) recent
+events are kept per process.
+
+    with span("font_fit", text_chars=len(text)):
+        ...
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import atexit
+import threading
+from collections import deque
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+_enabled = False
+_events = deque(maxlen=int(os.environ.get("CAROUSEL_TRACE_MAX_EVENTS", 200000)))
+_output = None
+_owner_pid = None
+_flushed_pid = None
+_started = time.time()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        event = {
+            "name": self.name,
+            "ph": "X",
+            "ts": self.start / 1000,
+            "dur": (end - self.start) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if self.args:
+            event["args"] = self.args
+        if exc_type is not None:
+            event.setdefault("args", {})["error"] = exc_type.__name__
+        _events.append(event)
+        return False
+
+
+def span(name: str, **args):
+    """
+    Time a block as one trace event.
+
+    Args:
+        name (str): Stage name (e.g. "template_load"); used as the summary key.
+        **args: Extra values shown with the event (file names, sizes, ...).
+
+    Returns:
+        A context manager; a shared no-op when tracing is disabled.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable(output: str = None):
+    """
+    Start recording spans in this process.
+
+    Args:
+        output (str): Trace file written by `flush()` (and at exit).
+    """
+    global _enabled, _output, _owner_pid
+    _enabled = True
+    _output = output
+    _owner_pid = os.getpid()
+
+
+def disable():
+    """Stop recording; already recorded events are kept."""
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    """Drop every recorded event."""
+    _events.clear()
+
+
+def events() -> list:
+    """Recorded trace events (Chrome "complete" events, times in µs)."""
+    return list(_events)
+
+
+def write_chrome_trace(path: str, trace_events=None):
+    """Write the recorded events (or `trace_events`) as Chrome trace-event JSON."""
+    trace_events = list(_events) if trace_events is None else trace_events
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+
+
+def summary(trace_events=None) -> list:
+    """
+    Aggregate spans per stage.
+
+    Args:
+        trace_events (list): Events to aggregate (default: this process's).
+
+    Returns:
+        list: [{"name", "count", "total_ms", "mean_ms", "max_ms"}], slowest total first.
+    """
+    stages = {}
+    for event in _events if trace_events is None else trace_events:
+        stage = stages.setdefault(event["name"], [0, 0.0, 0.0])
+        stage[0] += 1
+        stage[1] += event["dur"]
+        stage[2] = max(stage[2], event["dur"])
+    rows = [
+        {"name": name, "count": n, "total_ms": round(total / 1000, 3),
+         "mean_ms": round(total / n / 1000, 3), "max_ms": round(peak / 1000, 3)}
+        for name, (n, total, peak) in stages.items()
+    ]
+    return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+
+def print_summary(file=None, trace_events=None):
+    """Print the per-stage summary table."""
+    file = file or sys.stderr
+    rows = summary(trace_events)
+    if not rows:
+        return
+    print(f"\n📊 {'stage':24} {'count':>7} {'total ms':>11} {'mean ms':>10} {'max ms':>10}", file=file)
+    for r in rows:
+        print(f"   {r['name']:24} {r['count']:7d} {r['total_ms']:11.3f} {r['mean_ms']:10.3f} {r['max_ms']:10.3f}",
+              file=file)
+
+
+def _output_path():
+    if _output is None:
+        return None
+    if os.getpid() == _owner_pid:
+        return _output
+    # Forked worker: one file per process next to the parent's
+    base, ext = os.path.splitext(_output)
+    return f"{base}.{os.getpid()}{ext or '.json'}"
+
+
+def _worker_events():
+    """Events of the worker files written next to the owner's trace during this run."""
+    base, ext = os.path.splitext(_output)
+    pattern = re.compile(re.escape(base) + r"\.\d+" + re.escape(ext or ".json") + "$")
+    merged = []
+    for path in glob.glob(f"{glob.escape(base)}.*{ext or '.json'}"):
+        try:
+            if not pattern.match(path) or os.path.getmtime(path) < _started:
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                merged.extend(json.load(f)["traceEvents"])
+        except (OSError, ValueError, KeyError):
+            continue
+    return merged
+
+
+def flush():
+    """
+    Write the trace file (if an output was set) and print the summary.
+
+    In the owning process, events of the workers' files are merged in.
+    """
+    path = _output_path()
+    owner = os.getpid() == _owner_pid
+    trace_events = list(_events)
+    if path and owner:
+        trace_events += _worker_events()
+    if not trace_events:
+        return
+    if path:
+        write_chrome_trace(path, trace_events)
+    if path is None or owner:
+        print_summary(trace_events=trace_events)
+    if path and owner:
+        print(f"🧭 Trace saved: {path}", file=sys.stderr)
+
+
+def _flush_at_exit():
+    global _flushed_pid
+    if _flushed_pid != os.getpid():
+        _flushed_pid = os.getpid()
+        flush()
+
+
+def _register_worker_flush(_=None):
+    from multiprocessing import util
+
+    # multiprocessing children skip atexit but run their finalizers (which
+    # are cleared on fork, hence the re-registration after every fork)
+    util.Finalize(None, _flush_at_exit, exitpriority=0)
+
+
+def configure(output: str):
+    """
+    Enable tracing for this process and the workers it starts, writing
+    `output` (and printing the summary) at exit. Used by the --trace flags.
+
+    Args:
+        output (str): Trace file of this process.
+    """
+    from multiprocessing import util
+
+    os.environ["CAROUSEL_TRACE"] = output
+    owner = os.environ.setdefault("CAROUSEL_TRACE_OWNER", str(os.getpid()))
+    enable(output)
+    global _owner_pid
+    _owner_pid = int(owner)
+    atexit.register(_flush_at_exit)
+    _register_worker_flush()
+    util.register_after_fork(sys.modules[__name__], _register_worker_flush)
+
+
+if os.environ.get("CAROUSEL_TRACE"):
+    configure(os.environ["CAROUSEL_TRACE"])